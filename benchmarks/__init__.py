@@ -0,0 +1,4 @@
+"""
+Benchmarks for Math Crowd Runner (run from the repo root, e.g.
+python -m benchmarks.bench_collision)
+"""
@@ -0,0 +1,111 @@
+"""
+Collision benchmark: z-slice zone map (เดิม) vs SpatialHash 2D
+
+    python -m benchmarks.bench_collision --enemies 15 60 240 --bullets 100
+"""
+import argparse
+import math
+import random
+import time
+
+from entities import Enemy
+from spatial import SpatialHash
+
+HIT_RADIUS = 0.03
+
+
+# ============================================
+# Baseline - zone map แบบเดิมของ Game.build_enemy_zones
+# ============================================
+def build_zone_map(enemies):
+    zones = {}
+    for enemy in enemies:
+        zones.setdefault(int(enemy.z * 10), []).append(enemy)
+    return zones
+
+def zone_map_hit(zones, x, z):
+    for enemy in zones.get(int(z * 10), []):
+        if math.sqrt((enemy.x - x)**2 + (enemy.z - z)**2) < HIT_RADIUS:
+            return enemy
+    return None
+
+
+# ============================================
+# SpatialHash 2D
+# ============================================
+def build_hash(enemies):
+    grid = SpatialHash()
+    for enemy in enemies:
+        grid.insert('enemy', enemy, enemy.x, enemy.z)
+    return grid
+
+def hash_hit(grid, x, z):
+    for enemy in grid.query('enemy', x, z, HIT_RADIUS):
+        if math.sqrt((enemy.x - x)**2 + (enemy.z - z)**2) < HIT_RADIUS:
+            return enemy
+    return None
+
+def brute_force_hit(enemies, x, z):
+    for enemy in enemies:
+        if math.sqrt((enemy.x - x)**2 + (enemy.z - z)**2) < HIT_RADIUS:
+            return enemy
+    return None
+
+
+def make_scene(num_enemies, num_bullets, rng):
+    enemies = []
+    for _ in range(num_enemies):
+        enemy = Enemy(rng.uniform(0.1, 0.9), rng.uniform(0.0, 0.9))
+        enemy.activate()
+        enemies.append(enemy)
+    # ครึ่งหนึ่งของกระสุนอยู่ใกล้ศัตรู (มีโอกาสชน) อีกครึ่งสุ่มทั้งถนน
+    bullets = []
+    for i in range(num_bullets):
+        if enemies and i % 2 == 0:
+            target = rng.choice(enemies)
+            bullets.append((target.x + rng.uniform(-0.04, 0.04),
+                            target.z + rng.uniform(-0.04, 0.04)))
+        else:
+            bullets.append((rng.uniform(0.0, 1.0), rng.uniform(0.0, 1.0)))
+    return enemies, bullets
+
+def time_frames(build, hit, enemies, bullets, repeats):
+    start = time.perf_counter()
+    for _ in range(repeats):
+        index = build(enemies)
+        for x, z in bullets:
+            hit(index, x, z)
+    return (time.perf_counter() - start) / repeats
+
+def run(enemy_counts, num_bullets, repeats, seed=0):
+    rng = random.Random(seed)
+    results = []
+    for num_enemies in enemy_counts:
+        enemies, bullets = make_scene(num_enemies, num_bullets, rng)
+        zones, grid = build_zone_map(enemies), build_hash(enemies)
+        truth = sum(1 for x, z in bullets if brute_force_hit(enemies, x, z))
+        results.append({
+            'enemies': num_enemies,
+            'bullets': num_bullets,
+            'zone_ms': time_frames(build_zone_map, zone_map_hit, enemies, bullets, repeats) * 1000,
+            'hash_ms': time_frames(build_hash, hash_hit, enemies, bullets, repeats) * 1000,
+            'hits_true': truth,
+            'hits_zone': sum(1 for x, z in bullets if zone_map_hit(zones, x, z)),
+            'hits_hash': sum(1 for x, z in bullets if hash_hit(grid, x, z)),
+        })
+    return results
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--enemies', type=int, nargs='+', default=[15, 60, 240, 960])
+    parser.add_argument('--bullets', type=int, default=100)
+    parser.add_argument('--repeats', type=int, default=200)
+    args = parser.parse_args(argv)
+    
+    print(f"{'enemies':>8} {'zone ms':>9} {'hash ms':>9} {'hits':>6} {'zone':>6} {'hash':>6}")
+    for r in run(args.enemies, args.bullets, args.repeats):
+        print(f"{r['enemies']:>8} {r['zone_ms']:>9.3f} {r['hash_ms']:>9.3f} "
+              f"{r['hits_true']:>6} {r['hits_zone']:>6} {r['hits_hash']:>6}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""
+Draw-order benchmark: sort ทุกเฟรมแบบเดิม vs DepthOrder ที่ซ่อมลำดับจากเฟรมก่อน
+วัดที่จำนวน entity สูงสุด (ฝูง MAX_SIMULATED คน, ศัตรูหลายระลอก, กระสุนเต็มจอ)
+
+    python -m benchmarks.bench_draw_order --frames 300
+"""
+import argparse
+import os
+import random
+import time
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+
+import pygame
+
+from constants import *
+from game import Game
+
+
+def legacy_draw_order(game):
+    """ลำดับการวาดแบบเดิม: สร้าง tuple ใหม่ทุกเฟรมแล้ว sort ทั้งหมด"""
+    all_objects = []
+    for gate in game.gates:
+        all_objects.append(('gate', gate, gate.z))
+    for lava in game.lava_pits:
+        all_objects.append(('lava', lava, lava.z))
+    for enemy in game.enemies:
+        all_objects.append(('enemy', enemy, enemy.z))
+    for bullet in game.bullets:
+        all_objects.append(('bullet', bullet, bullet.z))
+    for person in game.crowd.people:
+        all_objects.append(('person', person, person.z))
+    if game.crowd.hidden_count > 0:
+        game.crowd.impostor.update()
+        all_objects.append(('impostor', game.crowd.impostor, game.crowd.impostor.z))
+    all_objects.sort(key=lambda x: x[2])
+    return [obj for _, obj, _ in all_objects]
+
+
+def make_max_scene(seed=0, crowd_backend=None, bullet_backend=None, waves=4, bullets=60):
+    """Game ระดับ 3 ที่มีจำนวน entity สูงสุดโดยประมาณ"""
+    random.seed(seed)
+    game = Game(3, crowd_backend=crowd_backend, seed=seed, bullet_backend=bullet_backend)
+    game.start_game()
+    game.crowd.add_people(MAX_SIMULATED * 4)  # ตัวแทนเต็ม + impostor
+    game.crowd.sync_people(MAX_SIMULATED)  # สร้างตัวแทนครบทันที (ปกติทยอยสร้างทีละ PEOPLE_SYNC_BUDGET)
+    for _ in range(waves):
+        game.spawn_enemies()
+        game.spawn_gate()
+        game.spawn_lava_pit()
+    for i, enemy in enumerate(game.enemies):
+        enemy.z = random.uniform(0.0, 0.7)
+        enemy.activate()
+        enemy.update_screen_position()
+    for i in range(bullets):
+        person = game.crowd.people[i % len(game.crowd.people)]
+        # ยิงผ่าน bullet backend ของเกม (BulletManager ต้องรู้จักทุกนัดใน game.bullets)
+        game.bullet_system.acquire(person.x, person.z, game.enemies[i % len(game.enemies)])
+    for obj in game.gates + game.lava_pits:
+        obj.z = random.uniform(0.0, 0.8)
+        obj.update_screen_position()
+    return game
+
+
+def advance(game):
+    """ขยับทุกอย่างเหมือนเฟรมจริง แต่ไม่ให้ใครตาย/หายไป (จำนวนคงที่)"""
+    game.crowd.update()
+    for obj in game.gates + game.lava_pits + game.enemies:
+        obj.z = obj.z + 0.004 if obj.z < 0.8 else 0.0
+        obj.update_screen_position()
+    for bullet in game.bullets:
+        bullet.z = bullet.z - 0.02 if bullet.z > 0.1 else 0.9
+        bullet.update_screen_position()
+
+
+def time_order(game, order_func, frames):
+    times = []
+    for _ in range(frames):
+        advance(game)
+        start = time.perf_counter()
+        order_func()
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def time_draw(game, screen, fonts, frames):
+    times = []
+    for _ in range(frames):
+        advance(game)
+        start = time.perf_counter()
+        game.draw(screen, fonts)
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def summarize(times):
+    ordered = sorted(times)
+    return (sum(times) / len(times) * 1000, ordered[int(len(ordered) * 0.99) - 1] * 1000)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--frames', type=int, default=300)
+    parser.add_argument('--crowd-backend', default=None)
+    parser.add_argument('--bullet-backend', default=None)
+    args = parser.parse_args(argv)
+
+    pygame.init()
+    screen = pygame.Surface((WIDTH, HEIGHT))
+    fonts = dict(FONT_SIZES)
+
+    game = make_max_scene(crowd_backend=args.crowd_backend, bullet_backend=args.bullet_backend)
+    entities = len(legacy_draw_order(game))
+    print(f"entities per frame: {entities} ({len(game.crowd.people)} people, "
+          f"{len(game.enemies)} enemies, {len(game.bullets)} bullets)")
+    print(f"{'':24} {'mean ms':>9} {'p99 ms':>9}")
+
+    results = {
+        'order: full sort': time_order(game, lambda: legacy_draw_order(game), args.frames),
+        'order: DepthOrder': time_order(game, game.draw_order, args.frames),
+    }
+    incremental = Game.draw_order
+    Game.draw_order = legacy_draw_order
+    results['draw: full sort'] = time_draw(game, screen, fonts, args.frames)
+    Game.draw_order = incremental
+    results['draw: DepthOrder'] = time_draw(game, screen, fonts, args.frames)
+
+    for name, times in results.items():
+        mean, p99 = summarize(times)
+        print(f"{name:24} {mean:>9.3f} {p99:>9.3f}")
+
+if __name__ == "__main__":
+    main()
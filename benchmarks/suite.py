@@ -0,0 +1,474 @@
+"""
+Benchmark suite: micro-benchmarks ของ hot path ใน simulation + macro-benchmark ทั้งเฟรม
+
+    python -m benchmarks.suite --output results.json
+    python -m benchmarks.suite --only crowd_update enemy_update --counts 50 500
+    python -m benchmarks.suite --compare baseline.json --threshold 0.10
+    python -m benchmarks.suite --compare baseline.json --current results.json
+
+ผลลัพธ์เก็บเป็น JSON (เวลาต่อการเรียกหนึ่งครั้ง หน่วย ms) โหมด --compare เทียบ median
+กับ baseline แล้ว exit code 1 ถ้ามีตัวไหนช้าลงเกิน threshold
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import time
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+import pygame
+
+from constants import *
+from entities import Bullet, Enemy, Person, make_bullets, make_crowd
+from entities import make_enemies as make_enemy_system
+from game import Game
+from game_objects import Gate, LavaPit
+from main import INPUT_POLICIES
+from spatial import SpatialHash
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+RESULTS_VERSION = 1
+
+# ชนิด entity ในเกม -> list ของ instance ที่มีอยู่ตอนนี้
+ENTITY_KINDS = {
+    'person': lambda game: game.crowd.people,
+    'enemy': lambda game: game.enemies,
+    'bullet': lambda game: game.bullets,
+    'gate': lambda game: game.gates,
+    'lava': lambda game: game.lava_pits,
+}
+
+
+def make_enemies(rng, count, z_range=(0.0, 0.7)):
+    enemies = []
+    for _ in range(count):
+        enemy = Enemy(rng.uniform(0.1, 0.9), rng.uniform(*z_range))
+        enemy.activate()
+        enemy.update_screen_position()
+        enemies.append(enemy)
+    return enemies
+
+def make_settled_crowd(backend, count, rng):
+    """ฝูงที่มีตัวแทน count คนและขยับเข้าฟอร์เมชั่นแล้ว"""
+    crowd = make_crowd(backend, rng=rng)
+    crowd.add_people(count - crowd.count)
+    for _ in range(30):
+        crowd.update()
+    return crowd
+
+
+def entity_bytes(obj):
+    """ขนาดของ instance (รวม __dict__ ถ้ามี ไม่รวมค่าที่ชี้ไปซึ่งแชร์กับตัวอื่น)"""
+    size = sys.getsizeof(obj)
+    attrs = getattr(obj, '__dict__', None)
+    if attrs is not None:
+        size += sys.getsizeof(attrs)
+    return size
+
+def entity_memory():
+    """bytes ต่อ instance ของ entity แต่ละคลาส"""
+    rng = random.Random(0)
+    samples = [Person(0.5, 0.5), Enemy(0.5, 0.5), Bullet(0.5, 0.5, None),
+               Gate(0.0, 3, rng), LavaPit(0.5, 0.5, rng)]
+    if np is not None:
+        samples.append(make_crowd('numpy').people[0])
+    return {type(obj).__name__: entity_bytes(obj) for obj in samples}
+
+
+# ============================================
+# Micro-benchmarks
+# แต่ละตัวคืน (setup, run): setup(count, rng, backend) -> state, run(state) คือส่วนที่จับเวลา
+# ============================================
+def bench_add_people():
+    def setup(count, rng, backend):
+        return make_crowd(backend, rng=rng), count
+    def run(state):
+        crowd, count = state
+        crowd.add_people(count)
+    return setup, run
+
+def bench_multiply_to_cap():
+    def setup(count, rng, backend):
+        crowd = make_crowd(backend, rng=rng)
+        crowd.add_people(count - crowd.count)
+        return crowd
+    def run(crowd):
+        while crowd.count < MAX_CROWD_COUNT:
+            crowd.multiply_people(5)
+    return setup, run
+
+def bench_gate_frame():
+    """step ที่ฝูงผ่านประตู x5: คำนวณจำนวนใหม่แล้ว update ฝูงหนึ่งครั้ง"""
+    def setup(count, rng, backend):
+        return make_settled_crowd(backend, count, rng)
+    def run(crowd):
+        crowd.multiply_people(5)
+        crowd.update()
+    return setup, run
+
+def bench_crowd_update():
+    def setup(count, rng, backend):
+        return make_settled_crowd(backend, count, rng)
+    def run(crowd):
+        crowd.move(PLAYER_SPEED if crowd.center_x < 0.5 else -PLAYER_SPEED)
+        crowd.update()
+    return setup, run
+
+def bench_try_shoot():
+    def setup(count, rng, backend):
+        return make_settled_crowd(backend, count, rng), make_enemies(rng, 15)
+    def run(state):
+        crowd, enemies = state
+        crowd.try_shoot(enemies)
+    return setup, run
+
+def bench_enemy_update():
+    def setup(count, rng, backend):
+        return make_settled_crowd(backend, 100, rng), make_enemies(rng, count)
+    def run(state):
+        crowd, enemies = state
+        targets = crowd.nearest_indices([(e.x, e.z) for e in enemies])
+        for enemy, target_index in zip(enemies, targets):
+            enemy.update(crowd, target_index)
+    return setup, run
+
+def bench_check_hit_zone():
+    """swept hit test ของกระสุน 100 นัดที่ขยับไปแล้วหนึ่ง step (เส้นทางยาว BULLET_STEP)
+    ทุกครั้งที่วัดคืนศัตรูให้มีชีวิตและคืนเส้นทางของทุกนัด (ไม่งั้นรอบหลังศัตรูตายหมดแล้ว)"""
+    def setup(count, rng, backend):
+        enemies = make_enemies(rng, count)
+        grid = SpatialHash()
+        for enemy in enemies:
+            grid.insert('enemy', enemy, enemy.x, enemy.z)
+        rank = {id(enemy): i for i, enemy in enumerate(enemies)}
+        # ครึ่งหนึ่งออกตัวใกล้เป้า อีกครึ่งออกตัวจากจุดสุ่มทั้งถนน ทุกนัดมีเป้าจึงขยับได้จริง
+        paths = []
+        for i in range(100):
+            target = rng.choice(enemies)
+            if i % 2 == 0:
+                bullet = Bullet(target.x + rng.uniform(-0.06, 0.06),
+                                target.z + rng.uniform(-0.06, 0.06), target)
+            else:
+                bullet = Bullet(rng.uniform(0.0, 1.0), rng.uniform(0.0, 1.0), target)
+            bullet.update()
+            paths.append((bullet, bullet.last_x, bullet.last_z, bullet.x, bullet.z))
+        return grid, enemies, paths, rank
+    def run(state):
+        grid, enemies, paths, rank = state
+        for enemy in enemies:
+            enemy.hp = 1
+            enemy.alive = True
+        for bullet, last_x, last_z, x, z in paths:
+            bullet.last_x, bullet.last_z, bullet.x, bullet.z = last_x, last_z, x, z
+            bullet.active = True
+            bullet.check_hit_zone(grid, rank)
+    return setup, run
+
+def bench_bullet_step(backend_name):
+    """ระบบกระสุนหนึ่ง step: count นัดเล็งศัตรู 30 ตัว (ขยับ + swept hit + ลบนัดที่หมด)
+    ยิงเติมทุกครั้งให้จำนวนนัดคงที่"""
+    def factory():
+        def setup(count, rng, backend):
+            enemies = make_enemies(rng, 30)
+            system = make_bullets(backend_name)
+            return system, enemies, count, random.Random(rng.random())
+        def run(state):
+            system, enemies, count, shots = state
+            for enemy in enemies:
+                if not enemy.alive:  # ศัตรูที่โดนยิงเกิดใหม่ จำนวนเป้าคงที่
+                    enemy.reset(shots.uniform(0.1, 0.9), shots.uniform(0.0, 0.7))
+                    enemy.activate()
+            grid = SpatialHash()
+            for enemy in enemies:
+                grid.insert('enemy', enemy, enemy.x, enemy.z)
+            while len(system.bullets) < count:
+                system.acquire(shots.uniform(0.1, 0.9), 0.9, shots.choice(enemies))
+            system.update(enemies, grid)
+        return setup, run
+    return factory
+
+def bench_enemy_step(backend_name):
+    """ระบบศัตรูหนึ่ง step: count ตัวไล่ฝูง 100 คน (หาเป้า + เดิน + ชน + ลบตัวที่ตาย)
+    เติมศัตรูและคนที่หายไปทุกครั้งให้จำนวนคงที่"""
+    def factory():
+        def setup(count, rng, backend):
+            crowd = make_settled_crowd(backend, 100, rng)
+            system = make_enemy_system(backend_name)
+            return crowd, system, count, random.Random(rng.random())
+        def run(state):
+            crowd, system, count, spawns = state
+            while len(system.enemies) < count:
+                system.acquire(spawns.uniform(0.1, 0.9), spawns.uniform(0.0, 0.7))
+            system.activate_all()
+            if crowd.count < 100:
+                crowd.add_people(100 - crowd.count)
+            system.update(crowd)
+            system.cull()
+        return setup, run
+    return factory
+
+# name -> (factory, counts เริ่มต้น, จำนวนครั้งที่เรียก run ต่อ setup)
+MICRO_BENCHMARKS = {
+    'add_people': (bench_add_people, (10, 100, MAX_SIMULATED), 1),
+    'multiply_to_cap': (bench_multiply_to_cap, (1, 100, MAX_SIMULATED), 1),
+    'gate_frame': (bench_gate_frame, (10, 100, MAX_SIMULATED), 1),
+    'crowd_update': (bench_crowd_update, (10, 100, MAX_SIMULATED), 20),
+    'try_shoot': (bench_try_shoot, (10, 100, MAX_SIMULATED), 20),
+    'enemy_update': (bench_enemy_update, (15, 60, 240), 20),
+    'check_hit_zone': (bench_check_hit_zone, (15, 60, 240), 5),
+    'bullet_step_list': (bench_bullet_step('list'), (10, 100, 1000), 20),
+    'enemy_step_list': (bench_enemy_step('list'), (15, 60, 240, 1000), 20),
+}
+if np is not None:
+    MICRO_BENCHMARKS['bullet_step_numpy'] = (bench_bullet_step('numpy'), (10, 100, 1000), 20)
+    MICRO_BENCHMARKS['enemy_step_numpy'] = (bench_enemy_step('numpy'), (15, 60, 240, 1000), 20)
+
+
+# ============================================
+# Macro-benchmarks - Game.update() + Game.draw() บน surface นอกจอ
+# ============================================
+class FrameBench:
+    """เล่นเกมจริงตาม input policy แล้ววาดทุกเฟรม เริ่มด่านใหม่เมื่อแพ้/ชนะ
+    count คือจำนวนคนที่เพิ่มให้ฝูงตอนเริ่ม (ขนาดฉากที่ต้อง simulate และวาด)"""
+    def __init__(self, level, count, rng, backend, assets, policy='sweep'):
+        self.level = level
+        self.count = count
+        self.seeds = rng
+        self.backend = backend
+        self.assets = assets
+        self.policy = INPUT_POLICIES[policy]
+        self.screen = pygame.Surface((WIDTH, HEIGHT))
+        self.fonts = dict(FONT_SIZES)
+        self.frame = 0
+        self.peak_counts = {}  # kind -> จำนวนมากที่สุดที่เคยมีพร้อมกัน
+        self.sizes = {}        # kind -> bytes ต่อ instance (วัดจากตัวแรกที่เจอ)
+        self.peak_bytes = 0    # ขนาดรวมของ entity ทั้งหมดในเฟรมที่มากที่สุด
+        self.new_game()
+
+    def new_game(self):
+        self.game = Game(self.level, self.assets, self.backend,
+                         seed=self.seeds.randrange(2**32))
+        self.game.start_game()
+        self.game.crowd.add_people(self.count - 1)
+
+    def step(self):
+        if self.game.game_over or self.game.won:
+            self.new_game()
+        direction = self.policy(self.game, self.frame)
+        if direction:
+            self.game.crowd.move(direction * PLAYER_SPEED)
+        self.game.update()
+        self.game.draw(self.screen, self.fonts)
+        self.frame += 1
+        self.track_memory()
+
+    def track_memory(self):
+        total = 0
+        for kind, items_of in ENTITY_KINDS.items():
+            items = items_of(self.game)
+            count = len(items)
+            if count > self.peak_counts.get(kind, 0):
+                self.peak_counts[kind] = count
+            if kind not in self.sizes and items:
+                self.sizes[kind] = entity_bytes(items[0])
+            total += count * self.sizes.get(kind, 0)
+        self.peak_bytes = max(self.peak_bytes, total)
+
+    def memory_report(self):
+        return {'peak_entities': dict(self.peak_counts),
+                'entity_bytes': dict(self.sizes),
+                'peak_entity_bytes': self.peak_bytes}
+
+def macro_frame(level):
+    def factory():
+        def setup(count, rng, backend):
+            bench = FrameBench(level, count, rng, backend, MACRO_ASSETS)
+            for _ in range(60):  # อุ่นเครื่อง cache (background, text, sprite LOD)
+                bench.step()
+            return bench
+        def run(bench):
+            bench.step()
+        return setup, run
+    return factory
+
+MACRO_BENCHMARKS = {
+    f'frame_level{level}': (macro_frame(level), (1, 100, 1000), 200)
+    for level in (1, 2, 3)
+}
+
+MACRO_ASSETS = {}
+
+def load_macro_assets():
+    """เปิดจอ dummy (ให้ convert() ได้เหมือนเกมจริง) แล้วโหลด asset"""
+    from utils import init_font_cache, load_resources
+    pygame.init()
+    init_font_cache()
+    if pygame.display.get_surface() is None:
+        pygame.display.set_mode((WIDTH, HEIGHT))
+    MACRO_ASSETS.clear()
+    MACRO_ASSETS.update(load_resources())
+
+
+# ============================================
+# Runner
+# ============================================
+def percentile(ordered, pct):
+    if not ordered:
+        return 0.0
+    rank = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[rank]
+
+def measure(factory, count, repeats, number, backend, seed):
+    """เวลาต่อการเรียก run หนึ่งครั้ง (ms) จาก repeats รอบ รอบละ number ครั้ง (setup ไม่นับเวลา)"""
+    setup, run = factory()
+    rng = random.Random(seed)
+    times = []
+    memory = None
+    for _ in range(repeats):
+        state = setup(count, rng, backend)
+        start = time.perf_counter()
+        for _ in range(number):
+            run(state)
+        times.append((time.perf_counter() - start) / number * 1000)
+        if hasattr(state, 'memory_report'):
+            report = state.memory_report()
+            if memory is None or report['peak_entity_bytes'] > memory['peak_entity_bytes']:
+                memory = report
+    ordered = sorted(times)
+    result = {
+        'count': count,
+        'repeats': repeats,
+        'number': number,
+        'mean_ms': sum(times) / len(times),
+        'min_ms': ordered[0],
+        'median_ms': percentile(ordered, 50),
+        'p99_ms': percentile(ordered, 99),
+    }
+    if memory is not None:
+        result['memory'] = memory
+    return result
+
+def run_suite(names=None, counts=None, repeats=7, backend=None, seed=0, log=print):
+    benchmarks = {}
+    benchmarks.update((f'micro/{name}', spec) for name, spec in MICRO_BENCHMARKS.items())
+    benchmarks.update((f'macro/{name}', spec) for name, spec in MACRO_BENCHMARKS.items())
+    if names:
+        benchmarks = {key: spec for key, spec in benchmarks.items()
+                      if any(name in key.split('/') for name in names)}
+    if any(key.startswith('macro/') for key in benchmarks):
+        load_macro_assets()
+
+    memory = entity_memory()
+    log("bytes per entity: " + ", ".join(f"{name} {size}" for name, size in memory.items()))
+    results = {}
+    for key, (factory, default_counts, number) in benchmarks.items():
+        for count in counts or default_counts:
+            result = measure(factory, count, repeats, number, backend, seed)
+            name = f"{key}[{count}]"
+            results[name] = result
+            log(f"{name:36} median {result['median_ms']:>9.4f} ms  "
+                f"min {result['min_ms']:>9.4f} ms  p99 {result['p99_ms']:>9.4f} ms")
+            if 'memory' in result:
+                peak = result['memory']
+                log(f"{'':36} peak entities {sum(peak['peak_entities'].values())}  "
+                    f"{peak['peak_entity_bytes'] / 1024:.1f} KiB")
+    return {
+        'version': RESULTS_VERSION,
+        'meta': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'pygame': pygame.version.ver,
+            'numpy': np.__version__ if np is not None else None,
+            'platform': platform.platform(),
+            'crowd_backend': backend or CROWD_BACKEND,
+            'repeats': repeats,
+            'seed': seed,
+            'entity_bytes': memory,
+        },
+        'results': results,
+    }
+
+
+# ============================================
+# Compare
+# ============================================
+def compare(baseline, current, threshold=0.10, stat='median_ms'):
+    """เทียบผลสองชุด คืน list ของ (name, base, new, ratio, สถานะ)
+    สถานะ 'regression' เมื่อช้าลงเกิน threshold, 'faster' เมื่อเร็วขึ้นเกิน threshold"""
+    rows = []
+    for name, result in current['results'].items():
+        base = baseline['results'].get(name)
+        if base is None:
+            rows.append((name, None, result[stat], None, 'new'))
+            continue
+        ratio = result[stat] / base[stat] if base[stat] > 0 else float('inf')
+        if ratio > 1 + threshold:
+            status = 'regression'
+        elif ratio < 1 - threshold:
+            status = 'faster'
+        else:
+            status = 'ok'
+        rows.append((name, base[stat], result[stat], ratio, status))
+    return rows
+
+def print_comparison(rows, threshold):
+    print(f"{'benchmark':36} {'base ms':>10} {'new ms':>10} {'ratio':>7}  status "
+          f"(threshold {threshold:.0%})")
+    for name, base, new, ratio, status in rows:
+        base_text = f"{base:>10.4f}" if base is not None else f"{'-':>10}"
+        ratio_text = f"{ratio:>7.2f}" if ratio is not None else f"{'-':>7}"
+        print(f"{name:36} {base_text} {new:>10.4f} {ratio_text}  {status}")
+
+def load_results(path):
+    with open(path) as f:
+        data = json.load(f)
+    if data.get('version') != RESULTS_VERSION:
+        raise ValueError(f"{path}: results version {data.get('version')} ไม่รองรับ")
+    return data
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--only', nargs='+', metavar='NAME',
+                        help="เลือกเฉพาะ benchmark (ชื่อ เช่น crowd_update หรือกลุ่ม micro/macro)")
+    parser.add_argument('--counts', type=int, nargs='+',
+                        help="จำนวน entity ที่จะวัด (แทนค่าเริ่มต้นของแต่ละ benchmark)")
+    parser.add_argument('--repeats', type=int, default=7)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--crowd-backend', default=None)
+    parser.add_argument('--output', metavar='PATH', help="บันทึกผลเป็น JSON")
+    parser.add_argument('--compare', metavar='BASELINE', help="เทียบกับผล baseline (JSON)")
+    parser.add_argument('--current', metavar='PATH',
+                        help="ใช้ผลที่บันทึกไว้แทนการรันใหม่ (ใช้คู่กับ --compare)")
+    parser.add_argument('--threshold', type=float, default=0.10,
+                        help="สัดส่วนที่ช้าลงได้ก่อนนับเป็น regression (0.10 = 10%%)")
+    args = parser.parse_args(argv)
+
+    if args.current:
+        current = load_results(args.current)
+    else:
+        current = run_suite(args.only, args.counts, args.repeats, args.crowd_backend, args.seed)
+        if args.output:
+            with open(args.output, 'w') as f:
+                json.dump(current, f, indent=1)
+
+    if args.compare:
+        rows = compare(load_results(args.compare), current, args.threshold)
+        print()
+        print_comparison(rows, args.threshold)
+        regressions = [row for row in rows if row[4] == 'regression']
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) beyond {args.threshold:.0%}")
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -9,8 +9,21 @@ import pygame
 WIDTH, HEIGHT = 800, 800 
 FPS = 60
 
+# Simulation clock (ทุกค่าความเร็วในเกมเป็น "ต่อ step" ของ SIM_STEP วินาที)
+SIM_STEP = 1 / 60
+MAX_CATCHUP_STEPS = 5        # รัน simulation ไล่ตามได้สูงสุดกี่ step ต่อการวาดหนึ่งครั้ง
+RENDER_INTERPOLATION = True  # วาดตำแหน่งผสมระหว่าง step (ลื่นขึ้นเมื่อ FPS ไม่ตรงกับ step)
+
+# Object pools
+POOL_LIMIT = 1024  # จำนวน instance ว่างสูงสุดที่เก็บไว้ต่อ pool
+
+# Profiler
+PROFILE_HISTORY = 600  # จำนวนเฟรมล่าสุดที่เก็บไว้ (ring buffer)
+
 # ความเร็ว
 SCROLL_SPEED = 4
+SCROLL_EXIT_Z = 1.2          # วัตถุที่ z เกินนี้ผ่านผู้เล่นไปแล้ว (ลบทิ้ง)
+CROWD_REACH_Z = (0.5, 1.05)  # ช่วง z ที่ gate / บ่อลาวาชนฝูงชนได้ (คนอยู่ที่ z 0.65-0.95 ตามฟอร์เมชั่น ± ระยะชน 0.08)
 PLAYER_SPEED = 13 
 BULLET_SPEED = 15
 ENEMY_SPEED = 1.5  
@@ -26,11 +39,61 @@ ROAD_BOTTOM_LEFT = 50
 ROAD_BOTTOM_RIGHT = WIDTH - 50
 ROAD_BOTTOM_Y = HEIGHT - 80
 
+# Projection world -> screen
+PROJECTION_LUT_SIZE = 0          # จำนวนช่องของตาราง z -> (ซ้าย, ขวา, y, scale) (0 = คำนวณตรงแบบไม่ปัด)
+PROJECTION_Z_RANGE = (-0.5, 1.5)  # ช่วง z ที่ตารางครอบคลุม (นอกช่วงนี้ใช้ค่าขอบ)
+GATE_CORNER_CACHE_SIZE = 256     # จำนวนชุดมุมประตู (ต่อค่า z) ที่เก็บไว้
+
+# ฝูงชน
+MAX_SIMULATED = 500          # จำนวนตัวแทนที่ simulate และวาดจริง (ส่วนเกินวาดเป็น impostor)
+MAX_CROWD_COUNT = 999_999_999  # จำนวนคนสูงสุดในฝูง (นับจริง)
+PEOPLE_SYNC_BUDGET = 40      # จำนวนตัวแทนที่สร้าง/ลบได้สูงสุดต่อ step หลัง count เปลี่ยน
+CROWD_BACKEND = 'list'   # 'list' (Person ทีละตัว) หรือ 'numpy' (structure-of-arrays)
+FORMATION_SHAPE = 'rings'  # 'rings', 'wedge' หรือ 'grid'
+WEDGE_DEPTH = 0.2          # ความลึกรวมสูงสุดของรูปลิ่ม (±0.1 รอบจุดกลาง เท่ากับ rings/grid)
+WEDGE_WIDTH = 0.8          # ความกว้างสูงสุดของแถวหลังสุดของรูปลิ่ม
+FORMATION_PRECOMPUTE = False  # True = คำนวณตารางฟอร์เมชั่นทุกจำนวนคนตอนเปิดเกม (~2 วินาที)
+                              # ค่าเริ่มต้นคำนวณเมื่อถูกขอครั้งแรก (ไม่เกินไม่กี่ ms ต่อจำนวนคน)
+
+# ศัตรู
+ENEMY_BACKEND = 'list'  # 'list' (Enemy ทีละตัว), 'numpy' (EnemySwarm + flow field) หรือ 'auto'
+ENEMY_WAVE = (8, 15)    # จำนวนศัตรูต่อระลอก (สุ่มในช่วงนี้)
+ENEMY_CAPACITY = 64     # ขนาด array เริ่มต้นของ EnemySwarm (ขยายเองเมื่อเต็ม)
+FLOW_FIELD_CELL = 0.05              # ขนาด cell ของ flow field (หน่วย world)
+FLOW_FIELD_Z_RANGE = (-0.3, 1.2)    # ช่วง z ที่ flow field คลุม
+
+# กระสุน
+BULLET_BACKEND = 'list'  # 'list' (Bullet ทีละนัด), 'numpy' (BulletManager, คุ้มเมื่อมีกระสุนหลายสิบนัด) หรือ 'auto'
+BULLET_STEP = 0.03       # ระยะที่กระสุนวิ่งต่อ step (หน่วย world)
+BULLET_HIT_RADIUS = 0.03
+BULLET_CAPACITY = 256    # ขนาด array เริ่มต้นของ BulletManager (ขยายเองเมื่อเต็ม)
+
 # Gate และ Lava
 GATE_DEPTH = 0.15
 LAVA_BASE_WIDTH = 80
 LAVA_BASE_HEIGHT = 50
 
+# ขนาด font (ใช้เป็น key ของ text cache)
+FONT_SIZES = {
+    'font': 48,
+    'small_font': 28,
+    'big_font': 72,
+    'huge_font': 36,
+}
+TEXT_CACHE_SIZE = 256  # จำนวน surface ข้อความสูงสุดใน LRU cache
+
+# การอัปเดตจอ
+USE_DIRTY_RECTS = True  # อัปเดตเฉพาะบริเวณที่เปลี่ยน (False = flip เต็มจอทุกเฟรม)
+MAX_DIRTY_RECTS = 64    # จำนวน rect สูงสุดต่อเฟรม เกินนี้รวมเป็น rect เดียว
+
+# Asset cache (รูปที่ scale แล้ว เก็บเป็น pixel ดิบบนดิสก์)
+ASSET_DIR = 'assets'
+ASSET_CACHE_DIR = '.asset_cache'
+ASSET_CACHE_VERSION = 1  # เพิ่มเลขนี้เมื่อเปลี่ยนวิธี scale/รูปแบบไฟล์ cache
+
+# Sprite LOD
+SPRITE_LOD_STEP = 1  # ความละเอียดของขนาด sprite (5 = 5 ขนาดแบบเดิม)
+
 # สี
 WHITE = (255, 255, 255)
 BLACK = (0, 0, 0)
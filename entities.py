@@ -5,38 +5,54 @@ import pygame
 import random
 import math
 from constants import *
-from utils import world_to_screen
+from utils import PROJECTION, world_to_screen, render_text, format_count
+from formation import get_formation
+from spatial import PointGrid, FlowField
+from pool import ObjectPool, compact
+
+try:
+    import numpy as np
+except ImportError:  # NumPy เป็น optional - ถ้าไม่มีจะใช้ได้แค่ backend แบบ list
+    np = None
+
+def person_size_for(crowd_size):
+    """ขนาดตัวละครตามจำนวนคนในทีม (ยิ่งคนเยอะ ตัวยิ่งเล็ก)"""
+    if crowd_size <= 10:
+        return 15
+    elif crowd_size <= 50:
+        return 12
+    elif crowd_size <= 100:
+        return 10
+    else:
+        return max(8, 15 - int(crowd_size / 50))
 
 class Person:
-    """คนหนึ่งคนในทีม มีปืน"""
+    """คนหนึ่งคนในทีม มีปืน
+    ใช้ __slots__ (ไม่มี __dict__ ต่อ instance) ค่าที่เหมือนกันทุกคนเป็น class attribute
+    assets เป็นแค่ reference ไปยัง dict กลางของเกม (ไม่ได้ copy)"""
+    __slots__ = ('x', 'z', 'base_size', 'shoot_cooldown', 'assets',
+                 'screen_x', 'screen_y', 'scale', 'generation')
+    color = BLUE
+    has_gun = True
+    shoot_rate = 20
+    NO_ASSETS = {}
+    
     def __init__(self, x, z, crowd_size=10, assets=None):
+        self.generation = 0  # เพิ่มขึ้นทุกครั้งที่ถูกใช้ซ้ำจาก ObjectPool
+        self.reset(x, z, crowd_size, assets)
+    
+    def reset(self, x, z, crowd_size=10, assets=None):
         self.x = x  # 0.0 - 1.0 (ซ้าย-ขวา)
         self.z = z  # 0.0 - 1.0 (ไกล-ใกล้)
-        self.base_size = 10
-        self.crowd_size = crowd_size
-        self.update_size()
-        self.color = BLUE
-        self.has_gun = True
+        self.base_size = person_size_for(crowd_size)
         self.shoot_cooldown = 0
-        self.shoot_rate = 20
-        self.assets = assets or {}
+        self.assets = assets or self.NO_ASSETS
         
         # Cache screen position
         self.screen_x = 0
         self.screen_y = 0
         self.scale = 1.0
     
-    def update_size(self):
-        """ปรับขนาดตามจำนวนคนในทีม"""
-        if self.crowd_size <= 10:
-            self.base_size = 15
-        elif self.crowd_size <= 50:
-            self.base_size = 12
-        elif self.crowd_size <= 100:
-            self.base_size = 10
-        else:
-            self.base_size = max(8, 15 - int(self.crowd_size / 50))
-    
     def update_screen_position(self):
         """คำนวณตำแหน่งบนหน้าจอ (เรียกครั้งเดียวต่อ frame)"""
         self.screen_x, self.screen_y, self.scale = world_to_screen(self.x, self.z)
@@ -62,158 +78,219 @@ class Person:
     def can_shoot(self):
         return self.has_gun and self.shoot_cooldown == 0
     
-    def shoot(self, target):
+    def shoot(self, target, pool=None):
         if self.can_shoot():
             self.shoot_cooldown = self.shoot_rate
+            if pool is not None:
+                return pool.acquire(self.x, self.z, target)
             return Bullet(self.x, self.z, target)
         return None
     
+    def sprite_blit(self):
+        """(sprite, rect) สำหรับวาด หรือ None ถ้าไม่มีรูป"""
+        # ใช้ pre-scaled sprites แทนการ scale ทุก frame (ตาราง LOD ตามขนาดบนจอ)
+        lod = self.assets.get('ai_lod')
+        if lod is not None:
+            sprite = lod.sprite(int(self.base_size * self.scale))
+            return sprite, sprite.get_rect(center=(int(self.screen_x), int(self.screen_y)))
+        return None
+    
+    def enqueue(self, queue):
+        """ใส่การวาดลง RenderQueue (sprite ถูกรวม batch กับตัวอื่น)"""
+        blit = self.sprite_blit()
+        if blit:
+            queue.blit(*blit)
+        else:
+            queue.primitive('person', self.draw)
+    
     def draw(self, screen):
+        """วาดลง screen แล้วคืน Rect ที่วาดทับ (ใช้กับ dirty rect)"""
         size = int(self.base_size * self.scale)
         
-        # ใช้ pre-scaled sprites แทนการ scale ทุก frame
-        if self.assets.get('ai_sprites'):
-            # เลือกขนาดที่ใกล้เคียงที่สุด
-            closest_size = min(self.assets['ai_sprites'].keys(), 
-                             key=lambda k: abs(k - size))
-            sprite = self.assets['ai_sprites'][closest_size]
-            img_rect = sprite.get_rect(center=(int(self.screen_x), int(self.screen_y)))
-            screen.blit(sprite, img_rect)
+        blit = self.sprite_blit()
+        if blit:
+            return screen.blit(*blit)
         else:
-            pygame.draw.circle(screen, self.color, 
+            rect = pygame.draw.circle(screen, self.color, 
                              (int(self.screen_x), int(self.screen_y)), size)
             if self.has_gun:
                 gun_length = max(8, int(size * 1.2))
-                pygame.draw.line(screen, WHITE, 
+                rect = rect.union(pygame.draw.line(screen, WHITE, 
                                (int(self.screen_x), int(self.screen_y)), 
-                               (int(self.screen_x), int(self.screen_y - gun_length)), 2)
+                               (int(self.screen_x), int(self.screen_y - gun_length)), 2))
+            return rect
 
 
 class Crowd:
-    def __init__(self, assets=None):
+    def __init__(self, assets=None, formation=None, rng=None):
         self.assets = assets or {}
-        self.people = [Person(0.5, 0.85, 1, self.assets)]  # เริ่มที่กลางถนน ด้านหน้า
+        self.rng = rng or random  # random.Random ของเกม (seed เดียวกัน = ผลเหมือนเดิมทุกครั้ง)
+        self.formation = get_formation(formation)  # ตาราง offset ของฟอร์เมชั่นต่อจำนวนคน
+        self.base_size = person_size_for(1)
         self.center_x = 0.5  # 0.0 - 1.0
         self.center_z = 0.85  # อยู่ด้านหน้า
         self.count = 1
         self.frame_count = 0
         self.current_target = None  # Shared target สำหรับยิง
-        self.cached_targets = []  # Cache ตำแหน่งเป้าหมาย (แก้ปัญหาตัวละครสั่น)
+        self._spatial_index = None  # PointGrid ของเฟรมนี้ (สร้างเมื่อมีคนถาม)
+        self.impostor = CrowdImpostor(self)
+        self.people = []
+        self._init_storage()
+        self._append_people([(self.center_x, self.center_z)])  # เริ่มที่กลางถนน ด้านหน้า
+    
+    def _init_storage(self):
+        """เตรียมที่เก็บคน (storage hook เรียกครั้งเดียวใน __init__)"""
+        self.pool = ObjectPool(Person)  # คนที่ถูกลบเก็บไว้ใช้ซ้ำตอนฝูงโตอีกครั้ง
         
+    # ============================================
+    # จำนวนคน - count เป็นจำนวนเต็มจริง (หลักล้านได้)
+    # people เป็นแค่ตัวแทนที่ simulate และวาดจริง ไม่เกิน MAX_SIMULATED คน
+    # ส่วนที่เหลือวาดเป็น CrowdImpostor (ก้อนความหนาแน่น + ตัวเลข)
+    # การคำนวณจำนวนคน (บวก ลบ คูณ หาร ยกกำลัง) แก้แค่ count ใน O(1)
+    # ตัวแทนถูกสร้าง/ลบตามให้ทันทีละไม่เกิน PEOPLE_SYNC_BUDGET คนต่อ step ใน sync_people()
+    # ============================================
+    @property
+    def hidden_count(self):
+        """จำนวนคนที่ไม่มีตัวแทน (วาดรวมเป็น impostor)"""
+        return self.count - len(self.people)
+    
+    @property
+    def target_people(self):
+        """จำนวนตัวแทนที่ควรมีสำหรับ count ปัจจุบัน"""
+        return min(self.count, MAX_SIMULATED)
+    
     def add_people(self, amount):
         if amount > 0:
-            current = len(self.people)
-            amount = min(amount, 500 - current)
-            
-            for _ in range(amount):
-                angle = random.uniform(0, math.pi * 2)
-                radius = random.uniform(0.02, 0.06)
+            self.count = min(MAX_CROWD_COUNT, self.count + amount)
+            self.update_all_sizes()
+    
+    def sync_people(self, budget=PEOPLE_SYNC_BUDGET):
+        """สร้างหรือลบตัวแทนเข้าหา target_people ไม่เกิน budget คน (เรียกต้น update ทุก step)"""
+        missing = self.target_people - len(self.people)
+        if missing > 0:
+            positions = []
+            for _ in range(min(missing, budget)):
+                angle = self.rng.uniform(0, math.pi * 2)
+                radius = self.rng.uniform(0.02, 0.06)
                 x = self.center_x + math.cos(angle) * radius
                 z = self.center_z + math.sin(angle) * radius * 0.3
-                self.people.append(Person(x, z, len(self.people) + 1, self.assets))
-            self.count = len(self.people)
-            self.update_all_sizes()
+                positions.append((x, z))
+            self._append_people(positions)
+            self._spatial_index = None
+        elif missing < 0:
+            self._drop_people(min(-missing, budget))
+    
+    def _append_people(self, positions):
+        """เพิ่มคนตามตำแหน่งที่ให้มา (storage hook)"""
+        people, pool, count, assets = self.people, self.pool, self.count, self.assets
+        for x, z in positions:
+            people.append(pool.acquire(x, z, count, assets))
+    
+    def _drop_people(self, amount):
+        """ลบคนท้ายแถวออก amount คน (storage hook) แล้วคืนเข้า pool"""
+        people, pool = self.people, self.pool
+        for _ in range(min(amount, len(people))):
+            pool.release(people.pop())
     
     def remove_people(self, amount):
-        if amount > 0 and len(self.people) > 0:
-            amount = min(amount, len(self.people))
-            self.people = self.people[:-amount]
-            self.count = len(self.people)
+        if amount > 0 and self.count > 0:
+            self.count -= min(amount, self.count)
             if self.count > 0:
                 self.update_all_sizes()
+            else:
+                self._drop_people(len(self.people))  # ทีมหมดแล้ว ไม่เหลือตัวแทนให้ศัตรูไล่
+    
+    def set_count(self, new_count):
+        """ตั้งจำนวนคนใหม่ (เพิ่มหรือลดตามส่วนต่าง)"""
+        if new_count > self.count:
+            self.add_people(new_count - self.count)
+        elif new_count < self.count:
+            self.remove_people(self.count - new_count)
     
     def update_all_sizes(self):
-        for person in self.people:
-            person.crowd_size = self.count
-            person.update_size()
+        """ขนาดตัวละครเปลี่ยนเป็นขั้น ๆ ตามจำนวนคน วนแก้ทุกคนเฉพาะตอนข้ามขั้น"""
+        size = person_size_for(self.count)
+        if size != self.base_size:
+            self.base_size = size
+            for person in self.people:
+                person.base_size = size
     
     def multiply_people(self, multiplier):
-        if multiplier > 0:
-            current = len(self.people)
-            to_add = current * (multiplier - 1)
-            to_add = min(to_add, 500 - current)
-            if to_add > 0:
-                self.add_people(to_add)
+        if multiplier > 0 and self.count > 0:
+            self.set_count(self.count * multiplier)
     
     def divide_people(self, divisor):
         if divisor > 0 and self.count > 0:
-            new_count = max(1, self.count // divisor)
-            to_remove = self.count - new_count
-            if to_remove > 0:
-                self.remove_people(to_remove)
+            self.set_count(max(1, self.count // divisor))
     
     def power_people(self, power):
-        current = len(self.people)
-        if current > 0:
-            new_count = min(500, int(current ** power))
-            if new_count > current:
-                self.add_people(new_count - current)
-            elif new_count < current:
-                self.remove_people(current - new_count)
+        if self.count > 0:
+            # จำกัดก่อนยกกำลังจริง กันตัวเลขโตเกินจำเป็น (เช่น ^3 ซ้อนกันหลายครั้ง)
+            if self.count > 1 and power * math.log10(self.count) > math.log10(MAX_CROWD_COUNT):
+                self.set_count(MAX_CROWD_COUNT)
+            else:
+                self.set_count(self.count ** power)
     
     def sqrt_people(self):
-        current = len(self.people)
-        if current > 0:
-            new_count = max(1, int(math.sqrt(current)))
-            if new_count < current:
-                self.remove_people(current - new_count)
+        if self.count > 0:
+            self.set_count(max(1, math.isqrt(self.count)))
     
     def move(self, dx):
         new_x = self.center_x + dx * 0.02
         self.center_x = max(0.1, min(0.9, new_x))
     
     def update(self):
+        self.sync_people()
         num = len(self.people)
         if num == 0:
             return
         
-        # จัดฟอร์เมชั่นคนในฝูง (เวอร์ชันอ่านง่าย)
-        self.cached_targets = []
-        
-        # ตั้งค่าพื้นฐานของ formation
-        max_people_per_ring = 12
-        person_index = 0
-        ring = 0
-        
-        # วนสร้างวงกลมรอบ ๆ center
-        while person_index < num:
-            # จำนวนคนต่อวง — วงในสุดคนจะน้อย วงนอกมากขึ้น
-            people_in_ring = min(max_people_per_ring + ring * 3, num - person_index)
-            
-            # ระยะห่างจากจุดกลาง
-            radius = 0.03 + ring * 0.04
-            
-            # คำนวณตำแหน่งแต่ละคนในวง
-            for i in range(people_in_ring):
-                if person_index >= num:
-                    break
-                
-                # มุมของคนนี้ในวง (กระจายเท่า ๆ กันรอบวง)
-                angle = (i / people_in_ring) * math.pi * 2
-                
-                # แปลงเป็นพิกัด x, z
-                target_x = self.center_x + math.cos(angle) * radius
-                target_z = self.center_z + math.sin(angle) * radius * 0.3  # ยืดนิดให้วงรี
-                
-                # เก็บตำแหน่งนี้ไว้
-                self.cached_targets.append((target_x, target_z))
-                person_index += 1
-            
-            # ไปวงถัดไป
-            ring += 1
-        
-        # เคลื่อนแต่ละคนไปยังเป้าหมาย
-        for i, person in enumerate(self.people):
-            if i < len(self.cached_targets):
-                target_x, target_z = self.cached_targets[i]
-                person.update(target_x, target_z)
+        # เคลื่อนแต่ละคนไปยังช่องของตัวเองในฟอร์เมชั่น (offset คำนวณไว้แล้วต่อจำนวนคน)
+        center_x, center_z = self.center_x, self.center_z
+        for person, (dx, dz) in zip(self.people, self.formation.offsets(num)):
+            person.update(center_x + dx, center_z + dz)
         
-        # อัปเดต screen position สำหรับทุกคน (cache)
-        for person in self.people:
-            person.update_screen_position()
+        self._spatial_index = None
+    
+    def update_screen_positions(self, start=0, end=None):
+        """คำนวณตำแหน่งบนหน้าจอของคนในช่วง [start, end) ในรอบเดียว (Game เรียกครั้งเดียวต่อ step)"""
+        people = self.people if start == 0 and end is None else self.people[start:end]
+        PROJECTION.project_objects(people)
+    
+    # ============================================
+    # Spatial Index - ให้ Enemy หาคนที่ใกล้ที่สุด
+    # ============================================
+    def spatial_index(self):
+        """PointGrid ของตำแหน่งคนในเฟรมนี้ (สร้างใหม่หลังฝูงขยับหรือมีคนเพิ่ม)
+        การลบคนไม่ต้องสร้างใหม่ เพราะลบจากท้ายแถว index เดิมยังใช้ได้"""
+        if self._spatial_index is None:
+            self._spatial_index = PointGrid([p.x for p in self.people],
+                                            [p.z for p in self.people])
+        return self._spatial_index
+    
+    def nearest_index(self, x, z):
+        """index ของคนที่ใกล้ (x, z) ที่สุด หรือ None ถ้าไม่มีคนเหลือ"""
+        if not self.people:
+            return None
+        return self.spatial_index().nearest(x, z, len(self.people))
     
-    def try_shoot(self, enemies):
-        """ใช้ shared target system - ลด O(n²) เหลือ O(n)"""
+    def position_arrays(self):
+        """ตำแหน่ง x, z ของทุกคนเป็น NumPy array (ใช้สร้าง FlowField)"""
+        return (np.fromiter((p.x for p in self.people), float, len(self.people)),
+                np.fromiter((p.z for p in self.people), float, len(self.people)))
+    
+    def nearest_indices(self, points):
+        """nearest_index ของหลายจุดพร้อมกัน (เช่น ศัตรูทุกตัวในเฟรม)"""
+        if not self.people:
+            return [None] * len(points)
+        index = self.spatial_index()
+        limit = len(self.people)
+        return [index.nearest(x, z, limit) for x, z in points]
+    
+    def try_shoot(self, enemies, bullet_pool=None):
+        """ใช้ shared target system - ลด O(n²) เหลือ O(n)
+        ถ้าให้ bullet_pool มา (ObjectPool หรือระบบกระสุนของเกม - อะไรก็ได้ที่มี acquire(x, z, target))
+        กระสุนจะมาจาก bullet_pool แทนการสร้างใหม่"""
         bullets = []
         
         # หาเป้าหมายใหม่ถ้าไม่มีหรือตายแล้ว หรือหลุดเฟรมไปแล้ว
@@ -235,15 +312,21 @@ class Crowd:
         
         # ให้ทุกคนยิงใส่เป้าหมายเดียวกัน
         if self.current_target:
-            for person in self.people:
-                if person.can_shoot():
-                    bullet = person.shoot(self.current_target)
-                    if bullet:
-                        bullets.append(bullet)
-                        break  # ยิงทีละคนต่อ frame (ประหยัด bullets)
+            shooter = self._first_ready_shooter()
+            if shooter:
+                bullet = shooter.shoot(self.current_target, bullet_pool)
+                if bullet:
+                    bullets.append(bullet)  # ยิงทีละคนต่อ frame (ประหยัด bullets)
         
         return bullets
     
+    def _first_ready_shooter(self):
+        """คนแรกในแถวที่พร้อมยิง (cooldown หมดแล้ว)"""
+        for person in self.people:
+            if person.can_shoot():
+                return person
+        return None
+    
     def draw(self, screen):
         # เรียงตาม z เพื่อวาดจากไกลไปใกล้
         sorted_people = sorted(self.people, key=lambda p: p.z)
@@ -251,17 +334,226 @@ class Crowd:
             person.draw(screen)
 
 
+class CrowdImpostor:
+    """ภาพแทนคนส่วนที่ไม่มีตัวแทน: ก้อนความหนาแน่นโปร่งแสง + ตัวเลขจำนวนคน
+    วาดต่อท้ายแถวคนด้านหลัง (ไกลกว่าคนแถวหลังสุด) ค่าใช้จ่ายคงที่ไม่ว่าจะมีกี่คน"""
+    def __init__(self, crowd):
+        self.crowd = crowd
+        self.z = 0.85
+        self.blob_cache = {}  # (width, height, alpha) -> Surface
+    
+    def update(self):
+        """ตั้ง z ไว้หลังคนแถวหลังสุด (เรียกตอนเตรียมวาด)"""
+        people = self.crowd.people
+        back_z = min(p.z for p in people) if people else self.crowd.center_z
+        self.z = max(0.02, back_z - 0.04)
+    
+    def blob_surface(self, width, height, alpha):
+        key = (width, height, alpha)
+        blob = self.blob_cache.get(key)
+        if blob is None:
+            if len(self.blob_cache) > 64:
+                self.blob_cache.clear()
+            blob = pygame.Surface((width, height), pygame.SRCALPHA)
+            pygame.draw.ellipse(blob, (*BLUE, alpha), blob.get_rect())
+            pygame.draw.ellipse(blob, (*CYAN, min(255, alpha + 60)), blob.get_rect(), 2)
+            self.blob_cache[key] = blob
+        return blob
+    
+    def enqueue(self, queue):
+        queue.primitive('impostor', self.draw)
+    
+    def draw(self, screen):
+        hidden = self.crowd.hidden_count
+        if hidden <= 0:
+            return None
+        
+        left, right, screen_y, scale = PROJECTION.lookup(self.z)
+        screen_x = left + (right - left) * self.crowd.center_x
+        
+        # ยิ่งคนที่ซ่อนอยู่เยอะ ก้อนยิ่งกว้างและทึบขึ้น (สเกล log)
+        density = min(1.0, math.log10(hidden + 1) / 9)
+        width = int((right - left) * (0.4 + 0.5 * density))
+        height = int(60 * scale * (0.6 + 0.4 * density))
+        alpha = int(80 + 100 * density)
+        blob = self.blob_surface(max(2, width), max(2, height), alpha)
+        rect = screen.blit(blob, blob.get_rect(center=(int(screen_x), int(screen_y))))
+        
+        label = render_text(f"+{format_count(hidden)}", int(40 * scale) + 8, WHITE)
+        return rect.union(screen.blit(label, label.get_rect(center=(int(screen_x), int(screen_y)))))
+
+
+def _array_field(name, cast=float, owner='crowd'):
+    """property ที่อ่าน/เขียนช่อง index ของ array ชื่อ name ใน owner (crowd หรือ bullet manager)"""
+    def getter(self):
+        return cast(getattr(getattr(self, owner), name)[self.index])
+    def setter(self, value):
+        getattr(getattr(self, owner), name)[self.index] = value
+    return property(getter, setter)
+
+
+class ArrayPerson(Person):
+    """มุมมอง (view) ของคนหนึ่งคนใน ArrayCrowd - ข้อมูลจริงอยู่ใน array ของ crowd
+    ใช้ draw / can_shoot / shoot ของ Person ได้ตามเดิม"""
+    __slots__ = ('crowd', 'index')
+    
+    x = _array_field('x')
+    z = _array_field('z')
+    screen_x = _array_field('screen_x')
+    screen_y = _array_field('screen_y')
+    scale = _array_field('scale')
+    shoot_cooldown = _array_field('shoot_cooldown', int)
+    
+    def __init__(self, crowd, index):
+        self.crowd = crowd
+        self.index = index
+        self.generation = 0
+    
+    @property
+    def base_size(self):
+        return self.crowd.base_size
+    
+    @property
+    def assets(self):
+        return self.crowd.assets
+    
+    def update_screen_position(self):
+        self.crowd.update_screen_positions(self.index, self.index + 1)
+
+
+class ArrayCrowd(Crowd):
+    """Crowd แบบ structure-of-arrays (NumPy)
+    เก็บ x, z, screen_x, screen_y, scale, shoot_cooldown เป็น array ต่อเนื่อง
+    แล้วขยับทุกคนเข้าฟอร์เมชั่นในขั้นตอน vectorized เดียว แทนการวนทีละ Person"""
+    def __init__(self, assets=None, formation=None, rng=None):
+        if np is None:
+            raise RuntimeError("ArrayCrowd ต้องใช้ NumPy (pip install numpy)")
+        super().__init__(assets, formation, rng)
+    
+    def _init_storage(self):
+        self.x = np.zeros(MAX_SIMULATED)
+        self.z = np.zeros(MAX_SIMULATED)
+        self.screen_x = np.zeros(MAX_SIMULATED)
+        self.screen_y = np.zeros(MAX_SIMULATED)
+        self.scale = np.ones(MAX_SIMULATED)
+        self.shoot_cooldown = np.zeros(MAX_SIMULATED, dtype=np.int32)
+        self.pool = None
+        self.views = []  # ArrayPerson ต่อ index (สร้างครั้งเดียว ใช้ซ้ำเมื่อ index ว่างแล้วกลับมา)
+    
+    def _append_people(self, positions):
+        start = len(self.people)
+        end = start + len(positions)
+        if positions:
+            xs, zs = zip(*positions)
+            self.x[start:end] = xs
+            self.z[start:end] = zs
+        self.shoot_cooldown[start:end] = 0
+        views = self.views
+        for i in range(len(views), end):
+            views.append(ArrayPerson(self, i))
+        for view in views[start:end]:
+            view.generation += 1  # index นี้เป็นคนใหม่แล้ว
+        self.people.extend(views[start:end])
+    
+    def _drop_people(self, amount):
+        people = self.people
+        del people[max(0, len(people) - amount):]
+    
+    def update_all_sizes(self):
+        self.base_size = person_size_for(self.count)
+    
+    def update(self):
+        self.sync_people()
+        num = len(self.people)
+        if num == 0:
+            return
+        
+        offset_x, offset_z = self.formation.offset_arrays(num)
+        target_x = self.center_x + offset_x
+        target_z = self.center_z + offset_z
+        x = self.x[:num]
+        z = self.z[:num]
+        
+        # เคลื่อนทุกคนไปหาเป้าหมายพร้อมกัน (เหมือน Person.update)
+        dx = target_x - x
+        dz = target_z - z
+        dist = np.sqrt(dx * dx + dz * dz)
+        moving = dist > 0.01
+        step = np.divide(0.02, dist, out=np.zeros(num), where=moving)
+        x += dx * step
+        z += dz * step
+        np.clip(x, 0.05, 0.95, out=x)
+        np.clip(z, 0.1, 0.95, out=z)
+        
+        cooldown = self.shoot_cooldown[:num]
+        np.subtract(cooldown, 1, out=cooldown, where=cooldown > 0)
+    
+    def update_screen_positions(self, start=0, end=None):
+        """project_many แบบ vectorized สำหรับช่วง [start, end)"""
+        if end is None:
+            end = len(self.people)
+        (self.screen_x[start:end], self.screen_y[start:end],
+         self.scale[start:end]) = PROJECTION.project_many(self.x[start:end], self.z[start:end])
+    
+    def nearest_index(self, x, z):
+        """หาแบบ brute force ด้วย NumPy (argmin ได้ index แรกเมื่อระยะเท่ากัน)"""
+        num = len(self.people)
+        if num == 0:
+            return None
+        dist = np.sqrt((self.x[:num] - x)**2 + (self.z[:num] - z)**2)
+        return int(np.argmin(dist))
+    
+    def position_arrays(self):
+        num = len(self.people)
+        return self.x[:num], self.z[:num]
+    
+    def nearest_indices(self, points):
+        num = len(self.people)
+        if num == 0 or not points:
+            return [None] * len(points)
+        px, pz = np.array(points, dtype=float).reshape(-1, 2).T
+        dist = np.sqrt((self.x[:num] - px[:, None])**2 + (self.z[:num] - pz[:, None])**2)
+        return np.argmin(dist, axis=1).tolist()
+    
+    def _first_ready_shooter(self):
+        num = len(self.people)
+        if num == 0:
+            return None
+        first = int(np.argmin(self.shoot_cooldown[:num]))
+        if self.shoot_cooldown[first] == 0:
+            return self.people[first]
+        return None
+
+
+CROWD_BACKENDS = {
+    'list': Crowd,
+    'numpy': ArrayCrowd,
+}
+
+def make_crowd(backend=None, assets=None, formation=None, rng=None):
+    """สร้าง Crowd ตาม backend ('list' หรือ 'numpy') และรูปแบบฟอร์เมชั่น"""
+    return CROWD_BACKENDS[backend or CROWD_BACKEND](assets, formation, rng)
+
+
 class Enemy:
+    __slots__ = ('x', 'z', 'hp', 'alive', 'active', 'assets',
+                 'screen_x', 'screen_y', 'scale', 'generation')
+    base_size = 10
+    color = RED
+    speed = 0.006  # ลดความเร็วจาก 0.008 → 0.006
+    NO_ASSETS = {}
+    
     def __init__(self, x, z, assets=None):
+        self.generation = 0  # เพิ่มขึ้นทุกครั้งที่ถูกใช้ซ้ำจาก ObjectPool
+        self.reset(x, z, assets)
+    
+    def reset(self, x, z, assets=None):
         self.x = x  # 0.0 - 1.0
         self.z = z  # 0.0 - 1.0
-        self.base_size = 10
-        self.color = RED
         self.hp = 1
-        self.speed = 0.006  # ลดความเร็วจาก 0.008 → 0.006
         self.alive = True
         self.active = False
-        self.assets = assets or {}
+        self.assets = assets or self.NO_ASSETS
         
         # Cache screen position
         self.screen_x = 0
@@ -275,13 +567,16 @@ class Enemy:
         """คำนวณตำแหน่งบนหน้าจอ (เรียกครั้งเดียวต่อ frame)"""
         self.screen_x, self.screen_y, self.scale = world_to_screen(self.x, self.z)
         
-    def update(self, crowd):
+    def update(self, crowd, target_index=None):
+        """เดินเข้าหาคนที่ใกล้ที่สุด target_index มาจาก crowd.nearest_indices
+        ถ้าคนนั้นถูกลบไปแล้วในเฟรมนี้จะหาใหม่จาก spatial index"""
         if not self.alive or not self.active:
             return
         
         if len(crowd.people) > 0:
-            target = min(crowd.people, key=lambda p: 
-                        math.sqrt((p.x - self.x)**2 + (p.z - self.z)**2))
+            if target_index is None or target_index >= len(crowd.people):
+                target_index = crowd.nearest_index(self.x, self.z)
+            target = crowd.people[target_index]
             
             dx = target.x - self.x
             dz = target.z - self.z
@@ -300,32 +595,293 @@ class Enemy:
         if self.hp <= 0:
             self.alive = False
     
+    def sprite_blit(self):
+        """(sprite, rect) สำหรับวาด หรือ None ถ้าไม่มีรูป"""
+        # ใช้ pre-scaled sprites (ตาราง LOD ตามขนาดบนจอ)
+        lod = self.assets.get('knife_lod')
+        if lod is not None:
+            sprite = lod.sprite(int(self.base_size * self.scale))
+            return sprite, sprite.get_rect(center=(int(self.screen_x), int(self.screen_y)))
+        return None
+    
+    def enqueue(self, queue):
+        if self.alive:
+            blit = self.sprite_blit()
+            if blit:
+                queue.blit(*blit)
+            else:
+                queue.primitive('enemy', self.draw)
+    
     def draw(self, screen):
         if self.alive:
             size = int(self.base_size * self.scale)
             
-            # ใช้ pre-scaled sprites
-            if self.assets.get('knife_sprites'):
-                closest_size = min(self.assets['knife_sprites'].keys(), 
-                                 key=lambda k: abs(k - size))
-                sprite = self.assets['knife_sprites'][closest_size]
-                knife_rect = sprite.get_rect(center=(int(self.screen_x), int(self.screen_y)))
-                screen.blit(sprite, knife_rect)
+            blit = self.sprite_blit()
+            if blit:
+                return screen.blit(*blit)
             else:
-                pygame.draw.circle(screen, self.color, 
+                rect = pygame.draw.circle(screen, self.color, 
                                  (int(self.screen_x), int(self.screen_y)), size)
-                pygame.draw.line(screen, WHITE, 
+                return rect.union(pygame.draw.line(screen, WHITE, 
                                (int(self.screen_x - size), int(self.screen_y)), 
-                               (int(self.screen_x + size), int(self.screen_y)), 2)
+                               (int(self.screen_x + size), int(self.screen_y)), 2))
+        return None
+
+
+class ArrayEnemy(Enemy):
+    """มุมมอง (view) ของศัตรูหนึ่งตัวใน EnemySwarm - ข้อมูลจริงอยู่ใน array ของ swarm
+    แต่ละ view ผูกกับช่อง (slot) เดียวตลอด ช่องที่ว่างแล้วถูกใช้ซ้ำจะเพิ่ม generation"""
+    __slots__ = ('swarm', 'index')
+    
+    x = _array_field('x', owner='swarm')
+    z = _array_field('z', owner='swarm')
+    hp = _array_field('hp', int, owner='swarm')
+    alive = _array_field('alive', bool, owner='swarm')
+    active = _array_field('active', bool, owner='swarm')
+    screen_x = _array_field('screen_x', owner='swarm')
+    screen_y = _array_field('screen_y', owner='swarm')
+    scale = _array_field('scale', owner='swarm')
+    
+    def __init__(self, swarm, index):
+        self.swarm = swarm
+        self.index = index
+        self.generation = 0
+    
+    @property
+    def assets(self):
+        return self.swarm.assets
+
+
+def scroll_enemy(enemy):
+    """เลื่อนศัตรูเข้าหาผู้เล่นหนึ่ง step (perspective-corrected: ช้าตอนอยู่ไกล เร็วตอนอยู่ใกล้)"""
+    perspective_factor = 0.3 + 0.7 * max(0, enemy.z)
+    enemy.z += SCROLL_SPEED * 0.003 * perspective_factor
+
+
+class EnemyList:
+    """ศัตรูแบบ Enemy object ทีละตัว เดินเข้าหาคนที่ใกล้ที่สุดจาก spatial index ของฝูงชน
+    ตัวที่ตาย/หลุดจอคืนเข้า ObjectPool แล้วใช้ซ้ำตอนเกิดใหม่"""
+    backend = 'list'  # ชื่อใน ENEMY_BACKENDS (บันทึกลง replay)
+    def __init__(self):
+        self.pool = ObjectPool(Enemy)
+        self.enemies = []
+    
+    def acquire(self, x, z, assets=None):
+        enemy = self.pool.acquire(x, z, assets)
+        self.enemies.append(enemy)
+        return enemy
+    
+    def scroll(self):
+        for enemy in self.enemies:
+            scroll_enemy(enemy)
+    
+    def activate_all(self):
+        for enemy in self.enemies:
+            enemy.activate()
+    
+    def update(self, crowd):
+        # หาเป้าหมายของศัตรูทุกตัวในครั้งเดียวจาก spatial index ของฝูงชน
+        hunters = [e for e in self.enemies if e.alive and e.active]
+        targets = crowd.nearest_indices([(e.x, e.z) for e in hunters])
+        for enemy, target_index in zip(hunters, targets):
+            enemy.update(crowd, target_index)
+    
+    def cull(self):
+        """ลบตัวที่ตายหรือผ่านไปแล้ว (z >= SCROLL_EXIT_Z) ออกจาก list เดิม"""
+        compact(self.enemies, lambda e: e.alive and e.z < SCROLL_EXIT_Z, self.pool)
+    
+    def update_screen_positions(self):
+        PROJECTION.project_objects(self.enemies)
+    
+    def stats(self):
+        return self.pool.stats()
+
+
+class EnemySwarm:
+    """ศัตรูทั้งฝูงแบบ structure-of-arrays (NumPy)
+    ทุก step สร้าง FlowField จากตำแหน่งฝูงชนครั้งเดียว ศัตรูแต่ละตัวอ่านทิศทางจาก cell ของตัวเอง
+    เฉพาะตัวที่อยู่ติดกับ cell ที่มีคนจึงหาคนที่ใกล้ที่สุดจริง (เล็งตรงตัวและเช็คการชน)
+    การชนทั้งหมดของ step รวมเป็นการ remove_people ครั้งเดียว
+    enemies เป็น list ของ ArrayEnemy ตามลำดับที่เกิด ใช้วาด/ยิง/interpolate ได้เหมือน Enemy"""
+    backend = 'numpy'  # ชื่อใน ENEMY_BACKENDS (บันทึกลง replay)
+    ARRAYS = ('x', 'z', 'hp', 'alive', 'active', 'screen_x', 'screen_y', 'scale')
+    
+    def __init__(self, capacity=ENEMY_CAPACITY):
+        if np is None:
+            raise RuntimeError("EnemySwarm ต้องใช้ NumPy (pip install numpy)")
+        self.capacity = capacity
+        self.x = np.zeros(capacity)
+        self.z = np.zeros(capacity)
+        self.hp = np.zeros(capacity, dtype=np.int32)
+        self.alive = np.zeros(capacity, dtype=bool)
+        self.active = np.zeros(capacity, dtype=bool)
+        self.screen_x = np.zeros(capacity)
+        self.screen_y = np.zeros(capacity)
+        self.scale = np.ones(capacity)
+        self.assets = Enemy.NO_ASSETS
+        self.field = FlowField()
+        self.views = []      # ArrayEnemy ต่อ slot
+        self.free = []       # slot ที่ว่าง
+        self.enemies = []
+        self._slots = None   # slot ของ enemies ตามลำดับ (cache จนกว่าจะมีตัวเกิด/ถูกลบ)
+        self.spawned = 0
+    
+    def _grow(self):
+        for name in self.ARRAYS:
+            old = getattr(self, name)
+            grown = np.zeros(self.capacity * 2, dtype=old.dtype)
+            grown[:self.capacity] = old
+            setattr(self, name, grown)
+        self.capacity *= 2
+    
+    def slots(self):
+        if self._slots is None:
+            self._slots = np.fromiter((e.index for e in self.enemies), np.intp, len(self.enemies))
+        return self._slots
+    
+    def acquire(self, x, z, assets=None):
+        if self.free:
+            i = self.free.pop()
+        else:
+            i = len(self.views)
+            if i >= self.capacity:
+                self._grow()
+            self.views.append(ArrayEnemy(self, i))
+        if assets:
+            self.assets = assets
+        self.x[i] = x
+        self.z[i] = z
+        self.hp[i] = 1
+        self.alive[i] = True
+        self.active[i] = False
+        view = self.views[i]
+        view.generation += 1  # slot นี้เป็นศัตรูตัวใหม่แล้ว
+        self.enemies.append(view)
+        self._slots = None
+        self.spawned += 1
+        return view
+    
+    def scroll(self):
+        slots = self.slots()
+        z = self.z[slots]
+        self.z[slots] = z + SCROLL_SPEED * 0.003 * (0.3 + 0.7 * np.maximum(0, z))
+    
+    def activate_all(self):
+        self.active[self.slots()] = True
+    
+    def update(self, crowd):
+        slots = self.slots()
+        hunters = slots[self.alive[slots] & self.active[slots]]
+        if len(hunters) == 0 or not crowd.people:
+            return
+        px, pz = crowd.position_arrays()
+        self.field.build(px, pz)
+        x = self.x[hunters]
+        z = self.z[hunters]
+        tx, tz, near = self.field.lookup(x, z)
+        
+        # ตัวที่อยู่ใกล้ฝูงเล็งคนที่ใกล้ที่สุดจริง (เหมือน Enemy.update)
+        close = np.flatnonzero(near)
+        if len(close):
+            dist_sq = (x[close, None] - px)**2 + (z[close, None] - pz)**2
+            nearest = np.argmin(dist_sq, axis=1)
+            tx[close] = px[nearest]
+            tz[close] = pz[nearest]
+        
+        dx = tx - x
+        dz = tz - z
+        dist = np.sqrt(dx*dx + dz*dz)
+        moving = dist > 0.01
+        safe = np.where(moving, dist, 1.0)
+        self.x[hunters] = x + np.where(moving, (dx / safe) * Enemy.speed, 0.0)
+        self.z[hunters] = z + np.where(moving, (dz / safe) * Enemy.speed, 0.0)
+        
+        # ชนคน: ศัตรูตาย คนหายตัวละหนึ่งคน (รวมทั้ง step เป็นครั้งเดียว)
+        contact = near & (dist < 0.03)
+        contacts = int(contact.sum())
+        if contacts:
+            self.alive[hunters[contact]] = False
+            crowd.remove_people(contacts)
+    
+    def cull(self):
+        """ลบตัวที่ตายหรือผ่านไปแล้ว (z >= SCROLL_EXIT_Z) slot ของตัวที่ถูกลบกลับไปรอใช้ซ้ำ"""
+        slots = self.slots()
+        keep = self.alive[slots] & (self.z[slots] < SCROLL_EXIT_Z)
+        if keep.all():
+            return
+        self.free.extend(slots[~keep].tolist())
+        self.enemies[:] = [e for e, k in zip(self.enemies, keep.tolist()) if k]
+        self._slots = slots[keep]
+    
+    def update_screen_positions(self):
+        slots = self.slots()
+        self.screen_x[slots], self.screen_y[slots], self.scale[slots] = PROJECTION.project_many(
+            self.x[slots], self.z[slots])
+    
+    def stats(self):
+        """รูปแบบเดียวกับ ObjectPool.stats() (slot ที่ว่างนับเป็น free)"""
+        created = len(self.views)
+        reused = self.spawned - created
+        return {
+            'live': len(self.enemies),
+            'free': len(self.free),
+            'created': created,
+            'reused': reused,
+            'released': self.spawned - len(self.enemies),
+            'discarded': 0,
+            'reuse_rate': reused / self.spawned if self.spawned else 0.0,
+        }
+
+
+ENEMY_BACKENDS = {
+    'list': EnemyList,
+    'numpy': EnemySwarm,
+}
+
+def make_enemies(backend=None):
+    """สร้างระบบศัตรูตาม backend ('list', 'numpy' หรือ 'auto' = numpy ถ้ามี)"""
+    backend = backend or ENEMY_BACKEND
+    if backend == 'auto':
+        backend = 'numpy' if np is not None else 'list'
+    return ENEMY_BACKENDS[backend]()
+
+
+def swept_hit_time(x0, z0, x1, z1, cx, cz, radius):
+    """เวลา t (0-1) แรกสุดบนเส้นทาง (x0, z0) -> (x1, z1) ที่เข้าใกล้จุด (cx, cz) ไม่ถึง radius
+    หรือ None ถ้าไม่ชน (segment vs circle: กระสุนเร็วแค่ไหนก็ไม่ทะลุเป้า)"""
+    sx, sz = x1 - x0, z1 - z0
+    dx, dz = x0 - cx, z0 - cz
+    c = dx*dx + dz*dz - radius*radius
+    if c < 0:
+        return 0.0  # อยู่ในรัศมีตั้งแต่ต้นทาง
+    a = sx*sx + sz*sz
+    if a == 0:
+        return None
+    b = 2 * (sx*dx + sz*dz)
+    disc = b*b - 4*a*c
+    if disc < 0:
+        return None
+    t = (-b - math.sqrt(disc)) / (2*a)
+    return t if 0 <= t <= 1 else None
 
 
 class Bullet:
+    __slots__ = ('x', 'z', 'last_x', 'last_z', 'active', 'target', 'target_generation',
+                 'screen_x', 'screen_y', 'scale', 'generation')
+    speed = BULLET_STEP
+    radius = BULLET_HIT_RADIUS
+    
     def __init__(self, x, z, target):
-        self.x = x
-        self.z = z
-        self.speed = 0.03
+        self.generation = 0  # เพิ่มขึ้นทุกครั้งที่ถูกใช้ซ้ำจาก ObjectPool
+        self.reset(x, z, target)
+    
+    def reset(self, x, z, target):
+        self.x = self.last_x = x
+        self.z = self.last_z = z  # ตำแหน่งต้น step (ใช้เช็คชนตลอดเส้นทาง)
         self.active = True
         self.target = target
+        # ศัตรูอาจตายแล้วถูกใช้ซ้ำเป็นตัวใหม่ เก็บ generation ไว้เช็คว่ายังเป็นตัวเดิม
+        self.target_generation = target.generation if target is not None else 0
         
         # Cache screen position
         self.screen_x = 0
@@ -340,10 +896,12 @@ class Bullet:
         if not self.active:
             return
             
-        if not self.target or not self.target.alive:
+        target = self.target
+        if not target or not target.alive or target.generation != self.target_generation:
             self.active = False
             return
         
+        self.last_x, self.last_z = self.x, self.z
         dx = self.target.x - self.x
         dz = self.target.z - self.z
         dist = math.sqrt(dx*dx + dz*dz)
@@ -355,22 +913,289 @@ class Bullet:
         if self.z < -0.1 or self.z > 1.1 or self.x < -0.1 or self.x > 1.1:
             self.active = False
     
-    def check_hit_zone(self, enemy_zones):
-        """ใช้ zone-based collision detection (เร็วกว่า O(n²))"""
-        zone = int(self.z * 10)  # แบ่งเป็น 10 zones
-        enemies_in_zone = enemy_zones.get(zone, [])
-        
-        for enemy in enemies_in_zone:
+    def check_hit_zone(self, spatial_hash, rank=None):
+        """เช็คชนตลอดเส้นทางของ step นี้ (last -> ปัจจุบัน) กับศัตรูจาก spatial hash
+        ถ้าเส้นทางผ่านหลายตัว โดนตัวที่เจอก่อน (t น้อยสุด)
+        rank: id(ศัตรู) -> ลำดับใน game.enemies ใช้ตัดสินเมื่อ t เท่ากัน (เช่นอยู่ในรัศมีหลายตัวตั้งแต่ต้นทาง)
+        ให้ได้ตัวเดียวกับ BulletManager ไม่ขึ้นกับลำดับ cell ของ spatial hash"""
+        if not self.active:
+            return False
+        x0, z0, x1, z1 = self.last_x, self.last_z, self.x, self.z
+        reach = self.radius + 0.5 * math.sqrt((x1 - x0)**2 + (z1 - z0)**2)
+        first, first_t = None, None
+        for enemy in spatial_hash.query('enemy', (x0 + x1) / 2, (z0 + z1) / 2, reach):
             if enemy.alive:
-                dist = math.sqrt((enemy.x - self.x)**2 + (enemy.z - self.z)**2)
-                if dist < 0.03:
-                    enemy.take_damage()
-                    self.active = False
-                    return True
-        return False
+                t = swept_hit_time(x0, z0, x1, z1, enemy.x, enemy.z, self.radius)
+                if t is None:
+                    continue
+                if (first_t is None or t < first_t or
+                        (t == first_t and rank is not None and rank[id(enemy)] < rank[id(first)])):
+                    first, first_t = enemy, t
+        if first is None:
+            return False
+        first.take_damage()
+        self.active = False
+        return True
+    
+    _sprites = {}  # รัศมี -> Surface วงกลม (ใช้ร่วมกันทุกนัด)
+    
+    @classmethod
+    def sprite(cls, radius):
+        """วงกลมสีเหลืองรัศมี radius วาดครั้งเดียวแล้วเก็บไว้ blit ซ้ำ (pixel เหมือน draw.circle)"""
+        sprite = cls._sprites.get(radius)
+        if sprite is None:
+            sprite = pygame.Surface((2 * radius + 1, 2 * radius + 1))
+            sprite.set_colorkey(BLACK)
+            pygame.draw.circle(sprite, YELLOW, (radius, radius), radius)
+            sprite = cls._sprites[radius] = sprite
+        return sprite
+    
+    def enqueue(self, queue):
+        """กระสุนเป็น sprite วงกลมที่ cache ไว้ จึงรวม batch blits() กับ sprite อื่นได้"""
+        if self.active:
+            radius = max(2, int(4 * self.scale))
+            queue.blit(self.sprite(radius),
+                       (int(self.screen_x) - radius, int(self.screen_y) - radius))
     
     def draw(self, screen):
         if self.active:
             size = int(4 * self.scale)
-            pygame.draw.circle(screen, YELLOW, 
-                             (int(self.screen_x), int(self.screen_y)), max(2, size))
\ No newline at end of file
+            return pygame.draw.circle(screen, YELLOW, 
+                             (int(self.screen_x), int(self.screen_y)), max(2, size))
+
+class ArrayBullet(Bullet):
+    """มุมมอง (view) ของกระสุนหนึ่งนัดใน BulletManager - ข้อมูลจริงอยู่ใน array ของ manager
+    view ใน manager.bullets เป็นนัดที่ยังวิ่งอยู่เสมอ"""
+    __slots__ = ('manager', 'index')
+    active = True
+    
+    x = _array_field('x', owner='manager')
+    z = _array_field('z', owner='manager')
+    screen_x = _array_field('screen_x', owner='manager')
+    screen_y = _array_field('screen_y', owner='manager')
+    scale = _array_field('scale', owner='manager')
+    
+    def __init__(self, manager, index):
+        self.manager = manager
+        self.index = index
+        self.generation = 0
+
+
+class BulletList:
+    """กระสุนแบบ Bullet object ทีละนัด (ใช้เมื่อไม่มี NumPy) นัดที่หมดแล้วคืนเข้า ObjectPool"""
+    backend = 'list'  # ชื่อใน BULLET_BACKENDS (บันทึกลง replay)
+    def __init__(self):
+        self.pool = ObjectPool(Bullet)
+        self.bullets = []
+    
+    def acquire(self, x, z, target):
+        """ยิงนัดใหม่ (Person.shoot เรียกผ่าน interface เดียวกับ ObjectPool)"""
+        bullet = self.pool.acquire(x, z, target)
+        self.bullets.append(bullet)
+        return bullet
+    
+    def update(self, enemies, spatial_hash):
+        if not self.bullets:
+            return
+        rank = {id(enemy): i for i, enemy in enumerate(enemies)}
+        for bullet in self.bullets:
+            bullet.update()
+            bullet.check_hit_zone(spatial_hash, rank)
+        compact(self.bullets, lambda b: b.active, self.pool)
+    
+    def update_screen_positions(self):
+        PROJECTION.project_objects(self.bullets)
+    
+    def stats(self):
+        return self.pool.stats()
+
+
+class BulletManager:
+    """กระสุนทั้งหมดแบบ structure-of-arrays (NumPy)
+    ขยับเข้าหาเป้าหมายและเช็คชนแบบ swept (segment vs circle) กับศัตรูทุกตัวใน step vectorized เดียว
+    ผลเหมือน BulletList: กระสุนโดนศัตรูตัวแรกบนเส้นทาง (t เท่ากันเลือกตัวที่มาก่อนใน enemies)
+    ถ้าหลายนัดโดนตัวเดียวกัน นัดแรกในแถวได้ไป
+    เป้าหมายเก็บเป็นตาราง (Enemy, generation) ที่ไม่ซ้ำกัน แต่ละนัดเก็บแค่ index ในตาราง
+    (ทั้งฝูงมักยิงเป้าเดียวกัน ตารางจึงเล็กมาก)
+    bullets เป็น list ของ ArrayBullet (index 0..n-1) ใช้วาด/interpolate ได้เหมือน Bullet"""
+    backend = 'numpy'  # ชื่อใน BULLET_BACKENDS (บันทึกลง replay)
+    ARRAYS = ('x', 'z', 'screen_x', 'screen_y', 'scale', 'target_slot')
+    
+    def __init__(self, capacity=BULLET_CAPACITY):
+        if np is None:
+            raise RuntimeError("BulletManager ต้องใช้ NumPy (pip install numpy)")
+        self.capacity = capacity
+        self.x = np.zeros(capacity)
+        self.z = np.zeros(capacity)
+        self.screen_x = np.zeros(capacity)
+        self.screen_y = np.zeros(capacity)
+        self.scale = np.ones(capacity)
+        self.target_slot = np.zeros(capacity, dtype=np.intp)  # index ใน target_table ต่อนัด
+        self.target_table = []  # [(Enemy, generation ตอนยิง), ...]
+        self.target_lookup = {}  # (id(Enemy), generation) -> index ใน target_table
+        self.views = []
+        self.bullets = []
+        self.fired = 0
+    
+    def _grow(self):
+        for name in self.ARRAYS:
+            old = getattr(self, name)
+            grown = np.zeros(self.capacity * 2, dtype=old.dtype)
+            grown[:self.capacity] = old
+            setattr(self, name, grown)
+        self.capacity *= 2
+    
+    def _target_index(self, target):
+        generation = target.generation if target is not None else 0
+        key = (id(target), generation)
+        slot = self.target_lookup.get(key)
+        if slot is None:
+            slot = self.target_lookup[key] = len(self.target_table)
+            self.target_table.append((target, generation))
+        return slot
+    
+    def acquire(self, x, z, target):
+        i = len(self.bullets)
+        if i >= self.capacity:
+            self._grow()
+        self.x[i] = x
+        self.z[i] = z
+        self.target_slot[i] = self._target_index(target)
+        if i == len(self.views):
+            self.views.append(ArrayBullet(self, i))
+        view = self.views[i]
+        view.generation += 1  # index นี้เป็นนัดใหม่แล้ว
+        self.bullets.append(view)
+        self.fired += 1
+        return view
+    
+    def update(self, enemies, spatial_hash=None):
+        n = len(self.bullets)
+        if n == 0:
+            return
+        x = self.x[:n]
+        z = self.z[:n]
+        x0 = x.copy()
+        z0 = z.copy()
+        
+        # ตำแหน่งเป้าหมาย (เป้าที่ตายแล้วหรือถูกใช้ซ้ำเป็นตัวใหม่ = กระสุนหมด)
+        valid = [target is not None and target.alive and target.generation == generation
+                 for target, generation in self.target_table]
+        table_x = np.array([target.x if ok else 0.0
+                            for (target, _), ok in zip(self.target_table, valid)])
+        table_z = np.array([target.z if ok else 0.0
+                            for (target, _), ok in zip(self.target_table, valid)])
+        slot = self.target_slot[:n]
+        active = np.array(valid, dtype=bool)[slot]
+        
+        # homing (เหมือน Bullet.update)
+        dx = np.where(active, table_x[slot] - x, 0.0)
+        dz = np.where(active, table_z[slot] - z, 0.0)
+        dist = np.sqrt(dx*dx + dz*dz)
+        moving = dist > 0.01
+        safe = np.where(moving, dist, 1.0)
+        x += np.where(moving, (dx / safe) * Bullet.speed, 0.0)
+        z += np.where(moving, (dz / safe) * Bullet.speed, 0.0)
+        active &= (z >= -0.1) & (z <= 1.1) & (x >= -0.1) & (x <= 1.1)
+        
+        # swept hit กับศัตรูที่ยังมีชีวิต (เหมือน swept_hit_time ทุกคู่พร้อมกัน)
+        hunters = [e for e in enemies if e.alive and e.active]
+        if hunters and active.any():
+            ex = np.array([e.x for e in hunters])
+            ez = np.array([e.z for e in hunters])
+            sx = (x - x0)[:, None]
+            sz = (z - z0)[:, None]
+            rx = x0[:, None] - ex
+            rz = z0[:, None] - ez
+            c = rx*rx + rz*rz - Bullet.radius * Bullet.radius
+            a = sx*sx + sz*sz
+            b = 2 * (sx*rx + sz*rz)
+            disc = b*b - 4*a*c
+            with np.errstate(divide='ignore', invalid='ignore'):
+                t = (-b - np.sqrt(disc)) / (2*a)
+            hit = (c < 0) | ((a > 0) & (disc >= 0) & (t >= 0) & (t <= 1))
+            hit &= active[:, None]
+            if hit.any():
+                self._resolve_hits(hit, np.where(c < 0, 0.0, np.where(hit, t, np.inf)),
+                                   hunters, active)
+        
+        self._compact(active)
+    
+    def _resolve_hits(self, hit, t, hunters, active):
+        """ทำดาเมจตามลำดับนัด (เหมือนวนทีละนัดใน BulletList) นัดที่โดนมีไม่มากจึงวนใน Python
+        ศัตรูที่ตายแล้วไม่ถูกนับซ้ำ และนัดหลังจากนั้นที่เล็งตัวที่ตายไปแล้วก็หมดไปด้วย"""
+        killed = {}  # id(ศัตรู) -> index ของนัดที่ฆ่า
+        table, slot = self.target_table, self.target_slot
+        for i in np.flatnonzero(hit.any(axis=1)).tolist():
+            target = table[slot[i]][0]
+            if target is not None and id(target) in killed:
+                active[i] = False
+                continue
+            # stable: t เท่ากันได้ตัวที่มาก่อนใน hunters (ลำดับเดียวกับ enemies เหมือน BulletList)
+            for j in np.argsort(t[i], kind='stable').tolist():
+                if not hit[i, j]:
+                    break
+                enemy = hunters[j]
+                if enemy.alive:
+                    enemy.take_damage()
+                    active[i] = False
+                    if not enemy.alive:
+                        killed[id(enemy)] = i
+                    break
+        if killed:
+            order = np.arange(len(active))
+            for k, (target, _) in enumerate(table):
+                killer = killed.get(id(target))
+                if killer is not None:
+                    active &= ~((slot[:len(active)] == k) & (order > killer))
+    
+    def _compact(self, keep):
+        """ลบนัดที่หมดแล้ว เลื่อนนัดที่เหลือมาต่อกันโดยรักษาลำดับเดิม แล้วตัดเป้าที่ไม่มีใครเล็งออกจากตาราง"""
+        n = len(keep)
+        kept = int(keep.sum())
+        if kept == n:
+            return
+        first = int(np.argmin(keep))  # index แรกที่ถูกลบ ตั้งแต่ตรงนี้ view แสดงนัดอื่นแล้ว
+        for name in self.ARRAYS:
+            array = getattr(self, name)
+            array[:kept] = array[:n][keep]
+        used, self.target_slot[:kept] = np.unique(self.target_slot[:kept], return_inverse=True)
+        self.target_table = [self.target_table[k] for k in used.tolist()]
+        self.target_lookup = {(id(target), generation): k
+                              for k, (target, generation) in enumerate(self.target_table)}
+        for view in self.views[first:kept]:
+            view.generation += 1
+        del self.bullets[kept:]
+    
+    def update_screen_positions(self):
+        n = len(self.bullets)
+        self.screen_x[:n], self.screen_y[:n], self.scale[:n] = PROJECTION.project_many(
+            self.x[:n], self.z[:n])
+    
+    def stats(self):
+        """รูปแบบเดียวกับ ObjectPool.stats() (ช่อง array ที่ว่างนับเป็น free)"""
+        live = len(self.bullets)
+        created = len(self.views)
+        reused = self.fired - created
+        return {
+            'live': live,
+            'free': created - live,
+            'created': created,
+            'reused': reused,
+            'released': self.fired - live,
+            'discarded': 0,
+            'reuse_rate': reused / self.fired if self.fired else 0.0,
+        }
+
+
+BULLET_BACKENDS = {
+    'list': BulletList,
+    'numpy': BulletManager,
+}
+
+def make_bullets(backend=None):
+    """สร้างระบบกระสุนตาม backend ('list', 'numpy' หรือ 'auto' = numpy ถ้ามี)"""
+    backend = backend or BULLET_BACKEND
+    if backend == 'auto':
+        backend = 'numpy' if np is not None else 'list'
+    return BULLET_BACKENDS[backend]()
@@ -0,0 +1,111 @@
+"""
+Formation layouts for the crowd (precomputed per crowd count)
+"""
+import math
+from constants import *
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# ============================================
+# Formation Shapes - คืนค่า offset (dx, dz) จากจุดกลางฝูง
+# ============================================
+def ring_offsets(count):
+    """วงแหวนซ้อนกันรอบจุดกลาง — วงในคนน้อย วงนอกคนมากขึ้น"""
+    offsets = []
+    max_people_per_ring = 12
+    ring = 0
+    while len(offsets) < count:
+        people_in_ring = min(max_people_per_ring + ring * 3, count - len(offsets))
+        radius = 0.03 + ring * 0.04
+        for i in range(people_in_ring):
+            angle = (i / people_in_ring) * math.pi * 2
+            offsets.append((math.cos(angle) * radius,
+                            math.sin(angle) * radius * 0.3))  # ยืดนิดให้วงรี
+        ring += 1
+    return offsets
+
+def wedge_offsets(count):
+    """รูปลิ่ม (V) หัวแหลมชี้ไปข้างหน้า แถวถัดไปกว้างขึ้นทีละคน จัดกึ่งกลางที่จุดกลางฝูง
+    ความลึกรวมไม่เกิน WEDGE_DEPTH และแถวหลังสุดกว้างไม่เกิน WEDGE_WIDTH
+    (ฝูงใหญ่จึงบีบระยะแถว/ระยะคนลง แทนที่จะยื่นเลยขอบที่ Person ถูก clamp)"""
+    rows = math.ceil((math.sqrt(8 * count + 1) - 1) / 2)  # แถว r มี r + 1 คน
+    row_gap = min(0.02, WEDGE_DEPTH / max(1, rows - 1))
+    col_gap = min(0.035, WEDGE_WIDTH / max(1, rows - 1))
+    offsets = []
+    row = 0
+    while len(offsets) < count:
+        people_in_row = min(row + 1, count - len(offsets))
+        dz = (row - (rows - 1) / 2) * row_gap
+        for i in range(people_in_row):
+            offsets.append(((i - (people_in_row - 1) / 2) * col_gap, dz))
+        row += 1
+    return offsets
+
+def grid_offsets(count):
+    """ตารางสี่เหลี่ยม กว้างกว่าลึก จัดกึ่งกลางที่จุดกลางฝูง"""
+    cols = max(1, math.ceil(math.sqrt(count * 3)))
+    rows = math.ceil(count / cols)
+    offsets = []
+    for i in range(count):
+        row, col = divmod(i, cols)
+        offsets.append(((col - (cols - 1) / 2) * 0.03,
+                        (row - (rows - 1) / 2) * 0.02))
+    return offsets
+
+FORMATION_SHAPES = {
+    'rings': ring_offsets,
+    'wedge': wedge_offsets,
+    'grid': grid_offsets,
+}
+
+
+class FormationTable:
+    """ตาราง offset ของฟอร์เมชั่นสำหรับทุกจำนวนตัวแทน 1..max_count
+    layout ขึ้นกับจำนวนคนอย่างเดียว ต่อเฟรมจึงแค่บวก center_x / center_z"""
+    def __init__(self, shape='rings', max_count=MAX_SIMULATED):
+        self.shape = shape
+        self.layout = FORMATION_SHAPES[shape]
+        self.max_count = max_count
+        self.table = {}   # count -> [(dx, dz), ...]
+        self.arrays = {}  # count -> (dx array, dz array) สำหรับ ArrayCrowd
+
+    def offsets(self, count):
+        """offset ของจำนวน count คน (คำนวณครั้งแรกที่ถูกขอ)"""
+        offsets = self.table.get(count)
+        if offsets is None:
+            offsets = self.table[count] = self.layout(count)
+        return offsets
+
+    def offset_arrays(self, count):
+        """offset เป็น NumPy array คู่ (dx, dz)"""
+        arrays = self.arrays.get(count)
+        if arrays is None:
+            offsets = self.offsets(count)
+            arrays = self.arrays[count] = (np.array([dx for dx, _ in offsets]),
+                                           np.array([dz for _, dz in offsets]))
+        return arrays
+
+    def targets(self, count, center_x, center_z):
+        """ตำแหน่งเป้าหมายจริง (เลื่อน offset ไปที่จุดกลางฝูง)"""
+        return [(center_x + dx, center_z + dz) for dx, dz in self.offsets(count)]
+
+    def precompute(self, arrays=False):
+        """คำนวณทุกจำนวนคนล่วงหน้า (เรียกตอนเริ่มเกม)"""
+        for count in range(1, self.max_count + 1):
+            self.offsets(count)
+            if arrays and np is not None:
+                self.offset_arrays(count)
+        return self
+
+
+FORMATION_CACHE = {}
+
+def get_formation(shape=None):
+    """ดึง FormationTable ที่ใช้ร่วมกันทุก Crowd"""
+    shape = shape or FORMATION_SHAPE
+    if shape not in FORMATION_CACHE:
+        FORMATION_CACHE[shape] = FormationTable(shape)
+    return FORMATION_CACHE[shape]
@@ -3,20 +3,48 @@ Main Game class
 """
 import pygame
 import random
+from itertools import chain
 from constants import *
-from utils import world_to_screen, get_road_bounds
-from entities import Crowd, Enemy, Bullet
+from utils import PROJECTION, get_road_bounds
+from entities import make_crowd, make_bullets, make_enemies
 from game_objects import Gate, LavaPit
+from scroll import ScrollTrack
+from spatial import SpatialHash
+from pool import compact
+from render import RenderQueue, DepthOrder
+from hud import Hud
 
 class Game:
-    def __init__(self, level, assets=None):
+    def __init__(self, level, assets=None, crowd_backend=None, formation=None, seed=None,
+                 bullet_backend=None, enemy_backend=None):
         self.level = level
         self.assets = assets or {}
-        self.crowd = Crowd(self.assets)
+        self.crowd_backend = crowd_backend
+        self.bullet_backend = bullet_backend
+        self.enemy_backend = enemy_backend
+        self.formation = formation
+        # สุ่มทุกอย่างในเกมจาก RNG ของเกมเอง: seed เดียวกัน + input เดียวกัน = เล่นซ้ำได้ตรงทุกบิต
+        self.seed = seed if seed is not None else random.randrange(2**32)
+        self.rng = random.Random(self.seed)
+        self.frame = 0  # จำนวน step ที่ simulate ไปแล้ว (ใช้อ้างอิง input ตอนบันทึก/เล่นซ้ำ)
+        self.crowd = make_crowd(crowd_backend, self.assets, formation, self.rng)
+        # ศัตรูและกระสุนอยู่ในระบบของแต่ละประเภท (object ทีละตัว หรือ array)
+        # enemies / bullets คือ list ของตัวที่ยังอยู่ (ระบบแก้ list เดิม ไม่สร้างใหม่)
+        self.enemy_system = make_enemies(enemy_backend)
+        self.bullet_system = make_bullets(bullet_backend)
+        # gate และบ่อลาวาไม่ขยับเอง z ของมันคำนวณจากเวลาของถนน (ไม่ต้องเลื่อนทุก step)
+        self.track = ScrollTrack()
         self.gates = []
-        self.enemies = []
-        self.bullets = []
+        self.enemies = self.enemy_system.enemies
+        self.bullets = self.bullet_system.bullets
         self.lava_pits = []
+        self.spatial_hash = SpatialHash()
+        self.render_queue = RenderQueue()
+        self.depth_order = DepthOrder()
+        self.background = None  # สร้างตอนวาดครั้งแรก (ต้องรู้ขนาดจอ)
+        self.hud = Hud()
+        self.interpolator = None  # timing.Interpolator ถ้าวาดแบบผสมระหว่าง step
+        self.profiler = None      # profiler.FrameProfiler ถ้าเปิดจับเวลาแต่ละช่วง
         self.distance = 0
         self.spawn_timer = 0
         self.game_over = False
@@ -31,24 +59,25 @@ class Game:
     
     def reset(self):
         """รีเซ็ตเกมโดยสร้างใหม่"""
-        self.__init__(self.level, self.assets)
+        self.__init__(self.level, self.assets, self.crowd_backend, self.formation, self.seed,
+                      self.bullet_backend, self.enemy_backend)
         self.start_game()
         
     def spawn_gate(self):
-        self.gates.append(Gate(0.0, self.level))  # เริ่มที่ด้านหลัง
+        self.gates.append(Gate(0.0, self.level, self.rng, self.track))  # เริ่มที่ด้านหลัง
     
     def spawn_enemies(self):
-        num_enemies = random.randint(8, 15)
-        z = random.uniform(-0.2, 0.0)  # spawn ด้านหลัง
+        num_enemies = self.rng.randint(*ENEMY_WAVE)
+        z = self.rng.uniform(-0.2, 0.0)  # spawn ด้านหลัง
         for _ in range(num_enemies):
-            x = random.uniform(0.1, 0.9)
-            self.enemies.append(Enemy(x, z, self.assets))
+            x = self.rng.uniform(0.1, 0.9)
+            self.enemy_system.acquire(x, z, self.assets)
     
     def spawn_lava_pit(self):
         if self.level >= 2:
-            x = random.uniform(0.2, 0.8)
-            z = random.uniform(-0.3, 0.0)
-            self.lava_pits.append(LavaPit(x, z))
+            x = self.rng.uniform(0.2, 0.8)
+            z = self.rng.uniform(-0.3, 0.0)
+            self.lava_pits.append(LavaPit(x, z, self.rng, self.track))
     
     def start_game(self):
         """เริ่มเกมด้วย gate และ enemies ทันที"""
@@ -57,80 +86,97 @@ class Game:
         if self.level >= 2:
             self.spawn_lava_pit()
     
-    def build_enemy_zones(self):
-        """สร้าง zone-based spatial partition สำหรับ collision detection"""
-        zones = {}
+    def build_spatial_hash(self):
+        """สร้าง spatial hash 2D ของเฟรมนี้ ใช้ร่วมกันทั้ง bullet, lava และ gate"""
+        grid = SpatialHash()
+        frame = self.frame
         for enemy in self.enemies:
             if enemy.alive and enemy.active:
-                zone = int(enemy.z * 10)
-                zones.setdefault(zone, []).append(enemy)
-        return zones
+                grid.insert('enemy', enemy, enemy.x, enemy.z)
+        if any(lava.active and lava.in_reach(frame) for lava in self.lava_pits):
+            # ใส่คนเฉพาะเมื่อมีบ่อลาวาอยู่ในระยะชน (เก็บเป็น index เพราะคนอาจถูกลบกลางเฟรม)
+            for i, person in enumerate(self.crowd.people):
+                grid.insert('person', i, person.x, person.z)
+        for gate in self.gates:
+            if not gate.used and gate.in_reach(frame):
+                grid.insert_span('gate', gate, 0.0, 1.0, gate.z, gate.z)
+        return grid
     
     def update(self):
         if self.game_over or self.won:
             return
         
-        # เลื่อนวัตถุเข้ามาหาผู้เล่น (เพิ่ม z)
-        # ใช้ perspective-corrected speed: ช้าตอนอยู่ไกล เร็วตอนอยู่ใกล้
-        for gate in self.gates:
-            perspective_factor = 0.3 + 0.7 * max(0, gate.z)  # 0.3-1.0 based on depth
-            gate.z += SCROLL_SPEED * 0.003 * perspective_factor
-            gate.update_screen_position()
+        self.frame += 1
+        prof = self.profiler
+        if prof is not None:
+            prof.start()
         
-        for enemy in self.enemies:
-            perspective_factor = 0.3 + 0.7 * max(0, enemy.z)
-            enemy.z += SCROLL_SPEED * 0.003 * perspective_factor
-            enemy.update_screen_position()
+        if self.interpolator is not None:
+            # gate / ลาวา ไม่ต้องเก็บ: ตอนวาดคำนวณ z จากเวลาเศษส่วนของถนนได้เลย
+            self.interpolator.capture((self.enemies, self.bullets, self.crowd.people))
         
-        for lava in self.lava_pits:
-            perspective_factor = 0.3 + 0.7 * max(0, lava.z)
-            lava.z += SCROLL_SPEED * 0.003 * perspective_factor
-            lava.update_screen_position()
+        # เลื่อนวัตถุเข้ามาหาผู้เล่น (เพิ่ม z)
+        # ใช้ perspective-corrected speed: ช้าตอนอยู่ไกล เร็วตอนอยู่ใกล้
+        # gate / ลาวาแค่เลื่อนเวลาของถนน (z รูปปิด) ศัตรูเดินเองด้วยจึงยังบวกทีละ step
+        self.track.time = self.frame
+        self.enemy_system.scroll()
+        if prof is not None:
+            prof.mark('scroll')
         
         # Randomized spawning (ไม่ predictable)
         self.spawn_timer += 1
         if self.spawn_timer >= self.next_gate_time:
             self.spawn_gate()
-            self.next_gate_time = self.spawn_timer + random.randint(180, 260)
+            self.next_gate_time = self.spawn_timer + self.rng.randint(180, 260)
         
         if self.spawn_timer >= self.next_enemy_time:
             self.spawn_enemies()
-            self.next_enemy_time = self.spawn_timer + random.randint(220, 280)
+            self.next_enemy_time = self.spawn_timer + self.rng.randint(220, 280)
         
         if self.level >= 2 and self.spawn_timer >= self.next_lava_time:
             self.spawn_lava_pit()
-            self.next_lava_time = self.spawn_timer + random.randint(300, 400)
+            self.next_lava_time = self.spawn_timer + self.rng.randint(300, 400)
+        if prof is not None:
+            prof.mark('spawn')
         
         self.crowd.update()
+        if prof is not None:
+            prof.mark('crowd')
         
-        new_bullets = self.crowd.try_shoot(self.enemies)
-        self.bullets.extend(new_bullets)
+        self.crowd.try_shoot(self.enemies, self.bullet_system)
+        if prof is not None:
+            prof.mark('shooting')
         
-        # Zone-based collision detection
-        enemy_zones = self.build_enemy_zones()
+        # Spatial hash 2D สำหรับ collision detection (สร้างครั้งเดียวต่อเฟรม)
+        self.spatial_hash = self.build_spatial_hash()
         
-        for bullet in self.bullets:
-            bullet.update()
-            bullet.update_screen_position()
-            bullet.check_hit_zone(enemy_zones)
+        self.bullet_system.update(self.enemies, self.spatial_hash)
+        if prof is not None:
+            prof.mark('bullets')
         
-        for enemy in self.enemies:
-            enemy.update(self.crowd)
+        self.enemy_system.update(self.crowd)
+        if prof is not None:
+            prof.mark('enemies')
         
+        frame = self.frame
         for lava in self.lava_pits:
-            lava.check_collision(self.crowd)
+            if lava.in_reach(frame):
+                lava.check_collision(self.crowd, self.spatial_hash)
+        if prof is not None:
+            prof.mark('lava')
         
-        for gate in self.gates:
+        for gate in self.gates_near_crowd():
             if gate.check_collision(self.crowd):
                 self.gates_passed += 1
-                for enemy in self.enemies:
-                    enemy.activate()
+                self.enemy_system.activate_all()
+        if prof is not None:
+            prof.mark('gates')
         
-        # ลบวัตถุที่ผ่านไปแล้ว (z > 1.2)
-        self.gates = [g for g in self.gates if g.z < 1.2]
-        self.enemies = [e for e in self.enemies if e.alive and e.z < 1.2]
-        self.bullets = [b for b in self.bullets if b.active]
-        self.lava_pits = [l for l in self.lava_pits if l.active and l.z < 1.2]
+        # ลบวัตถุที่ผ่านไปแล้ว (z >= SCROLL_EXIT_Z, gate / ลาวารู้ step นั้นล่วงหน้า)
+        # (ลบออกจาก list เดิม ไม่สร้าง list ใหม่ทุกเฟรม)
+        compact(self.gates, lambda g: frame < g.exit_frame)
+        self.enemy_system.cull()
+        compact(self.lava_pits, lambda l: l.active and frame < l.exit_frame)
         
         self.distance += SCROLL_SPEED
         
@@ -139,12 +185,69 @@ class Game:
         
         if self.gates_passed >= self.gates_needed:
             self.won = True
+        if prof is not None:
+            prof.mark('cull')
+        
+        self.update_screen_positions()
+        if prof is not None:
+            prof.mark('project')
+    
+    def update_screen_positions(self):
+        """คำนวณตำแหน่งบนหน้าจอของทุก object ในรอบเดียว หลังทุกอย่างขยับเสร็จแล้ว"""
+        self.crowd.update_screen_positions()
+        self.enemy_system.update_screen_positions()
+        self.bullet_system.update_screen_positions()
+        PROJECTION.project_objects(chain(self.gates, self.lava_pits))
+    
+    def place_track(self, time):
+        """ตั้งเวลาของถนน (เศษส่วนได้ ใช้ตอนวาดแบบ interpolate) แล้ว project gate / ลาวาใหม่"""
+        self.track.time = time
+        PROJECTION.project_objects(chain(self.gates, self.lava_pits))
     
-    def draw(self, screen, fonts):
+    def pool_stats(self):
+        """สถิติของ object pool แต่ละประเภท (จำนวนที่ใช้อยู่/ว่าง/ใช้ซ้ำ)"""
+        stats = {
+            'bullet': self.bullet_system.stats(),
+            'enemy': self.enemy_system.stats(),
+        }
+        if self.crowd.pool is not None:
+            stats['person'] = self.crowd.pool.stats()
+        return stats
+    
+    def gates_near_crowd(self):
+        """gate ที่อยู่ใกล้แถวหน้าของฝูงชนพอจะชนได้ในเฟรมนี้"""
+        if not self.crowd.people:
+            return []
+        front = self.crowd.people[0]
+        return self.spatial_hash.query('gate', self.crowd.center_x, front.z, 0.08)
+    
+    def draw_order(self):
+        """ทุก object ที่ต้องวาด เรียงตาม z (ไกลไปใกล้) ซ่อมจากลำดับของเฟรมก่อน"""
+        # คนส่วนเกินจาก MAX_SIMULATED วาดรวมเป็นก้อนเดียว
+        impostors = []
+        if self.crowd.hidden_count > 0:
+            self.crowd.impostor.update()
+            impostors.append(self.crowd.impostor)
+        
+        return self.depth_order.update((
+            ('gate', self.gates),
+            ('lava', self.lava_pits),
+            ('enemy', self.enemies),
+            ('bullet', self.bullets),
+            ('person', self.crowd.people),
+            ('impostor', impostors),
+        ))
+    
+    def build_background(self, size):
+        """วาดฉากที่ไม่เคยเปลี่ยน (stage + ถนน + เส้นถนน) ลง surface เดียวไว้ล่วงหน้า"""
+        background = pygame.Surface(size)
+        if pygame.display.get_surface() is not None:
+            background = background.convert()
+        
         if self.assets.get('stage'):
-            screen.blit(self.assets['stage'], (0, 0))
+            background.blit(self.assets['stage'], (0, 0))
         else:
-            screen.fill(BLACK)
+            background.fill(BLACK)
         
         # วาดถนนแบบ 3D perspective
         road_points = [
@@ -153,11 +256,11 @@ class Game:
             (ROAD_BOTTOM_RIGHT, ROAD_BOTTOM_Y), # ล่างขวา
             (ROAD_BOTTOM_LEFT, ROAD_BOTTOM_Y)   # ล่างซ้าย
         ]
-        pygame.draw.polygon(screen, GRAY, road_points)
-        pygame.draw.polygon(screen, WHITE, road_points, 5)
+        pygame.draw.polygon(background, GRAY, road_points)
+        pygame.draw.polygon(background, WHITE, road_points, 5)
         
         # วาดเส้นถนนตรงกลาง
-        pygame.draw.line(screen, YELLOW, 
+        pygame.draw.line(background, YELLOW, 
                         (WIDTH // 2, ROAD_TOP_Y), 
                         (WIDTH // 2, ROAD_BOTTOM_Y), 3)
         
@@ -166,136 +269,88 @@ class Game:
             z = i * 0.25
             left, right = get_road_bounds(z)
             screen_y = ROAD_TOP_Y + (ROAD_BOTTOM_Y - ROAD_TOP_Y) * z
-            pygame.draw.line(screen, (100, 100, 100), 
+            pygame.draw.line(background, (100, 100, 100), 
                            (int(left), int(screen_y)), 
                            (int(right), int(screen_y)), 1)
-        
-        # เรียง object ตาม z เพื่อวาดจากไกลไปใกล้
-        all_objects = []
-        
-        for gate in self.gates:
-            all_objects.append(('gate', gate, gate.z))
-        
-        for lava in self.lava_pits:
-            all_objects.append(('lava', lava, lava.z))
-        
-        for enemy in self.enemies:
-            all_objects.append(('enemy', enemy, enemy.z))
-        
-        for bullet in self.bullets:
-            all_objects.append(('bullet', bullet, bullet.z))
-        
-        for person in self.crowd.people:
-            all_objects.append(('person', person, person.z))
-        
-        # เรียงตาม z (ไกลไปใกล้)
-        all_objects.sort(key=lambda x: x[2])
-        
-        # วาดทุก object
-        for obj_type, obj, _ in all_objects:
-            obj.draw(screen)
+        return background
+    
+    def get_background(self, screen):
+        """background ที่ cache ไว้ (สร้างใหม่เมื่อขนาดจอเปลี่ยน)"""
+        size = screen.get_size()
+        if self.background is None or self.background.get_size() != size:
+            self.background = self.build_background(size)
+        return self.background
+    
+    def end_screen_key(self):
+        """key ของหน้าจอจบด่านที่กำลังแสดง (None = ยังเล่นอยู่)"""
+        if self.game_over:
+            return ('game_over',)
+        if self.won:
+            return ('victory', self.level, self.crowd.count)
+        return None
+    
+    def draw(self, screen, fonts, dirty=None, alpha=1.0):
+        """วาดหนึ่งเฟรม ถ้าให้ dirty (DirtyRects) มา จะคืนฉากหลังเฉพาะบริเวณที่เฟรมก่อนวาดทับ
+        และบันทึกบริเวณที่เฟรมนี้วาดไว้ให้ dirty.present() อัปเดตจอเฉพาะส่วนนั้น
+        alpha < 1 (และมี interpolator) วาดวัตถุที่ตำแหน่งระหว่าง step ก่อนหน้ากับ step ล่าสุด"""
+        prof = self.profiler
+        if prof is not None:
+            prof.start()
+        background = self.get_background(screen)
+        if dirty is None:
+            # ฉากหลังที่ไม่เปลี่ยน blit ครั้งเดียวจาก cache
+            screen.blit(background, (0, 0))
+        else:
+            # หน้าจอจบด่านเป็นภาพนิ่ง วาดเต็มจอครั้งเดียวแล้วค้างไว้จนกว่าจะเปลี่ยน
+            end_key = self.end_screen_key()
+            if dirty.hold(end_key):
+                return
+            if end_key is not None:
+                dirty.invalidate()
+            dirty.begin(screen, background)
+        if prof is not None:
+            prof.mark('background')
+        
+        # ใส่ทุก object ลงคิวตามลำดับความลึก แล้ววาดทีเดียว (sprite ติดกันใช้ blits() ครั้งเดียว)
+        queue = self.render_queue
+        order = self.draw_order()
+        saved = None
+        if self.interpolator is not None and alpha < 1.0:
+            saved = self.interpolator.apply(order, alpha)
+            self.place_track(self.frame - 1 + alpha)
+        if prof is not None:
+            prof.mark('sort')
+        for obj in order:
+            obj.enqueue(queue)
+        rects = queue.flush(screen, [] if dirty is not None else None)
+        if saved is not None:
+            self.interpolator.restore(saved)
+            self.place_track(self.frame)
+        if prof is not None:
+            prof.mark('draw')
         
         # HUD with transparent overlay
-        self._draw_hud(screen, fonts)
+        hud_rects = self._draw_hud(screen, fonts)
+        if dirty is not None:
+            dirty.extend(rects)
+            dirty.extend(hud_rects)
         
         if self.game_over:
             self._draw_game_over(screen, fonts)
         
         if self.won:
             self._draw_victory(screen, fonts)
+        if prof is not None:
+            prof.mark('hud')
     
     def _draw_hud(self, screen, fonts):
-        """วาด HUD"""
-        font, small_font, big_font = fonts['font'], fonts['small_font'], fonts['big_font']
-        
-        # Crowd Counter
-        count_box = pygame.Surface((180, 80), pygame.SRCALPHA)
-        count_box.fill((30, 30, 30, 180))  # โปร่งแสง
-        screen.blit(count_box, (10, 10))
-        pygame.draw.rect(screen, CYAN, pygame.Rect(10, 10, 180, 80), 3)
-        count_label = small_font.render("CROWD", True, CYAN)
-        screen.blit(count_label, (20, 15))
-        count_text = big_font.render(f"{self.crowd.count}", True, WHITE)
-        screen.blit(count_text, (25, 40))
-        
-        # Level Box
-        level_box = pygame.Surface((180, 80), pygame.SRCALPHA)
-        level_box.fill((30, 30, 30, 180))
-        screen.blit(level_box, (WIDTH - 190, 10))
-        pygame.draw.rect(screen, YELLOW, pygame.Rect(WIDTH - 190, 10, 180, 80), 3)
-        level_label = small_font.render("LEVEL", True, YELLOW)
-        screen.blit(level_label, (WIDTH - 175, 15))
-        level_text = big_font.render(f"{self.level}", True, WHITE)
-        screen.blit(level_text, (WIDTH - 155, 40))
-        
-        # Gates Counter
-        gates_box = pygame.Surface((180, 60), pygame.SRCALPHA)
-        gates_box.fill((30, 30, 30, 180))
-        screen.blit(gates_box, (10, 100))
-        pygame.draw.rect(screen, GREEN, pygame.Rect(10, 100, 180, 60), 3)
-        gates_label = small_font.render("GATES", True, GREEN)
-        screen.blit(gates_label, (20, 105))
-        gates_text = font.render(f"{self.gates_passed}/{self.gates_needed}", True, WHITE)
-        screen.blit(gates_text, (25, 125))
+        """วาด HUD (กล่องที่ประกอบไว้แล้ว วาดใหม่เฉพาะเมื่อค่าเปลี่ยน)"""
+        return self.hud.draw(screen, self, fonts)
     
     def _draw_game_over(self, screen, fonts):
         """วาดหน้าจอ Game Over"""
-        font, big_font = fonts['font'], fonts['big_font']
-        
-        # แสดง ai_dead.png เต็มจอก่อน
-        if self.assets.get('ai_dead'):
-            screen.blit(self.assets['ai_dead'], (0, 0))
-        else:
-            overlay = pygame.Surface((WIDTH, HEIGHT))
-            overlay.set_alpha(200)
-            overlay.fill(BLACK)
-            screen.blit(overlay, (0, 0))
-        
-        # ซ้อนทับด้วย game_over image ตรงกลาง
-        if self.assets.get('game_over'):
-            img_x = WIDTH // 2 - 200
-            img_y = HEIGHT // 2 - 150
-            screen.blit(self.assets['game_over'], (img_x, img_y))
-        else:
-            text = big_font.render("GAME OVER!", True, RED)
-            screen.blit(text, (WIDTH//2 - 200, HEIGHT//2 - 50))
-        
-        # แสดงข้อความคำแนะนำ
-        restart_text = font.render("Press R to Restart", True, GREEN)
-        screen.blit(restart_text, (WIDTH//2 - 150, HEIGHT//2 + 180))
-        
-        menu_text = fonts['small_font'].render("Press M for Menu", True, WHITE)
-        screen.blit(menu_text, (WIDTH//2 - 100, HEIGHT//2 + 230))
+        self.hud.draw_game_over(screen, self, fonts)
     
     def _draw_victory(self, screen, fonts):
         """วาดหน้าจอชนะ"""
-        font, small_font, big_font = fonts['font'], fonts['small_font'], fonts['big_font']
-        
-        if self.assets.get('ai_win'):
-            screen.blit(self.assets['ai_win'], (0, 0))
-        else:
-            overlay = pygame.Surface((WIDTH, HEIGHT))
-            overlay.set_alpha(180)
-            overlay.fill(BLACK)
-            screen.blit(overlay, (0, 0))
-        
-        info_box = pygame.Surface((500, 250))
-        info_box.set_alpha(180)
-        info_box.fill(BLACK)
-        screen.blit(info_box, (WIDTH//2 - 250, HEIGHT//2 - 125))
-        
-        text = big_font.render("LEVEL COMPLETE!", True, GREEN)
-        screen.blit(text, (WIDTH//2 - 280, HEIGHT//2 - 100))
-        
-        score_text = font.render(f"Survivors: {self.crowd.count}", True, WHITE)
-        screen.blit(score_text, (WIDTH//2 - 130, HEIGHT//2 - 20))
-        
-        if self.level < 3:
-            next_text = small_font.render("Press N for Next Level", True, GREEN)
-            screen.blit(next_text, (WIDTH//2 - 135, HEIGHT//2 + 40))
-        else:
-            win_text = font.render("YOU WIN THE GAME!", True, YELLOW)
-            screen.blit(win_text, (WIDTH//2 - 200, HEIGHT//2 + 40))
-        
-        menu_text = small_font.render("Press M for Menu", True, WHITE)
-        screen.blit(menu_text, (WIDTH//2 - 100, HEIGHT//2 + 80))
\ No newline at end of file
+        self.hud.draw_victory(screen, self, fonts)
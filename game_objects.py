@@ -5,13 +5,19 @@ import pygame
 import random
 import math
 from constants import *
-from utils import world_to_screen, get_font
+from utils import PROJECTION, world_to_screen, render_text
 from operations import Operation
+from scroll import STILL_TRACK, TrackObject
 
-class Gate:
-    def __init__(self, z, level):
-        self.z = z  # ความลึก 0.0 - 1.0
-        self.depth = GATE_DEPTH
+class Gate(TrackObject):
+    __slots__ = ('used', 'level', 'left_op', 'right_op', 'screen_x', 'screen_y', 'scale')
+    x = 0.5  # ประตูอยู่กลางถนนเสมอ (ใช้ตอน project)
+    depth = GATE_DEPTH
+    corner_cache = {}  # z -> มุมของประตู (ทุกประตูเลื่อนผ่านค่า z ชุดเดียวกัน จึงใช้ร่วมกันได้)
+    
+    def __init__(self, z, level, rng=None, track=STILL_TRACK):
+        rng = rng or random
+        self.place(track, z)  # ความลึก 0.0 - 1.0 (เลื่อนไปกับ track)
         self.used = False
         self.level = level
         
@@ -31,14 +37,14 @@ class Gate:
             op_types = ['add_subtract', 'multiply_divide', 'power_sqrt', 'extreme_divide']
         
         # สุ่มเลือกประเภท operation
-        op_type = random.choice(op_types)
+        op_type = rng.choice(op_types)
         
         # สร้าง operation ตามประเภทที่เลือก
         if op_type == 'add_subtract':
             # ซ้าย: บวก / ขวา: ลบ (ค่าต่างกัน)
-            left_value = random.choice([10, 20, 30, 40, 50])
-            right_value = random.choice([10, 20, 30, 40, 50])
-            if random.random() < 0.5:
+            left_value = rng.choice([10, 20, 30, 40, 50])
+            right_value = rng.choice([10, 20, 30, 40, 50])
+            if rng.random() < 0.5:
                 self.left_op = Operation(f'+{left_value}', lambda c, v=left_value: c.add_people(v))
                 self.right_op = Operation(f'-{right_value}', lambda c, v=right_value: c.remove_people(v))
             else:
@@ -47,9 +53,9 @@ class Gate:
         
         elif op_type == 'multiply_divide':
             # ซ้าย: คูณ / ขวา: หาร (ค่าต่างกัน)
-            left_factor = random.choice([2, 3, 4, 5])
-            right_factor = random.choice([2, 3, 4, 5])
-            if random.random() < 0.5:
+            left_factor = rng.choice([2, 3, 4, 5])
+            right_factor = rng.choice([2, 3, 4, 5])
+            if rng.random() < 0.5:
                 self.left_op = Operation(f'x{left_factor}', lambda c, f=left_factor: c.multiply_people(f))
                 self.right_op = Operation(f'÷{right_factor}', lambda c, f=right_factor: c.divide_people(f))
             else:
@@ -58,8 +64,8 @@ class Gate:
         
         elif op_type == 'power_sqrt':
             # ซ้าย: ยกกำลัง / ขวา: รากที่สอง (หรือตรงกันข้าม)
-            power_val = random.choice([2, 3])
-            if random.random() < 0.5:
+            power_val = rng.choice([2, 3])
+            if rng.random() < 0.5:
                 self.left_op = Operation(f'^{power_val}', lambda c, p=power_val: c.power_people(p))
                 self.right_op = Operation('√', lambda c: c.sqrt_people())
             else:
@@ -68,11 +74,11 @@ class Gate:
         
         elif op_type == 'extreme_divide':
             # ระดับ 3: หารจำนวนมาก vs คูณเล็กน้อย (ค่าต่างกัน)
-            left_divide = random.choice([10, 15, 20])
-            right_divide = random.choice([10, 15, 20])
-            left_multiply = random.choice([2, 3])
-            right_multiply = random.choice([2, 3])
-            if random.random() < 0.5:
+            left_divide = rng.choice([10, 15, 20])
+            right_divide = rng.choice([10, 15, 20])
+            left_multiply = rng.choice([2, 3])
+            right_multiply = rng.choice([2, 3])
+            if rng.random() < 0.5:
                 self.left_op = Operation(f'÷{left_divide}', lambda c, d=left_divide: c.divide_people(d))
                 self.right_op = Operation(f'x{right_multiply}', lambda c, m=right_multiply: c.multiply_people(m))
             else:
@@ -81,7 +87,25 @@ class Gate:
     
     def update_screen_position(self):
         """คำนวณตำแหน่งบนหน้าจอ (เรียกครั้งเดียวต่อ frame)"""
-        self.screen_x, self.screen_y, self.scale = world_to_screen(0.5, self.z)
+        self.screen_x, self.screen_y, self.scale = world_to_screen(self.x, self.z)
+    
+    @classmethod
+    def corners(cls, z, cache=True):
+        """(top_y, bottom_y, (ซ้าย, กลาง, ขวา) ด้านบน, (ซ้าย, กลาง, ขวา) ด้านล่าง) ของประตูที่ความลึก z
+        cache=False สำหรับ z ที่ไม่น่าจะซ้ำ (ระหว่าง step ตอน interpolate) ไม่ให้ไล่ค่าที่ใช้ซ้ำออกจาก cache"""
+        corners = cls.corner_cache.get(z) if cache else None
+        if corners is None:
+            rows = []
+            for edge_z in (z - cls.depth/2, z + cls.depth/2):
+                left, right, y, _ = PROJECTION.lookup(edge_z)
+                rows.append((y, tuple(left + (right - left) * x for x in (0.0, 0.5, 1.0))))
+            (top_y, top_xs), (bottom_y, bottom_xs) = rows
+            corners = (top_y, bottom_y, top_xs, bottom_xs)
+            if cache:
+                if len(cls.corner_cache) >= GATE_CORNER_CACHE_SIZE:
+                    cls.corner_cache.clear()
+                cls.corner_cache[z] = corners
+        return corners
     
     def check_collision(self, crowd):
         if self.used or len(crowd.people) == 0:
@@ -98,15 +122,21 @@ class Gate:
                 return True
         return False
     
+    def enqueue(self, queue):
+        if not self.used:
+            queue.primitive('gate', self.draw)
+    
     def draw(self, screen):
         if not self.used:
             gate_color = CYAN
             
+            # ค่า z ตอนอยู่บน step เต็มซ้ำกันทุกประตู (เกิดที่ z เดียวกัน) ระหว่าง step แทบไม่ซ้ำเลย
+            whole_step = self.track.time % 1 == 0
+            top_y, bottom_y, top_xs, bottom_xs = self.corners(self.z, cache=whole_step)
+            top_left_x, top_mid_x, top_right_x = top_xs
+            bottom_left_x, bottom_mid_x, bottom_right_x = bottom_xs
+            
             # วาดประตูซ้าย
-            top_left_x, top_y, _ = world_to_screen(0.0, self.z - self.depth/2)
-            top_mid_x, _, _ = world_to_screen(0.5, self.z - self.depth/2)
-            bottom_left_x, bottom_y, _ = world_to_screen(0.0, self.z + self.depth/2)
-            bottom_mid_x, _, _ = world_to_screen(0.5, self.z + self.depth/2)
             
             left_gate_points = [
                 (top_left_x, top_y),
@@ -114,52 +144,53 @@ class Gate:
                 (bottom_mid_x - 5, bottom_y),
                 (bottom_left_x, bottom_y)
             ]
-            pygame.draw.polygon(screen, gate_color, left_gate_points)
-            pygame.draw.polygon(screen, BLACK, left_gate_points, 5)
+            rect = pygame.draw.polygon(screen, gate_color, left_gate_points)
+            rect.union_ip(pygame.draw.polygon(screen, BLACK, left_gate_points, 5))
             
-            # วาดข้อความซ้าย (ใช้ font cache)
+            # วาดข้อความซ้าย (ใช้ text cache)
             center_x = (top_left_x + top_mid_x + bottom_left_x + bottom_mid_x) / 4
             center_y = (top_y + bottom_y) / 2
             font_size = int(72 * self.scale)
-            dynamic_font = get_font(font_size)
-            text = dynamic_font.render(self.left_op.symbol, True, WHITE)
+            text = render_text(self.left_op.symbol, font_size, WHITE)
             text_rect = text.get_rect(center=(int(center_x), int(center_y)))
-            screen.blit(text, text_rect)
+            rect.union_ip(screen.blit(text, text_rect))
             
             # วาดประตูขวา
-            top_right_x, _, _ = world_to_screen(1.0, self.z - self.depth/2)
-            bottom_right_x, _, _ = world_to_screen(1.0, self.z + self.depth/2)
-            
             right_gate_points = [
                 (top_mid_x + 5, top_y),
                 (top_right_x, top_y),
                 (bottom_right_x, bottom_y),
                 (bottom_mid_x + 5, bottom_y)
             ]
-            pygame.draw.polygon(screen, gate_color, right_gate_points)
-            pygame.draw.polygon(screen, BLACK, right_gate_points, 5)
+            rect.union_ip(pygame.draw.polygon(screen, gate_color, right_gate_points))
+            rect.union_ip(pygame.draw.polygon(screen, BLACK, right_gate_points, 5))
             
             # วาดข้อความขวา
             center_x = (top_right_x + top_mid_x + bottom_right_x + bottom_mid_x) / 4
-            text = dynamic_font.render(self.right_op.symbol, True, WHITE)
+            text = render_text(self.right_op.symbol, font_size, WHITE)
             text_rect = text.get_rect(center=(int(center_x), int(center_y)))
-            screen.blit(text, text_rect)
+            rect.union_ip(screen.blit(text, text_rect))
             
             # วาดเส้นแบ่งกลาง
-            pygame.draw.line(screen, WHITE, (top_mid_x, top_y), (bottom_mid_x, bottom_y), 8)
+            rect.union_ip(pygame.draw.line(screen, WHITE, (top_mid_x, top_y), (bottom_mid_x, bottom_y), 8))
+            return rect  # พื้นที่ที่วาดทับ (ใช้กับ dirty rect)
+        return None
 
 
-class LavaPit:
+class LavaPit(TrackObject):
     """บ่อลาวาที่จะทำให้สูญเสียคน"""
-    def __init__(self, x, z):
+    __slots__ = ('x', 'damage', 'active', 'offset_phase', 'screen_x', 'screen_y', 'scale')
+    base_width = LAVA_BASE_WIDTH
+    base_height = LAVA_BASE_HEIGHT
+    color = (255, 165, 0)  # ORANGE
+    
+    def __init__(self, x, z, rng=None, track=STILL_TRACK):
+        rng = rng or random
         self.x = x  # 0.0 - 1.0 (ซ้าย-ขวา)
-        self.z = z  # 0.0 - 1.0 (ไกล-ใกล้)
-        self.base_width = LAVA_BASE_WIDTH
-        self.base_height = LAVA_BASE_HEIGHT
-        self.damage = random.randint(5, 15)
+        self.place(track, z)  # 0.0 - 1.0 (ไกล-ใกล้ เลื่อนไปกับ track)
+        self.damage = rng.randint(5, 15)
         self.active = True
-        self.color = (255, 165, 0)  # ORANGE
-        self.offset_phase = random.uniform(0, 360)  # สำหรับ smooth animation
+        self.offset_phase = rng.uniform(0, 360)  # สำหรับ smooth animation
         
         # Cache screen position
         self.screen_x = 0
@@ -170,6 +201,10 @@ class LavaPit:
         """คำนวณตำแหน่งบนหน้าจอ (เรียกครั้งเดียวต่อ frame)"""
         self.screen_x, self.screen_y, self.scale = world_to_screen(self.x, self.z)
         
+    def enqueue(self, queue):
+        if self.active:
+            queue.primitive('lava', self.draw)
+    
     def draw(self, screen):
         """วาดบ่อลาวา"""
         if self.active:
@@ -181,24 +216,34 @@ class LavaPit:
             offset_x = math.sin(math.radians(self.offset_phase)) * 2
             offset_y = math.cos(math.radians(self.offset_phase)) * 2
             
-            pygame.draw.ellipse(screen, self.color, 
+            rect = pygame.draw.ellipse(screen, self.color, 
                               (int(self.screen_x - width//2 + offset_x), 
                                int(self.screen_y - height//2 + offset_y), 
                                width, height))
-            pygame.draw.ellipse(screen, RED, 
+            return rect.union(pygame.draw.ellipse(screen, RED, 
                               (int(self.screen_x - width//2 + offset_x + 5), 
                                int(self.screen_y - height//2 + offset_y + 5), 
-                               max(10, width - 10), max(10, height - 10)))
+                               max(10, width - 10), max(10, height - 10))))
+        return None
     
-    def check_collision(self, crowd):
-        """เช็คชนกับฝูงชน"""
+    def check_collision(self, crowd, spatial_hash=None):
+        """เช็คชนกับฝูงชน (ถ้ามี spatial hash จะดูเฉพาะคนใน cell รอบบ่อ)"""
         if not self.active or len(crowd.people) == 0:
             return False
         
+        people = crowd.people
+        x, z = self.x, self.z  # z คำนวณจาก track อ่านครั้งเดียว
+        if spatial_hash is not None:
+            # index ที่เกินจำนวนคนปัจจุบันคือคนที่ถูกลบไปแล้วในเฟรมนี้
+            nearby = [people[i] for i in spatial_hash.query('person', x, z, 0.08)
+                      if i < len(people)]
+        else:
+            nearby = people
+        
         hit = False
-        for person in crowd.people[:]:
-            dist_x = abs(person.x - self.x)
-            dist_z = abs(person.z - self.z)
+        for person in nearby:
+            dist_x = abs(person.x - x)
+            dist_z = abs(person.z - z)
             
             if dist_x < 0.08 and dist_z < 0.08:
                 hit = True
@@ -218,14 +263,15 @@ class Button:
         self.color = color
         self.hover = False
         
-    def draw(self, screen, font):
+    def draw(self, screen, font_size):
         color = self.color if not self.hover else tuple(min(c + 30, 255) for c in self.color)
         pygame.draw.rect(screen, color, self.rect)
         pygame.draw.rect(screen, WHITE, self.rect, 3)
         
-        text_surf = font.render(self.text, True, WHITE)
+        text_surf = render_text(self.text, font_size, WHITE)
         text_rect = text_surf.get_rect(center=self.rect.center)
         screen.blit(text_surf, text_rect)
+        return self.rect
     
     def check_click(self, pos):
         self.hover = self.rect.collidepoint(pos)
@@ -0,0 +1,135 @@
+"""
+HUD and end-of-level overlays (prerendered, redrawn only when their values change)
+"""
+import pygame
+from constants import *
+from utils import format_count, render_text
+
+
+class HudPanel:
+    """กล่อง HUD โปร่งแสง + ขอบ + label + ตัวเลข ประกอบไว้เป็น surface เดียว
+    สร้างใหม่เฉพาะเมื่อข้อความตัวเลขเปลี่ยน"""
+    def __init__(self, pos, size, color, label, label_pos, value_font, value_pos):
+        self.pos = pos
+        self.size = size
+        self.color = color
+        self.label = label
+        self.label_pos = label_pos    # ตำแหน่ง label ภายในกล่อง
+        self.value_font = value_font  # key ใน fonts
+        self.value_pos = value_pos    # ตำแหน่งตัวเลขภายในกล่อง
+        self.value = None
+        self.surface = None
+        self.renders = 0
+
+    def compose(self, value, fonts):
+        panel = pygame.Surface(self.size, pygame.SRCALPHA)
+        panel.fill((30, 30, 30, 180))  # โปร่งแสง
+        pygame.draw.rect(panel, self.color, panel.get_rect(), 3)
+        panel.blit(render_text(self.label, fonts['small_font'], self.color), self.label_pos)
+        panel.blit(render_text(value, fonts[self.value_font], WHITE), self.value_pos)
+        self.renders += 1
+        return panel
+
+    def draw(self, screen, value, fonts):
+        if value != self.value or self.surface is None:
+            self.surface = self.compose(value, fonts)
+            self.value = value
+        return screen.blit(self.surface, self.pos)
+
+
+class Hud:
+    """HUD ของเกม (crowd / level / gates) และหน้าจอ Game Over / Victory แบบ cache
+    fonts เป็น dict ชื่อ -> ขนาด font (FONT_SIZES) ข้อความทั้งหมด render ผ่าน text cache"""
+    def __init__(self):
+        self.count_panel = HudPanel((10, 10), (180, 80), CYAN, "CROWD",
+                                    (10, 5), 'big_font', (15, 30))
+        self.level_panel = HudPanel((WIDTH - 190, 10), (180, 80), YELLOW, "LEVEL",
+                                    (15, 5), 'big_font', (35, 30))
+        self.gates_panel = HudPanel((10, 100), (180, 60), GREEN, "GATES",
+                                    (10, 5), 'font', (15, 25))
+        self.overlay_key = None
+        self.overlay = None
+
+    def draw(self, screen, game, fonts):
+        """วาดทุกกล่อง แล้วคืน list ของ Rect ที่วาดทับ"""
+        return [
+            self.count_panel.draw(screen, format_count(game.crowd.count), fonts),
+            self.level_panel.draw(screen, f"{game.level}", fonts),
+            self.gates_panel.draw(screen, f"{game.gates_passed}/{game.gates_needed}", fonts),
+        ]
+
+    # ============================================
+    # Overlay screens
+    # ============================================
+    def cached_overlay(self, key, build):
+        if key != self.overlay_key or self.overlay is None:
+            self.overlay = build()
+            self.overlay_key = key
+        return self.overlay
+
+    def draw_game_over(self, screen, game, fonts):
+        overlay = self.cached_overlay(('game_over',),
+                                      lambda: self.build_game_over(game.assets, fonts))
+        return screen.blit(overlay, (0, 0))
+
+    def draw_victory(self, screen, game, fonts):
+        key = ('victory', game.level, game.crowd.count)
+        overlay = self.cached_overlay(key, lambda: self.build_victory(game, fonts))
+        return screen.blit(overlay, (0, 0))
+
+    def build_game_over(self, assets, fonts):
+        """วาดหน้าจอ Game Over ลง layer เดียว"""
+        font, small_font, big_font = fonts['font'], fonts['small_font'], fonts['big_font']
+        layer = pygame.Surface((WIDTH, HEIGHT), pygame.SRCALPHA)
+
+        # แสดง ai_dead.png เต็มจอก่อน
+        if assets.get('ai_dead'):
+            layer.blit(assets['ai_dead'], (0, 0))
+        else:
+            layer.fill((*BLACK, 200))
+
+        # ซ้อนทับด้วย game_over image ตรงกลาง
+        if assets.get('game_over'):
+            layer.blit(assets['game_over'], (WIDTH // 2 - 200, HEIGHT // 2 - 150))
+        else:
+            text = render_text("GAME OVER!", big_font, RED)
+            layer.blit(text, (WIDTH//2 - 200, HEIGHT//2 - 50))
+
+        # แสดงข้อความคำแนะนำ
+        restart_text = render_text("Press R to Restart", font, GREEN)
+        layer.blit(restart_text, (WIDTH//2 - 150, HEIGHT//2 + 180))
+
+        menu_text = render_text("Press M for Menu", small_font, WHITE)
+        layer.blit(menu_text, (WIDTH//2 - 100, HEIGHT//2 + 230))
+        return layer
+
+    def build_victory(self, game, fonts):
+        """วาดหน้าจอชนะลง layer เดียว"""
+        font, small_font, big_font = fonts['font'], fonts['small_font'], fonts['big_font']
+        layer = pygame.Surface((WIDTH, HEIGHT), pygame.SRCALPHA)
+
+        if game.assets.get('ai_win'):
+            layer.blit(game.assets['ai_win'], (0, 0))
+        else:
+            layer.fill((*BLACK, 180))
+
+        info_box = pygame.Surface((500, 250), pygame.SRCALPHA)
+        info_box.fill((*BLACK, 180))
+        layer.blit(info_box, (WIDTH//2 - 250, HEIGHT//2 - 125))
+
+        text = render_text("LEVEL COMPLETE!", big_font, GREEN)
+        layer.blit(text, (WIDTH//2 - 280, HEIGHT//2 - 100))
+
+        score_text = render_text(f"Survivors: {game.crowd.count:,}", font, WHITE)
+        layer.blit(score_text, (WIDTH//2 - 130, HEIGHT//2 - 20))
+
+        if game.level < 3:
+            next_text = render_text("Press N for Next Level", small_font, GREEN)
+            layer.blit(next_text, (WIDTH//2 - 135, HEIGHT//2 + 40))
+        else:
+            win_text = render_text("YOU WIN THE GAME!", font, YELLOW)
+            layer.blit(win_text, (WIDTH//2 - 200, HEIGHT//2 + 40))
+
+        menu_text = render_text("Press M for Menu", small_font, WHITE)
+        layer.blit(menu_text, (WIDTH//2 - 100, HEIGHT//2 + 80))
+        return layer
@@ -1,41 +1,90 @@
 """
 Math Crowd Runner - Main executable file
 """
+import argparse
+import random
+import time
 import pygame
 from constants import *
-from utils import load_resources, init_font_cache
+from utils import load_resources, init_font_cache, render_text
 from game import Game
 from game_objects import Button
+from render import DirtyRects
+from timing import FixedStepClock, Interpolator
+from replay import Replay, apply_action, state_digest
+from profiler import FrameProfiler, ProfilerOverlay
+from entities import CROWD_BACKENDS, BULLET_BACKENDS, ENEMY_BACKENDS
+from formation import FORMATION_SHAPES, get_formation
 
 class MathCrowdRunner:
-    def __init__(self):
+    def __init__(self, dirty_rects=USE_DIRTY_RECTS, time_scale=1.0,
+                 interpolate=RENDER_INTERPOLATION, seed=None, record_path=None,
+                 profile=False, profile_out=None):
         pygame.init()
         
         # Initialize font cache after pygame.init()
         init_font_cache()
         
+        # คำนวณตารางฟอร์เมชั่นล่วงหน้า (ถ้าเปิดไว้ แลกเวลาเปิดเกมกับการไม่กระตุกตอนฝูงโตครั้งแรก)
+        if FORMATION_PRECOMPUTE:
+            get_formation().precompute()
+        
         # ตั้งค่าหน้าจอ
         self.screen = pygame.display.set_mode((WIDTH, HEIGHT))
         pygame.display.set_caption("Math Crowd Runner")
         self.clock = pygame.time.Clock()
         
-        # โหลดทรัพยากรและฟอนต์
+        # โหลดทรัพยากร (ฟอนต์เก็บเป็นขนาด แล้ว render ผ่าน text cache)
         self.assets = load_resources()
-        self.fonts = {
-            'font': pygame.font.Font(None, 48),
-            'small_font': pygame.font.Font(None, 28),
-            'big_font': pygame.font.Font(None, 72),
-            'huge_font': pygame.font.Font(None, 36)
-        }
+        self.fonts = dict(FONT_SIZES)
         
         # Game State
         self.game_state = "MENU"
         self.current_level = 1
         self.game = None
         self.running = True
+        
+        # อัปเดตจอเฉพาะบริเวณที่เปลี่ยน (None = flip เต็มจอทุกเฟรม)
+        self.dirty = DirtyRects() if dirty_rects else None
+        self.view = None  # (game_state, game) ที่แสดงอยู่ เปลี่ยนเมื่อไหร่ต้องวาดเต็มจอ
+        
+        # simulation เดินเป็น step คงที่ แยกจากความเร็วการวาด
+        self.sim_clock = FixedStepClock(time_scale=time_scale)
+        self.interpolate = interpolate
+        self.frame_time = 0.0  # เวลาจริงของเฟรมก่อน (วินาที)
+        
+        # seed ของแต่ละเกมสุ่มจาก seed ของ session (ให้ seed = เล่นซ้ำทั้ง session ได้)
+        self.seeds = random.Random(seed)
+        self.record_path = record_path  # บันทึก input ของเกมล่าสุดเป็น replay (JSON)
+        self.recording = None           # (Replay, Game) ที่กำลังบันทึก
+        
+        # จับเวลาแต่ละช่วงของเฟรม (F3 เปิด/ปิดตารางบนจอ)
+        self.profiler = FrameProfiler()
+        self.profiler_overlay = ProfilerOverlay(self.profiler)
+        self.profile_out = profile_out
+        self.profiling = profile or profile_out is not None
+        self.show_profiler = False
     
     def draw_menu(self):
-        """วาดหน้าเมนู"""
+        """วาดหน้าเมนู (โหมด dirty rect วาดฉากหลังครั้งแรกครั้งเดียว แล้ววาดใหม่แค่ปุ่ม)"""
+        full = self.dirty is None or self.dirty.full
+        if full:
+            self._draw_menu_background()
+        
+        play_btn = Button(WIDTH//2 - 150, 300, 300, 100, "PLAY", GREEN)
+        exit_btn = Button(WIDTH//2 - 150, 440, 300, 100, "EXIT", RED)
+        
+        rects = [play_btn.draw(self.screen, self.fonts['font']),
+                 exit_btn.draw(self.screen, self.fonts['font'])]
+        if self.dirty is not None:
+            self.dirty.extend(rects)
+        
+        if full:
+            self._draw_menu_instructions()
+        
+        return play_btn, exit_btn
+    
+    def _draw_menu_background(self):
         if self.assets.get('stage'):
             self.screen.blit(self.assets['stage'], (0, 0))
         else:
@@ -47,25 +96,49 @@ class MathCrowdRunner:
         title_box.fill(BLACK)
         self.screen.blit(title_box, (WIDTH//2 - 350, 130))
         
-        title = self.fonts['big_font'].render("MATH CROWD RUNNER", True, CYAN)
+        title = render_text("MATH CROWD RUNNER", self.fonts['big_font'], CYAN)
         self.screen.blit(title, (WIDTH//2 - 320, 150))
-        
-        play_btn = Button(WIDTH//2 - 150, 300, 300, 100, "PLAY", GREEN)
-        exit_btn = Button(WIDTH//2 - 150, 440, 300, 100, "EXIT", RED)
-        
-        play_btn.draw(self.screen, self.fonts['font'])
-        exit_btn.draw(self.screen, self.fonts['font'])
-        
-        inst_font = pygame.font.Font(None, 24)
-        inst1 = inst_font.render("Level 1: Basic Math (+, -, x)", True, BLACK)
-        inst2 = inst_font.render("Level 2: Advanced (x, ÷, √, ^)", True, BLACK)
-        inst3 = inst_font.render("Level 3: Mixed (all operations)", True, BLACK)
+    
+    def _draw_menu_instructions(self):
+        inst1 = render_text("Level 1: Basic Math (+, -, x)", 24, BLACK)
+        inst2 = render_text("Level 2: Advanced (x, ÷, √, ^)", 24, BLACK)
+        inst3 = render_text("Level 3: Mixed (all operations)", 24, BLACK)
         
         self.screen.blit(inst1, (WIDTH//2 - 150, 560))
         self.screen.blit(inst2, (WIDTH//2 - 160, 590))
         self.screen.blit(inst3, (WIDTH//2 - 140, 620))
-        
-        return play_btn, exit_btn
+    
+    def new_game(self):
+        """เริ่มเกมใหม่ที่ด่าน current_level ด้วย seed ใหม่"""
+        self.game = Game(self.current_level, self.assets, seed=self.seeds.randrange(2**32))
+        self.game.start_game()
+    
+    def input_action(self, action):
+        """ทำ input ('left' / 'right') กับเกม และบันทึก frame ไว้ถ้ากำลังบันทึก"""
+        if self.recording:
+            replay, game = self.recording
+            replay.record(game.frame, action)
+        apply_action(self.game, action)
+    
+    def save_recording(self):
+        """เขียน replay ของเกมที่บันทึกอยู่ลงไฟล์ (ทับของเดิม = เก็บเกมล่าสุด)"""
+        if self.recording and self.record_path:
+            replay, game = self.recording
+            replay.finish(game)
+            replay.save(self.record_path)
+        self.recording = None
+    
+    def attach_profiler(self):
+        """ให้เกมปัจจุบันจับเวลาถ้าเปิด profiler อยู่ (ปิด = None ไม่มีค่าใช้จ่าย)"""
+        if self.game is not None:
+            active = self.profiling or self.show_profiler
+            self.game.profiler = self.profiler if active else None
+    
+    def toggle_profiler_overlay(self):
+        self.show_profiler = not self.show_profiler
+        self.attach_profiler()
+        if self.dirty is not None:
+            self.dirty.invalidate()  # ลบตารางเก่าออกจากจอ
     
     def handle_menu_events(self, event, play_btn, exit_btn):
         """จัดการ event ในหน้าเมนู"""
@@ -74,8 +147,7 @@ class MathCrowdRunner:
             if play_btn.check_click(mouse_pos):
                 self.game_state = "PLAYING"
                 self.current_level = 1
-                self.game = Game(self.current_level, self.assets)
-                self.game.start_game()
+                self.new_game()
                 # เล่นเพลง
                 if self.assets.get('music_loaded'):
                     try:
@@ -93,17 +165,16 @@ class MathCrowdRunner:
                 # เคลื่อนที่เฉพาะตอนกดปุ่ม (step-by-step)
                 if not self.game.game_over and not self.game.won:
                     if event.key == pygame.K_LEFT or event.key == pygame.K_a:
-                        self.game.crowd.move(-PLAYER_SPEED)
+                        self.input_action('left')
                     elif event.key == pygame.K_RIGHT or event.key == pygame.K_d:
-                        self.game.crowd.move(PLAYER_SPEED)
+                        self.input_action('right')
                 
                 # ปุ่มเมื่อแพ้เกม
                 if self.game.game_over:
                     if event.key == pygame.K_r:
                         # Restart ด่านปัจจุบัน
                         self.current_level = 1
-                        self.game = Game(self.current_level, self.assets)
-                        self.game.start_game()
+                        self.new_game()
                         # เล่นเพลงใหม่
                         if self.assets.get('music_loaded'):
                             try:
@@ -124,8 +195,7 @@ class MathCrowdRunner:
                 if self.game and self.game.won:
                     if event.key == pygame.K_n and self.current_level < 3:
                         self.current_level += 1
-                        self.game = Game(self.current_level, self.assets)
-                        self.game.start_game()
+                        self.new_game()
                     elif event.key == pygame.K_m:
                         # กลับเมนู
                         self.game_state = "MENU"
@@ -143,6 +213,10 @@ class MathCrowdRunner:
             for event in pygame.event.get():
                 if event.type == pygame.QUIT:
                     self.running = False
+                if event.type == pygame.VIDEOEXPOSE and self.dirty is not None:
+                    self.dirty.invalidate()
+                if event.type == pygame.KEYDOWN and event.key == pygame.K_F3:
+                    self.toggle_profiler_overlay()
                 
                 if self.game_state == "MENU":
                     play_btn, exit_btn = self.draw_menu()
@@ -150,20 +224,278 @@ class MathCrowdRunner:
                 elif self.game_state == "PLAYING":
                     self.handle_game_events(event)
             
+            # เปลี่ยนหน้าจอ/เริ่มเกมใหม่: พื้นที่ของเฟรมก่อนใช้ไม่ได้แล้ว วาดเต็มจอ
+            view = (self.game_state, self.game)
+            if view != self.view:
+                if self.dirty is not None:
+                    self.dirty.invalidate()
+                if self.game is not None and self.interpolate:
+                    self.game.interpolator = Interpolator()
+                self.attach_profiler()
+                if self.record_path:
+                    self.save_recording()
+                    if self.game is not None:
+                        self.recording = (Replay.for_game(self.game), self.game)
+                self.sim_clock.reset()
+                self.frame_time = 0.0
+            self.view = view
+            
             if self.game_state == "MENU":
                 play_btn, exit_btn = self.draw_menu()
                 play_btn.check_click(mouse_pos)
                 exit_btn.check_click(mouse_pos)
             elif self.game_state == "PLAYING":
                 if self.game:
-                    self.game.update()
-                    self.game.draw(self.screen, self.fonts)
+                    # ไล่ simulation ตามเวลาจริง (เครื่องช้า = หลาย step ต่อการวาดหนึ่งครั้ง)
+                    for _ in range(self.sim_clock.advance(self.frame_time)):
+                        self.game.update()
+                    self.game.draw(self.screen, self.fonts, self.dirty, self.sim_clock.alpha)
+                    if self.show_profiler:
+                        rect = self.profiler_overlay.draw(self.screen)
+                        if self.dirty is not None:
+                            self.dirty.add(rect)
+            
+            prof = self.game.profiler if self.game is not None else None
+            if prof is not None:
+                prof.start()
             
-            pygame.display.flip()
-            self.clock.tick(FPS)
+            if self.dirty is not None:
+                self.dirty.present()
+            else:
+                pygame.display.flip()
+            if prof is not None:
+                prof.mark('present')
+                prof.end_frame()
+            self.frame_time = self.clock.tick(FPS) / 1000.0
         
+        self.save_recording()
+        if self.profile_out:
+            self.profiler.export(self.profile_out)
         pygame.quit()
 
+
+# ============================================
+# Headless Simulation (ไม่มีหน้าต่าง ไม่วาด)
+# ============================================
+def policy_idle(game, frame):
+    """ไม่กดปุ่มเลย"""
+    return 0
+
+def policy_sweep(game, frame):
+    """กดซ้าย-ขวาสลับกันเป็นช่วง ๆ ให้ฝูงชนวิ่งทั้งถนน"""
+    return -1 if (frame // 45) % 2 == 0 else 1
+
+def policy_left(game, frame):
+    """เลือกประตูซ้ายเสมอ"""
+    return -1 if game.crowd.center_x > 0.3 else 0
+
+def policy_right(game, frame):
+    """เลือกประตูขวาเสมอ"""
+    return 1 if game.crowd.center_x < 0.7 else 0
+
+INPUT_POLICIES = {
+    'idle': policy_idle,
+    'sweep': policy_sweep,
+    'left': policy_left,
+    'right': policy_right,
+}
+
+def _percentile(sorted_values, pct):
+    """คืนค่า percentile จาก list ที่เรียงแล้ว (nearest-rank)"""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1,
+                      int(round(pct / 100 * len(sorted_values))) - 1))
+    return sorted_values[rank]
+
+
+class HeadlessRunner:
+    """รัน Game.update() ล้วน ๆ ไม่เรียก set_mode / draw และไม่ล็อก FPS
+    ใช้วัด throughput ของ simulation บนเครื่องที่ไม่มีจอ"""
+    def __init__(self, level=1, policy='sweep', restart=True, crowd_backend=None,
+                 formation=None, seed=None, profiler=None, bullet_backend=None,
+                 enemy_backend=None):
+        self.level = level
+        self.profiler = profiler  # FrameProfiler (None = ไม่จับเวลาแยกช่วง)
+        self.seeds = random.Random(seed)  # seed ของแต่ละเกม (รวมเกมที่เริ่มใหม่) มาจากที่นี่
+        self.crowd_backend = crowd_backend
+        self.bullet_backend = bullet_backend
+        self.enemy_backend = enemy_backend
+        self.formation = formation
+        self.policy = INPUT_POLICIES[policy] if isinstance(policy, str) else policy
+        self.restart = restart  # เริ่มด่านใหม่เมื่อแพ้/ชนะ เพื่อให้วัดเฉพาะเฟรมที่มีการเล่นจริง
+        self.game = None
+        self.restarts = 0
+    
+    def new_game(self):
+        self.game = Game(self.level, crowd_backend=self.crowd_backend,
+                         formation=self.formation, seed=self.seeds.randrange(2**32),
+                         bullet_backend=self.bullet_backend,
+                         enemy_backend=self.enemy_backend)
+        self.game.profiler = self.profiler
+        self.game.start_game()
+    
+    def run(self, frames):
+        """รัน N เฟรม แล้วคืนสถิติเวลา (ms) ต่อเฟรม"""
+        self.new_game()
+        self.restarts = 0
+        frame_times = []
+        
+        for frame in range(frames):
+            if self.game.game_over or self.game.won:
+                if not self.restart:
+                    break
+                self.new_game()
+                self.restarts += 1
+            
+            start = time.perf_counter()
+            direction = self.policy(self.game, frame)
+            if direction:
+                self.game.crowd.move(direction * PLAYER_SPEED)
+            self.game.update()
+            frame_times.append(time.perf_counter() - start)
+            if self.profiler is not None:
+                self.profiler.end_frame()
+        
+        return self.summarize(frame_times)
+    
+    def run_replay(self, replay):
+        """เล่น replay ซ้ำ จับเวลาต่อเฟรม และตรวจว่า state สุดท้ายตรงกับตอนบันทึก"""
+        self.level = replay.level
+        self.restarts = 0
+        self.game = replay.new_game()
+        self.game.profiler = self.profiler
+        stamps = [time.perf_counter()]
+        def on_frame(game):
+            stamps.append(time.perf_counter())
+            if self.profiler is not None:
+                self.profiler.end_frame()
+        replay.play(self.game, on_frame)
+        stats = self.summarize([end - start for start, end in zip(stamps, stamps[1:])])
+        stats['digest'] = state_digest(self.game)
+        stats['digest_ok'] = replay.digest is None or stats['digest'] == replay.digest
+        return stats
+    
+    def summarize(self, frame_times):
+        total = sum(frame_times)
+        ordered = sorted(frame_times)
+        return {
+            'level': self.level,
+            'frames': len(frame_times),
+            'restarts': self.restarts,
+            'total_s': total,
+            'fps': len(frame_times) / total if total > 0 else 0.0,
+            'p50_ms': _percentile(ordered, 50) * 1000,
+            'p99_ms': _percentile(ordered, 99) * 1000,
+            'max_ms': (ordered[-1] * 1000) if ordered else 0.0,
+        }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Math Crowd Runner")
+    parser.add_argument('--headless', action='store_true',
+                        help="รัน simulation อย่างเดียว ไม่เปิดหน้าต่าง แล้วรายงานความเร็ว")
+    parser.add_argument('--level', type=int, default=1, choices=(1, 2, 3))
+    parser.add_argument('--frames', type=int, default=3000)
+    parser.add_argument('--policy', default='sweep', choices=sorted(INPUT_POLICIES))
+    parser.add_argument('--crowd-backend', default=None, choices=sorted(CROWD_BACKENDS),
+                        help=f"storage ของฝูงชน (ค่าเริ่มต้น: {CROWD_BACKEND})")
+    parser.add_argument('--bullet-backend', default=None,
+                        choices=sorted(BULLET_BACKENDS) + ['auto'],
+                        help=f"ระบบกระสุน (ค่าเริ่มต้น: {BULLET_BACKEND})")
+    parser.add_argument('--enemy-backend', default=None,
+                        choices=sorted(ENEMY_BACKENDS) + ['auto'],
+                        help=f"ระบบศัตรู (ค่าเริ่มต้น: {ENEMY_BACKEND})")
+    parser.add_argument('--formation', default=None, choices=sorted(FORMATION_SHAPES),
+                        help=f"รูปแบบฟอร์เมชั่น (ค่าเริ่มต้น: {FORMATION_SHAPE})")
+    parser.add_argument('--precompute', action='store_true',
+                        help="คำนวณตารางฟอร์เมชั่นทั้งหมดก่อนเริ่มวัด")
+    parser.add_argument('--full-flip', action='store_true',
+                        help="วาดและ flip เต็มจอทุกเฟรม (ปิด dirty rect)")
+    parser.add_argument('--seed', type=int, default=None,
+                        help="seed ของการสุ่ม (ค่าเดียวกัน = เกมเหมือนเดิม)")
+    parser.add_argument('--record', metavar='PATH', default=None,
+                        help="บันทึก input ของเกมล่าสุดเป็นไฟล์ replay (JSON)")
+    parser.add_argument('--replay', metavar='PATH', default=None,
+                        help="เล่นไฟล์ replay ซ้ำแบบ headless แล้วตรวจว่าได้ผลตรงกันทุกบิต")
+    parser.add_argument('--profile', action='store_true',
+                        help="จับเวลาแต่ละช่วงของเฟรม (ในเกมกด F3 ดูตาราง)")
+    parser.add_argument('--profile-out', metavar='PATH', default=None,
+                        help="เขียนเวลาแต่ละช่วงของเฟรมล่าสุดเป็น .csv หรือ .json ตอนจบ")
+    parser.add_argument('--time-scale', type=float, default=1.0,
+                        help="ความเร็ว simulation เทียบกับเวลาจริง (เช่น 4 = เร็วขึ้น 4 เท่า)")
+    parser.add_argument('--no-interpolation', action='store_true',
+                        help="วาดที่ตำแหน่งของ step ล่าสุด (ไม่ผสมระหว่าง step)")
+    return parser.parse_args(argv)
+
+def make_profiler(args):
+    return FrameProfiler() if args.profile or args.profile_out else None
+
+def report_profile(profiler, args):
+    if profiler is None:
+        return
+    print(f"  {'phase':<12}{'avg ms':>9}{'p99 ms':>9}")
+    for phase, (mean, p99) in profiler.summary().items():
+        print(f"  {phase:<12}{mean:>9.4f}{p99:>9.4f}")
+    if args.profile_out:
+        profiler.export(args.profile_out)
+
+def report_pools(game):
+    for kind, pool in game.pool_stats().items():
+        print(f"  pool {kind:<7} {pool['live']:>4} live {pool['free']:>4} free | "
+              f"{pool['created']} created, {pool['reused']} reused ({pool['reuse_rate']:.0%})")
+
+def run_replay(args):
+    replay = Replay.load(args.replay)
+    # backend จาก command line แทนที่ค่าที่บันทึกไว้ (เช่นเทียบความเร็วสองระบบกระสุนบน replay เดียวกัน)
+    replay.enemy_backend = args.enemy_backend or replay.enemy_backend
+    replay.bullet_backend = args.bullet_backend or replay.bullet_backend
+    if args.precompute:
+        get_formation(replay.formation).precompute(arrays=replay.crowd_backend == 'numpy')
+    profiler = make_profiler(args)
+    stats = HeadlessRunner(replay.level, profiler=profiler).run_replay(replay)
+    print(f"replay {args.replay} | level {replay.level} | seed {replay.seed} | "
+          f"enemies {replay.enemy_backend or ENEMY_BACKEND} | "
+          f"bullets {replay.bullet_backend or BULLET_BACKEND} | "
+          f"{stats['frames']} frames in {stats['total_s']:.3f}s")
+    print(f"  {stats['fps']:.1f} frames/sec | p50 {stats['p50_ms']:.3f} ms | "
+          f"p99 {stats['p99_ms']:.3f} ms | max {stats['max_ms']:.3f} ms")
+    print(f"  digest {stats['digest']} "
+          f"{'matches recording' if stats['digest_ok'] else 'MISMATCH (expected ' + replay.digest + ')'}")
+    report_profile(profiler, args)
+    return stats
+
+def run_headless(args):
+    if args.replay:
+        return run_replay(args)
+    if args.precompute:
+        get_formation(args.formation).precompute(arrays=args.crowd_backend == 'numpy')
+    profiler = make_profiler(args)
+    runner = HeadlessRunner(args.level, args.policy, crowd_backend=args.crowd_backend,
+                            formation=args.formation, seed=args.seed, profiler=profiler,
+                            bullet_backend=args.bullet_backend,
+                            enemy_backend=args.enemy_backend)
+    stats = runner.run(args.frames)
+    print(f"level {stats['level']} | policy {args.policy} | "
+          f"crowd {args.crowd_backend or CROWD_BACKEND} | "
+          f"bullets {args.bullet_backend or BULLET_BACKEND} | "
+          f"enemies {args.enemy_backend or ENEMY_BACKEND} | "
+          f"{stats['frames']} frames in {stats['total_s']:.3f}s "
+          f"({stats['restarts']} restarts)")
+    print(f"  {stats['fps']:.1f} frames/sec | p50 {stats['p50_ms']:.3f} ms | "
+          f"p99 {stats['p99_ms']:.3f} ms | max {stats['max_ms']:.3f} ms")
+    report_pools(runner.game)
+    report_profile(profiler, args)
+    return stats
+
 if __name__ == "__main__":
-    game = MathCrowdRunner()
-    game.run()
\ No newline at end of file
+    args = parse_args()
+    if args.headless or args.replay:
+        run_headless(args)
+    else:
+        game = MathCrowdRunner(dirty_rects=USE_DIRTY_RECTS and not args.full_flip,
+                               time_scale=args.time_scale,
+                               interpolate=RENDER_INTERPOLATION and not args.no_interpolation,
+                               seed=args.seed, record_path=args.record,
+                               profile=args.profile, profile_out=args.profile_out)
+        game.run()
\ No newline at end of file
@@ -0,0 +1,65 @@
+"""
+Object pools (free list) และการลบสมาชิกออกจาก list แบบ in place
+"""
+from constants import *
+
+
+class ObjectPool:
+    """Free list ของวัตถุประเภทเดียว ใช้ instance เดิมซ้ำแทนการสร้างใหม่ทุกครั้งที่เกิด/ตาย
+    วัตถุต้องมี reset(*args) ที่รับ argument เดียวกับ __init__
+    ทุกครั้งที่ถูกใช้ซ้ำ generation ของวัตถุจะเพิ่มขึ้น ใครที่ถือ reference ข้ามเฟรม
+    (เช่น Bullet.target, Interpolator) ใช้เช็คได้ว่ายังเป็นตัวเดิมอยู่หรือไม่"""
+    def __init__(self, factory, limit=POOL_LIMIT):
+        self.factory = factory
+        self.limit = limit  # เก็บ instance ว่างไว้ไม่เกินนี้ (ที่เหลือปล่อยให้ GC)
+        self.free = []
+        self.live = 0
+        self.created = 0
+        self.reused = 0
+        self.released = 0
+        self.discarded = 0
+
+    def acquire(self, *args):
+        self.live += 1
+        if self.free:
+            obj = self.free.pop()
+            obj.generation += 1
+            obj.reset(*args)
+            self.reused += 1
+            return obj
+        self.created += 1
+        return self.factory(*args)
+
+    def release(self, obj):
+        self.live -= 1
+        if len(self.free) < self.limit:
+            self.free.append(obj)
+            self.released += 1
+        else:
+            self.discarded += 1
+
+    def stats(self):
+        """จำนวนที่ใช้อยู่ / ว่าง และสัดส่วนการใช้ซ้ำ"""
+        acquired = self.created + self.reused
+        return {
+            'live': self.live,
+            'free': len(self.free),
+            'created': self.created,
+            'reused': self.reused,
+            'released': self.released,
+            'discarded': self.discarded,
+            'reuse_rate': self.reused / acquired if acquired else 0.0,
+        }
+
+
+def compact(items, keep, pool=None):
+    """ลบสมาชิกที่ keep(obj) เป็นเท็จออกจาก list เดิม (ไม่สร้าง list ใหม่) รักษาลำดับเดิม
+    สมาชิกที่ถูกลบคืนเข้า pool (ถ้ามี)"""
+    write = 0
+    for obj in items:
+        if keep(obj):
+            items[write] = obj
+            write += 1
+        elif pool is not None:
+            pool.release(obj)
+    del items[write:]
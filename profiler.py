@@ -0,0 +1,129 @@
+"""
+Per-phase frame profiler (ring buffer + on-screen overlay + CSV/JSON export)
+"""
+import csv
+import json
+import time
+from collections import deque
+import pygame
+from constants import *
+from utils import render_text
+
+# ลำดับคอลัมน์: ช่วงของ Game.update แล้วตามด้วยช่วงของการวาด (phase อื่นต่อท้ายตามลำดับที่เจอ)
+PHASE_ORDER = ('scroll', 'spawn', 'crowd', 'shooting', 'bullets', 'enemies', 'lava', 'gates',
+               'cull', 'project', 'background', 'sort', 'draw', 'hud', 'present')
+
+class FrameProfiler:
+    """จับเวลาแต่ละช่วง (phase) ของเฟรม เก็บ PROFILE_HISTORY เฟรมล่าสุดใน ring buffer
+    ใช้งาน: start() ตอนเริ่มช่วงงาน แล้ว mark('phase') เมื่อจบแต่ละช่วง
+    เวลาตั้งแต่ start/mark ก่อนหน้าถึง mark นี้นับเป็นของ phase นั้น (หลาย step ต่อเฟรมจะรวมกัน)
+    end_frame() ปิดเฟรม ถ้าไม่มีใครถือ profiler (game.profiler = None) จะไม่มีค่าใช้จ่ายเลย"""
+    def __init__(self, history=PROFILE_HISTORY):
+        self.frames = deque(maxlen=history)  # [{phase: ms}, ...] เฟรมละ dict
+        self.phases = []                     # ชื่อ phase ตามลำดับที่เจอครั้งแรก
+        self.current = {}
+        self.last = 0.0
+        self.frame_start = time.perf_counter()
+        self.frame_index = 0
+        self.first_index = 0  # index ของเฟรมแรกที่ยังอยู่ใน ring buffer
+
+    def start(self):
+        self.last = time.perf_counter()
+
+    def mark(self, phase):
+        now = time.perf_counter()
+        current = self.current
+        if phase in current:
+            current[phase] += now - self.last
+        else:
+            current[phase] = now - self.last
+            if phase not in self.phases:
+                self.phases.append(phase)
+        self.last = now
+
+    def end_frame(self):
+        now = time.perf_counter()
+        sample = {phase: seconds * 1000 for phase, seconds in self.current.items()}
+        sample['total'] = (now - self.frame_start) * 1000
+        if len(self.frames) == self.frames.maxlen:
+            self.first_index += 1
+        self.frames.append(sample)
+        self.frame_index += 1
+        self.current = {}
+        self.frame_start = now
+
+    def columns(self):
+        known = [phase for phase in PHASE_ORDER if phase in self.phases]
+        return known + [phase for phase in self.phases if phase not in PHASE_ORDER] + ['total']
+
+    def summary(self):
+        """{phase: (เฉลี่ย ms, p99 ms)} จากเฟรมใน ring buffer (เฟรมที่ไม่มี phase นั้นนับเป็น 0)"""
+        result = {}
+        count = len(self.frames)
+        if not count:
+            return result
+        for phase in self.columns():
+            values = sorted(frame.get(phase, 0.0) for frame in self.frames)
+            p99 = values[min(count - 1, int(count * 0.99))]
+            result[phase] = (sum(values) / count, p99)
+        return result
+
+    def export(self, path):
+        """เขียนเฟรมใน ring buffer เป็น CSV หรือ JSON (ดูจากนามสกุลไฟล์)"""
+        columns = self.columns()
+        if path.endswith('.json'):
+            data = {
+                'columns': columns,
+                'summary': {phase: {'mean_ms': mean, 'p99_ms': p99}
+                            for phase, (mean, p99) in self.summary().items()},
+                'frames': [dict(frame=self.first_index + i, **frame)
+                           for i, frame in enumerate(self.frames)],
+            }
+            with open(path, 'w') as f:
+                json.dump(data, f, indent=1)
+        else:
+            with open(path, 'w', newline='') as f:
+                writer = csv.writer(f)
+                writer.writerow(['frame'] + columns)
+                for i, frame in enumerate(self.frames):
+                    writer.writerow([self.first_index + i] +
+                                    [f"{frame.get(phase, 0.0):.4f}" for phase in columns])
+
+
+class ProfilerOverlay:
+    """ตารางเวลาเฉลี่ย/p99 ต่อ phase มุมขวาล่างของจอ
+    ประกอบ surface ใหม่ทุก refresh เฟรม พื้นทึบ (วาดซ้ำที่เดิมได้ไม่ซ้อนกัน)"""
+    LINE_HEIGHT = 18
+
+    def __init__(self, profiler, refresh=15):
+        self.profiler = profiler
+        self.refresh = refresh
+        self.surface = None
+        self.age = 0
+
+    def compose(self):
+        rows = [('phase', 'avg ms', 'p99 ms')]
+        rows += [(phase, f"{mean:.2f}", f"{p99:.2f}")
+                 for phase, (mean, p99) in self.profiler.summary().items()]
+        width = 220
+        surface = pygame.Surface((width, self.LINE_HEIGHT * len(rows) + 10))
+        surface.fill((20, 20, 20))
+        pygame.draw.rect(surface, GREEN, surface.get_rect(), 1)
+        for i, (phase, mean, p99) in enumerate(rows):
+            y = 5 + i * self.LINE_HEIGHT
+            color = WHITE if i == 0 else YELLOW
+            surface.blit(render_text(phase, 20, WHITE), (6, y))
+            # ตัวเลขชิดขวาของแต่ละคอลัมน์
+            for text, right in ((mean, 150), (p99, width - 6)):
+                label = render_text(text, 20, color)
+                surface.blit(label, (right - label.get_width(), y))
+        return surface
+
+    def draw(self, screen):
+        if self.surface is None or self.age >= self.refresh:
+            self.surface = self.compose()
+            self.age = 0
+        self.age += 1
+        rect = self.surface.get_rect(bottomright=(screen.get_width() - 10,
+                                                  screen.get_height() - 10))
+        return screen.blit(self.surface, rect)
@@ -0,0 +1,149 @@
+"""
+Render queue: รวบรวมการวาดทั้งเฟรมตามลำดับความลึก แล้วส่งทีเดียว
+"""
+import pygame
+from operator import attrgetter
+from constants import MAX_DIRTY_RECTS
+
+DEPTH_KEY = attrgetter('z')
+
+
+class DepthOrder:
+    """ลำดับความลึก (ไกลไปใกล้) ที่เก็บไว้ข้ามเฟรม
+    วัตถุวิ่งเข้าหากล้องไปทางเดียวกันและแทบไม่สลับลำดับ ลำดับของเฟรมก่อนจึงเกือบเรียงอยู่แล้ว
+    list.sort (timsort) ซ่อมลำดับแบบนี้ได้ในเวลาเกือบ linear โดยไม่ต้องสร้าง tuple ใหม่
+    สมาชิกเช็คจาก snapshot ของแต่ละประเภท ถ้าไม่มีใครเกิด/ตายก็ไม่ต้องทำอะไรเพิ่ม"""
+    def __init__(self):
+        self.sources = {}  # kind -> snapshot ของ list สมาชิกในเฟรมก่อน
+        self.order = []    # ทุกวัตถุเรียงตาม z ของเฟรมก่อน
+
+    def update(self, groups):
+        """groups: [(kind, objects), ...] คืน list ทุกวัตถุเรียงจากไกลไปใกล้"""
+        changed = False
+        for kind, objects in groups:
+            # list == list เช็ค identity ทีละตัวใน C (เร็วมากเมื่อสมาชิกไม่เปลี่ยน)
+            if self.sources.get(kind) != objects:
+                self.sources[kind] = list(objects)
+                changed = True
+        
+        order = self.order
+        if changed:
+            live = set()
+            for objects in self.sources.values():
+                live.update(map(id, objects))
+            order = [obj for obj in order if id(obj) in live]
+            if len(order) < len(live):
+                known = set(map(id, order))
+                for objects in self.sources.values():
+                    order.extend(obj for obj in objects if id(obj) not in known)
+            self.order = order
+        
+        order.sort(key=DEPTH_KEY)
+        return order
+
+
+class RenderQueue:
+    """คิวการวาดของหนึ่งเฟรม (เรียงจากไกลไปใกล้ตามลำดับที่ใส่เข้ามา)
+    sprite ที่ติดกัน (รวมกระสุนซึ่งเป็นวงกลมที่ cache ไว้) รวมเป็น batch เดียวแล้วส่งด้วย Surface.blits() ครั้งเดียว
+    รูปทรง primitive (gate, lava, impostor, ตัวที่ไม่มีรูป) วาดทีละชิ้นตามลำดับ"""
+    def __init__(self):
+        self.commands = []  # [('sprites', [(surface, dest), ...]) | (kind, draw_func)]
+        self.batch = None   # batch ของ sprite ที่กำลังสะสม
+        self.stats = {'sprites': 0, 'batches': 0, 'primitives': 0}
+
+    def clear(self):
+        self.commands.clear()
+        self.batch = None
+
+    def blit(self, surface, dest):
+        """เพิ่ม sprite หนึ่งชิ้น"""
+        if self.batch is None:
+            self.batch = []
+            self.commands.append(('sprites', self.batch))
+        self.batch.append((surface, dest))
+
+    def primitive(self, kind, draw_func):
+        """เพิ่มการวาดแบบ primitive (draw_func(screen)) คั่น batch ของ sprite"""
+        self.batch = None
+        self.commands.append((kind, draw_func))
+
+    def flush(self, screen, rects=None):
+        """วาดทุกคำสั่งลง screen ตามลำดับ แล้วล้างคิว
+        ถ้าให้ list rects มา จะเก็บ Rect ที่ถูกวาดทับลงไปด้วย (ใช้กับ dirty rect)"""
+        stats = self.stats
+        collect = rects is not None
+        for kind, command in self.commands:
+            if kind == 'sprites':
+                items = command
+                if collect:
+                    rects.extend(screen.blits(items))
+                else:
+                    screen.blits(items, doreturn=False)
+                stats['sprites'] += len(items)
+                stats['batches'] += 1
+            else:
+                rect = command(screen)
+                if collect and rect:
+                    rects.append(rect)
+                stats['primitives'] += 1
+        self.clear()
+        return rects
+
+
+class DirtyRects:
+    """อัปเดตจอเฉพาะบริเวณที่เปลี่ยน แทน pygame.display.flip() ทั้งจอ
+    ต้นเฟรม: คืนพื้นที่ที่วาดไว้เฟรมก่อนจาก background ที่ cache ไว้
+    ท้ายเฟรม: pygame.display.update(พื้นที่เฟรมก่อน + พื้นที่เฟรมนี้)
+    ถ้า invalidate() ไว้ เฟรมนั้นจะวาดและ flip เต็มจอแทน (fallback)"""
+    def __init__(self, max_rects=MAX_DIRTY_RECTS):
+        self.max_rects = max_rects  # เกินนี้รวมเป็น Rect เดียว (ลด overhead ต่อ rect)
+        self.previous = []
+        self.current = []
+        self.full = True
+        self.held = None
+        self.stats = {'full_frames': 0, 'partial_frames': 0, 'held_frames': 0, 'rects': 0}
+
+    def invalidate(self):
+        """บังคับวาดและ present เต็มจอในเฟรมนี้"""
+        self.full = True
+
+    def hold(self, key):
+        """True ถ้าภาพนิ่ง key (เช่นหน้าจอจบด่าน) ถูก present ไปแล้ว ไม่ต้องวาดซ้ำ"""
+        if key is not None and key == self.held and not self.full:
+            self.stats['held_frames'] += 1
+            return True
+        self.held = key
+        return False
+
+    def begin(self, screen, background):
+        """เตรียมเฟรม: วาด background เต็มจอ หรือคืนเฉพาะพื้นที่ของเฟรมก่อน"""
+        if self.full:
+            screen.blit(background, (0, 0))
+        else:
+            for rect in self.previous:
+                screen.blit(background, rect, rect)
+
+    def add(self, rect):
+        if rect:
+            self.current.append(rect)
+
+    def extend(self, rects):
+        self.current.extend(rect for rect in rects if rect)
+
+    def present(self):
+        """ส่งภาพขึ้นจอ แล้วเริ่มนับพื้นที่ของเฟรมถัดไป"""
+        current = self.current
+        if len(current) > self.max_rects:
+            current = [current[0].unionall(current[1:])]
+        if self.full:
+            pygame.display.flip()
+            self.stats['full_frames'] += 1
+        else:
+            rects = self.previous + current
+            if rects:
+                pygame.display.update(rects)
+                self.stats['partial_frames'] += 1
+                self.stats['rects'] += len(rects)
+        self.previous = current
+        self.current = []
+        self.full = False
@@ -0,0 +1,127 @@
+"""
+Input recording and deterministic replay (seed + input ต่อ frame)
+"""
+import hashlib
+import json
+from constants import *
+from game import Game
+
+REPLAY_VERSION = 1
+
+# input ที่บันทึกได้ -> ทิศทางการขยับฝูง
+INPUT_ACTIONS = {
+    'left': -1,
+    'right': 1,
+}
+
+def apply_action(game, action):
+    """ทำ input หนึ่งครั้ง (เหมือนกดปุ่มใน handle_game_events)"""
+    game.crowd.move(INPUT_ACTIONS[action] * PLAYER_SPEED)
+
+def state_digest(game):
+    """hash ของ state ทั้งเกม ถ้าเล่นซ้ำแล้วได้ค่าเดียวกัน แปลว่าตรงกันทุกบิต"""
+    h = hashlib.sha1()
+    h.update(repr((game.frame, game.spawn_timer, game.gates_passed, game.game_over,
+                   game.won, game.crowd.count, game.crowd.center_x)).encode())
+    for p in game.crowd.people:
+        h.update(repr((p.x, p.z)).encode())
+    for e in game.enemies:
+        h.update(repr((e.x, e.z, e.alive)).encode())
+    for b in game.bullets:
+        h.update(repr((b.x, b.z)).encode())
+    for g in game.gates:
+        h.update(repr((g.z, g.used, g.left_op.symbol, g.right_op.symbol)).encode())
+    for lava in game.lava_pits:
+        h.update(repr((lava.x, lava.z, lava.active)).encode())
+    return h.hexdigest()[:16]
+
+
+class Replay:
+    """การเล่นหนึ่งเกม: ตั้งค่าเกม + seed + input ที่ frame ต่าง ๆ
+    frame ของ input คือ game.frame ตอนที่กดปุ่ม (ก่อน update ครั้งถัดไป)
+    digest คือ state_digest ตอนจบการบันทึก ใช้ตรวจว่าเล่นซ้ำได้ตรงทุกบิต
+    enemy_backend / bullet_backend เก็บ backend ที่ใช้จริงตอนบันทึก (ศัตรูแต่ละ backend เดินต่างกัน)"""
+    def __init__(self, level, seed, crowd_backend=None, formation=None,
+                 inputs=None, frames=0, digest=None, enemy_backend=None, bullet_backend=None):
+        self.level = level
+        self.seed = seed
+        self.crowd_backend = crowd_backend
+        self.formation = formation
+        self.enemy_backend = enemy_backend
+        self.bullet_backend = bullet_backend
+        self.inputs = inputs or []  # [(frame, action), ...]
+        self.frames = frames
+        self.digest = digest
+
+    @classmethod
+    def for_game(cls, game):
+        """เริ่มบันทึกเกมที่เพิ่งสร้าง"""
+        return cls(game.level, game.seed, game.crowd_backend, game.formation,
+                   enemy_backend=game.enemy_system.backend,
+                   bullet_backend=game.bullet_system.backend)
+
+    def record(self, frame, action):
+        self.inputs.append((frame, action))
+
+    def finish(self, game):
+        """ปิดการบันทึก: เก็บจำนวน frame และ digest ของ state สุดท้าย"""
+        self.frames = game.frame
+        self.digest = state_digest(game)
+
+    def new_game(self, assets=None):
+        game = Game(self.level, assets, self.crowd_backend, self.formation, self.seed,
+                    bullet_backend=self.bullet_backend, enemy_backend=self.enemy_backend)
+        game.start_game()
+        return game
+
+    def inputs_by_frame(self):
+        by_frame = {}
+        for frame, action in self.inputs:
+            by_frame.setdefault(frame, []).append(action)
+        return by_frame
+
+    def to_dict(self):
+        return {
+            'version': REPLAY_VERSION,
+            'level': self.level,
+            'seed': self.seed,
+            'crowd_backend': self.crowd_backend,
+            'formation': self.formation,
+            'enemy_backend': self.enemy_backend,
+            'bullet_backend': self.bullet_backend,
+            'frames': self.frames,
+            'digest': self.digest,
+            'inputs': [[frame, action] for frame, action in self.inputs],
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        if data.get('version') != REPLAY_VERSION:
+            raise ValueError(f"replay version {data.get('version')} ไม่รองรับ "
+                             f"(ต้องเป็น {REPLAY_VERSION})")
+        return cls(data['level'], data['seed'], data.get('crowd_backend'),
+                   data.get('formation'), [(f, a) for f, a in data['inputs']],
+                   data['frames'], data.get('digest'),
+                   data.get('enemy_backend'), data.get('bullet_backend'))
+
+    def save(self, path):
+        with open(path, 'w') as f:
+            json.dump(self.to_dict(), f, indent=1)
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as f:
+            return cls.from_dict(json.load(f))
+
+    def play(self, game=None, on_frame=None):
+        """เล่นซ้ำจนครบ frames (หรือเกมจบ) แล้วคืน game
+        on_frame(game) ถูกเรียกหลัง update แต่ละครั้ง (เช่นใช้วาดหรือจับเวลา)"""
+        game = game or self.new_game()
+        by_frame = self.inputs_by_frame()
+        while game.frame < self.frames and not (game.game_over or game.won):
+            for action in by_frame.get(game.frame, ()):
+                apply_action(game, action)
+            game.update()
+            if on_frame:
+                on_frame(game)
+        return game
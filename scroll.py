@@ -0,0 +1,88 @@
+"""
+Closed-form road scrolling: depth of passive objects from the step they were placed
+"""
+import math
+from constants import *
+
+
+class ScrollTrack:
+    """ถนนที่เลื่อนเข้าหาผู้เล่นแบบ perspective (ช้าตอนอยู่ไกล เร็วตอนอยู่ใกล้)
+    ทุก step คือ z += k * (0.3 + 0.7 * max(0, z)) โดย k = SCROLL_SPEED * 0.003 ซึ่งมีคำตอบรูปปิด:
+    ตอน z < 0 เป็นเส้นตรง (เพิ่ม 0.3k ต่อ step) พอ z >= 0 แล้ว z + 3/7 คูณด้วย 1 + 0.7k ทุก step
+    วัตถุที่ไม่ขยับเองจึงเก็บแค่ path ตอนวาง แล้วคำนวณ z ตอนที่ต้องใช้ ไม่ต้องบวกทุก step
+    และรู้ล่วงหน้าได้ว่าจะถึงความลึกใดใน step ไหน (frame_at)
+    time คือจำนวน step ของเกม ตอนวาดแบบ interpolate เป็นเศษส่วนได้"""
+    PIVOT = 3 / 7  # z + PIVOT โตแบบ geometric ตอน z >= 0
+
+    def __init__(self, speed=SCROLL_SPEED):
+        step = speed * 0.003
+        self.linear = 0.3 * step
+        self.growth = 1 + 0.7 * step
+        self.log_growth = math.log(self.growth)
+        self.time = 0
+
+    def path(self, z, time=None):
+        """path ของวัตถุที่อยู่ที่ความลึก z ตอน time (ค่าเริ่มต้น: ตอนนี้)
+        (z, time, z + PIVOT ตอนเริ่มช่วง geometric, time ที่เริ่มช่วงนั้น)"""
+        if time is None:
+            time = self.time
+        if z >= 0:
+            return (z, time, z + self.PIVOT, time)
+        steps = math.ceil(-z / self.linear)
+        return (z, time, z + steps * self.linear + self.PIVOT, time + steps)
+
+    def depth(self, path, time=None):
+        """ความลึกของวัตถุบน path ตอน time (ก่อนเวลาที่วางถือว่าอยู่ที่จุดวาง)"""
+        z, start, anchor, anchor_time = path
+        if time is None:
+            time = self.time
+        if time <= start:
+            return z
+        if time < anchor_time:
+            return z + (time - start) * self.linear
+        return anchor * self.growth ** (time - anchor_time) - self.PIVOT
+
+    def frame_at(self, path, z):
+        """step แรกที่วัตถุบน path มีความลึก >= z"""
+        z0, start, anchor, anchor_time = path
+        if z <= anchor - self.PIVOT:
+            frame = start + max(0, math.ceil((z - z0) / self.linear))
+        else:
+            frame = anchor_time + math.ceil(math.log((z + self.PIVOT) / anchor) / self.log_growth)
+        # ปัดเศษของการหาร/log อาจคลาดไปหนึ่ง step เทียบกับ depth() จริง
+        while frame > start and self.depth(path, frame - 1) >= z:
+            frame -= 1
+        while self.depth(path, frame) < z:
+            frame += 1
+        return frame
+
+
+# ถนนที่ไม่เลื่อน (time คงที่) สำหรับวัตถุที่สร้างนอกเกม เช่นใน benchmark
+STILL_TRACK = ScrollTrack()
+
+
+class TrackObject:
+    """วัตถุที่เลื่อนไปกับถนนโดยไม่ขยับเอง (gate, บ่อลาวา) z คำนวณจาก path บน ScrollTrack
+    การกำหนด z ตรง ๆ คือวางวัตถุใหม่ที่ความลึกนั้น ณ เวลาปัจจุบันของถนน
+    reach_frame - leave_frame คือช่วง step ที่อยู่ในระยะชนฝูงชนได้ (CROWD_REACH_Z)
+    exit_frame คือ step ที่ผ่านผู้เล่นไปแล้ว (z >= SCROLL_EXIT_Z) ลบทิ้งได้"""
+    __slots__ = ('track', 'path', 'reach_frame', 'leave_frame', 'exit_frame')
+
+    def place(self, track, z):
+        self.track = track
+        self.path = path = track.path(z)
+        near, far = CROWD_REACH_Z
+        self.reach_frame = track.frame_at(path, near)
+        self.leave_frame = track.frame_at(path, far)
+        self.exit_frame = track.frame_at(path, SCROLL_EXIT_Z)
+
+    @property
+    def z(self):
+        return self.track.depth(self.path)
+
+    @z.setter
+    def z(self, z):
+        self.place(self.track, z)
+
+    def in_reach(self, frame):
+        return self.reach_frame <= frame < self.leave_frame
@@ -0,0 +1,184 @@
+"""
+Spatial indexes over world coordinates (x: ซ้าย-ขวา, z: ไกล-ใกล้)
+"""
+import math
+from constants import *
+
+try:
+    import numpy as np
+except ImportError:  # NumPy เป็น optional - FlowField ต้องใช้ (EnemySwarm)
+    np = None
+
+
+class PointGrid:
+    """Uniform grid ของจุด (x, z) สำหรับหา nearest neighbor
+    เก็บเฉพาะ cell ที่มีจุด พร้อมกรอบ (bounding box) จริงของจุดใน cell
+    ตอนค้นหาจะไล่ cell จากกรอบที่ใกล้ที่สุด และหยุดเมื่อกรอบถัดไปไกลกว่าคำตอบ
+    ผลลัพธ์ตรงกับ min() แบบวนทุกจุด (ถ้าระยะเท่ากันจะได้ index ที่น้อยกว่า)"""
+    def __init__(self, xs, zs, cell_size=0.1):
+        self.xs = xs
+        self.zs = zs
+        self.cell_size = cell_size
+        inv = 1.0 / cell_size
+
+        cells = {}
+        for i, (x, z) in enumerate(zip(xs, zs)):
+            key = (int(x * inv), int(z * inv))
+            bucket = cells.get(key)
+            if bucket is None:
+                cells[key] = [i]
+            else:
+                bucket.append(i)
+
+        # (min_x, max_x, min_z, max_z, indices) ต่อ cell
+        self.cells = []
+        for indices in cells.values():
+            cell_xs = [xs[i] for i in indices]
+            cell_zs = [zs[i] for i in indices]
+            self.cells.append((min(cell_xs), max(cell_xs),
+                               min(cell_zs), max(cell_zs), indices))
+
+    def nearest(self, x, z, limit=None):
+        """index ของจุดที่ใกล้ (x, z) ที่สุด นับเฉพาะ index < limit (None = ทุกจุด)"""
+        if limit is None:
+            limit = len(self.xs)
+        xs, zs = self.xs, self.zs
+
+        # ระยะต่ำสุดจาก (x, z) ถึงกรอบของแต่ละ cell
+        order = []
+        for min_x, max_x, min_z, max_z, indices in self.cells:
+            gap_x = min_x - x if x < min_x else (x - max_x if x > max_x else 0.0)
+            gap_z = min_z - z if z < min_z else (z - max_z if z > max_z else 0.0)
+            order.append((gap_x * gap_x + gap_z * gap_z, indices))
+        order.sort(key=lambda cell: cell[0])
+
+        best, best_dist = None, math.inf
+        best_sq = math.inf
+        for gap_sq, indices in order:
+            if gap_sq > best_sq + 1e-12:  # เผื่อ rounding ให้จุดที่ระยะเท่ากันยังถูกตรวจ
+                break
+            for i in indices:
+                if i >= limit:
+                    continue
+                dist = math.sqrt((xs[i] - x)**2 + (zs[i] - z)**2)
+                if dist < best_dist or (dist == best_dist and i < best):
+                    best, best_dist = i, dist
+                    best_sq = dist * dist
+        return best
+
+
+class SpatialHash:
+    """Hash grid 2D (x, z) ที่ใช้ร่วมกันทุกประเภทวัตถุ สร้างใหม่ทุกเฟรมใน Game.update
+    แยก layer ตามประเภท ('enemy', 'lava', 'gate', 'person') แต่ละ layer เป็น dict ของ cell
+    query จะดู cell ข้างเคียงทั้งหมดที่ซ้อนกับรัศมี จึงไม่พลาดการชนที่คร่อมขอบ cell"""
+    def __init__(self, cell_size=0.05):
+        self.cell_size = cell_size
+        self.inv = 1.0 / cell_size
+        self.layers = {}      # kind -> {(cx, cz): [obj, ...]}
+        self.spanned = set()  # ประเภทที่มีวัตถุกินหลาย cell (ต้องกรองซ้ำตอน query)
+
+    def _coord(self, value):
+        return math.floor(value * self.inv)
+
+    def insert(self, kind, obj, x, z):
+        """ใส่วัตถุแบบจุดที่ตำแหน่ง (x, z)"""
+        layer = self.layers.get(kind)
+        if layer is None:
+            layer = self.layers[kind] = {}
+        inv = self.inv
+        key = (math.floor(x * inv), math.floor(z * inv))
+        bucket = layer.get(key)
+        if bucket is None:
+            layer[key] = [obj]
+        else:
+            bucket.append(obj)
+
+    def insert_span(self, kind, obj, x0, x1, z0, z1):
+        """ใส่วัตถุที่กินพื้นที่ [x0, x1] x [z0, z1] (เช่น gate ที่กว้างเต็มถนน)"""
+        self.spanned.add(kind)
+        layer = self.layers.setdefault(kind, {})
+        for cx in range(self._coord(x0), self._coord(x1) + 1):
+            for cz in range(self._coord(z0), self._coord(z1) + 1):
+                layer.setdefault((cx, cz), []).append(obj)
+
+    def query(self, kind, x, z, radius):
+        """วัตถุประเภท kind ใน cell ที่ซ้อนกับกรอบ (x ± radius, z ± radius)
+        เป็นผู้สมัคร (candidate) ผู้เรียกต้องเช็คระยะจริงเอง"""
+        layer = self.layers.get(kind)
+        if not layer:
+            return []
+        inv = self.inv
+        x0, x1 = math.floor((x - radius) * inv), math.floor((x + radius) * inv)
+        z0, z1 = math.floor((z - radius) * inv), math.floor((z + radius) * inv)
+        found = []
+        for cx in range(x0, x1 + 1):
+            for cz in range(z0, z1 + 1):
+                bucket = layer.get((cx, cz))
+                if bucket:
+                    found.extend(bucket)
+        if kind in self.spanned and len(found) > 1:
+            seen = set()
+            found = [o for o in found if not (id(o) in seen or seen.add(id(o)))]
+        return found
+
+
+class FlowField:
+    """Flow field หยาบบน grid คลุมถนน ชี้จากทุก cell ไปยังฝูงชน (สร้างใหม่ทุก step ด้วย NumPy)
+    แต่ละ cell เก็บจุดเป้าหมาย = จุดศูนย์กลางของคนใน cell ที่มีคนซึ่งใกล้ที่สุด
+    ศัตรูทุกตัวจึงหาทิศทางได้ด้วยการอ่านค่าจาก cell ของตัวเอง (O(1)) ไม่ต้องค้นหาคนที่ใกล้ที่สุด
+    near บอกว่า cell อยู่ติดกับ cell ที่มีคน (รวม 8 ทิศ) ศัตรูใน cell เหล่านี้ต้องเช็คระยะกับคนจริง"""
+    def __init__(self, cell_size=FLOW_FIELD_CELL, z_range=FLOW_FIELD_Z_RANGE):
+        if np is None:
+            raise RuntimeError("FlowField ต้องใช้ NumPy (pip install numpy)")
+        self.cell_size = cell_size
+        self.inv = 1.0 / cell_size
+        self.z_min, z_max = z_range
+        self.cols = int(math.ceil(1.0 / cell_size))
+        self.rows = int(math.ceil((z_max - self.z_min) / cell_size))
+        cols, rows = np.meshgrid(np.arange(self.cols), np.arange(self.rows))
+        self.center_x = ((cols.ravel() + 0.5) * cell_size)
+        self.center_z = ((rows.ravel() + 0.5) * cell_size + self.z_min)
+        self.target_x = np.zeros(self.rows * self.cols)
+        self.target_z = np.zeros(self.rows * self.cols)
+        self.near = np.zeros(self.rows * self.cols, dtype=bool)
+        self.empty = True
+
+    def cells(self, xs, zs):
+        """index (แบบแบน) ของ cell ที่จุดแต่ละจุดอยู่ (จุดนอก grid ใช้ cell ขอบ)"""
+        col = np.clip((xs * self.inv).astype(np.intp), 0, self.cols - 1)
+        row = np.clip(((zs - self.z_min) * self.inv).astype(np.intp), 0, self.rows - 1)
+        return row * self.cols + col
+
+    def build(self, xs, zs):
+        """สร้าง field จากตำแหน่งคน (array)"""
+        self.empty = len(xs) == 0
+        if self.empty:
+            return
+        cell = self.cells(xs, zs)
+        size = self.rows * self.cols
+        counts = np.bincount(cell, minlength=size)
+        occupied = np.flatnonzero(counts)
+        occupied_x = np.bincount(cell, xs, size)[occupied] / counts[occupied]
+        occupied_z = np.bincount(cell, zs, size)[occupied] / counts[occupied]
+
+        # cell ที่มีคนซึ่งใกล้ที่สุดของทุก cell (grid หยาบ + จำนวน cell ที่มีคนไม่มาก)
+        dist = ((self.center_x[:, None] - occupied_x)**2 +
+                (self.center_z[:, None] - occupied_z)**2)
+        nearest = np.argmin(dist, axis=1)
+        self.target_x = occupied_x[nearest]
+        self.target_z = occupied_z[nearest]
+
+        # ขยาย cell ที่มีคนออกไป 1 cell รอบด้าน
+        grid = (counts > 0).reshape(self.rows, self.cols)
+        near = grid.copy()
+        near[1:, :] |= grid[:-1, :]
+        near[:-1, :] |= grid[1:, :]
+        wide = near.copy()
+        near[:, 1:] |= wide[:, :-1]
+        near[:, :-1] |= wide[:, 1:]
+        self.near = near.ravel()
+
+    def lookup(self, xs, zs):
+        """(target_x, target_z, near) ของจุดแต่ละจุด"""
+        cell = self.cells(xs, zs)
+        return self.target_x[cell], self.target_z[cell], self.near[cell]
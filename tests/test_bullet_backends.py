@@ -0,0 +1,40 @@
+"""
+BulletList กับ BulletManager ต้องให้เกมเดียวกันทุกบิต (seed เดียวกัน + input เดียวกัน = state digest เดียวกัน)
+"""
+import os
+import sys
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+pytest.importorskip('numpy')
+
+from constants import PLAYER_SPEED
+from game import Game
+from main import INPUT_POLICIES
+from replay import state_digest
+
+# seed ที่เคยแยกกันเพราะกระสุนโดนศัตรูหลายตัวที่ t เท่ากัน (ตัดสินต่างกันระหว่างสอง backend)
+SEEDS = (1, 5, 12, 20, 54)
+
+
+@pytest.mark.parametrize('seed', SEEDS)
+def test_bullet_backends_match(seed):
+    games = []
+    for backend in ('list', 'numpy'):
+        game = Game(3, seed=seed, bullet_backend=backend)
+        game.start_game()
+        game.crowd.add_people(200)
+        games.append(game)
+    policy = INPUT_POLICIES['sweep']
+    for frame in range(700):
+        if games[0].game_over or games[0].won:
+            break
+        for game in games:
+            direction = policy(game, frame)
+            if direction:
+                game.crowd.move(direction * PLAYER_SPEED)
+            game.update()
+        assert state_digest(games[0]) == state_digest(games[1]), f"frame {games[0].frame}"
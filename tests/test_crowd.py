@@ -0,0 +1,26 @@
+"""
+Crowd กับ ArrayCrowd ต้องสร้าง/ลบตัวแทนเหมือนกัน
+"""
+import os
+import sys
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+from entities import CROWD_BACKENDS, np
+
+
+@pytest.mark.parametrize('backend', sorted(CROWD_BACKENDS))
+def test_sync_people_with_zero_budget_keeps_people(backend):
+    if backend == 'numpy' and np is None:
+        pytest.skip('NumPy ไม่ได้ติดตั้ง')
+    crowd = CROWD_BACKENDS[backend]()
+    crowd.add_people(9)
+    crowd.sync_people(budget=10)
+    crowd.set_count(4)
+    crowd.sync_people(budget=0)
+    assert len(crowd.people) == 10
+    crowd.sync_people(budget=3)
+    assert len(crowd.people) == 7
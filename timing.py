@@ -0,0 +1,83 @@
+"""
+Fixed-timestep simulation clock and render interpolation
+"""
+from constants import *
+
+
+class FixedStepClock:
+    """นาฬิกา simulation แบบ step คงที่ (accumulator)
+    เวลาจริงที่ผ่านไปถูกสะสมแล้วแบ่งเป็น step ละ SIM_STEP วินาที ความเร็วเกมจึงไม่ขึ้นกับ FPS ที่วาดได้
+    ถ้าวาดช้า จะรันหลาย step ต่อการวาดหนึ่งครั้ง (ข้ามการวาด) แต่ไม่เกิน max_steps
+    เวลาที่ค้างเกินนั้นถูกทิ้ง (เกมช้าลงแทนที่จะค้างไล่ตามไม่ทัน)
+    time_scale > 1 ให้ simulation เดินเร็วกว่าเวลาจริง (ใช้ทดสอบ)"""
+    def __init__(self, step=SIM_STEP, max_steps=MAX_CATCHUP_STEPS, time_scale=1.0):
+        self.step = step
+        self.time_scale = time_scale
+        # เผื่อจำนวน step ต่อเฟรมตาม time_scale ไม่ให้ cap ตัดความเร็วที่ตั้งใจไว้
+        self.max_steps = max_steps * max(1, int(time_scale + 0.999))
+        self.accumulator = 0.0
+        self.alpha = 1.0  # สัดส่วนระหว่าง step ก่อนหน้ากับ step ล่าสุด (สำหรับ interpolation)
+        self.stats = {'frames': 0, 'steps': 0, 'skipped_frames': 0, 'dropped_s': 0.0}
+
+    def reset(self):
+        """เริ่มนับใหม่ (เช่นตอนเริ่มเกมใหม่ ไม่ให้เวลาที่ค้างจากหน้าเมนูถูกนำมาไล่ตาม)"""
+        self.accumulator = 0.0
+        self.alpha = 1.0
+
+    def advance(self, elapsed):
+        """เพิ่มเวลาจริง elapsed วินาที คืนจำนวน step ที่ต้องรันก่อนวาดเฟรมนี้"""
+        self.accumulator += elapsed * self.time_scale
+        steps = int(self.accumulator / self.step)
+        if steps > self.max_steps:
+            dropped = (steps - self.max_steps) * self.step
+            self.accumulator -= dropped
+            self.stats['dropped_s'] += dropped
+            steps = self.max_steps
+        self.accumulator -= steps * self.step
+        self.alpha = self.accumulator / self.step
+
+        stats = self.stats
+        stats['frames'] += 1
+        stats['steps'] += steps
+        if steps > 1:
+            stats['skipped_frames'] += steps - 1
+        return steps
+
+
+class Interpolator:
+    """วาดวัตถุที่ตำแหน่งผสมระหว่าง step ก่อนหน้ากับ step ล่าสุด (alpha)
+    capture() เก็บค่าก่อน step, apply() ใส่ค่าที่ผสมแล้วชั่วคราวตอนวาด, restore() คืนค่าจริง
+    วัตถุที่เพิ่งเกิดใน step นี้ (ไม่มีค่าก่อนหน้า หรือถูกใช้ซ้ำจาก pool จน generation เปลี่ยน)
+    วาดที่ตำแหน่งปัจจุบัน"""
+    FIELDS = ('z', 'screen_x', 'screen_y', 'scale')
+
+    def __init__(self):
+        self.previous = {}  # id(obj) -> (generation, ค่าของ FIELDS ก่อน step ล่าสุด)
+
+    def capture(self, groups):
+        """groups: list ของ list วัตถุ เรียกก่อน Game.update() แต่ละ step"""
+        previous = {}
+        for objects in groups:
+            for obj in objects:
+                previous[id(obj)] = (getattr(obj, 'generation', 0),
+                                     (obj.z, obj.screen_x, obj.screen_y, obj.scale))
+        self.previous = previous
+
+    def apply(self, objects, alpha):
+        """ใส่ค่าที่ผสมแล้ว คืนค่าจริงที่ต้องส่งให้ restore()"""
+        saved = []
+        previous = self.previous
+        for obj in objects:
+            entry = previous.get(id(obj))
+            if entry is None or entry[0] != getattr(obj, 'generation', 0):
+                continue
+            before = entry[1]
+            current = (obj.z, obj.screen_x, obj.screen_y, obj.scale)
+            saved.append((obj, current))
+            obj.z, obj.screen_x, obj.screen_y, obj.scale = (
+                b + (c - b) * alpha for b, c in zip(before, current))
+        return saved
+
+    def restore(self, saved):
+        for obj, current in saved:
+            obj.z, obj.screen_x, obj.screen_y, obj.scale = current
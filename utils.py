@@ -1,9 +1,17 @@
 """
 Utility functions for Math Crowd Runner
 """
+import hashlib
+import os
 import pygame
+from collections import OrderedDict
 from constants import *
 
+try:
+    import numpy as np
+except ImportError:  # NumPy เป็น optional (ใช้กับ project_many แบบ array)
+    np = None
+
 # ============================================
 # Font Cache - ลดการสร้าง font ซ้ำ
 # ============================================
@@ -15,33 +23,166 @@ def init_font_cache():
     if not FONT_CACHE:
         FONT_CACHE = {i: pygame.font.Font(None, i) for i in range(20, 90, 2)}
 
+def font_size(size):
+    """ขนาด font ที่มีใน cache (20-88 เลขคู่)"""
+    size = max(20, min(88, int(size)))
+    # ปัดเป็นเลขคู่ที่ใกล้ที่สุด
+    return size if size % 2 == 0 else size + 1
+
 def get_font(size):
     """ดึง font จาก cache"""
     if not FONT_CACHE:
         init_font_cache()
     
-    size = max(20, min(88, int(size)))
-    # ปัดเป็นเลขคู่ที่ใกล้ที่สุด
-    size = size if size % 2 == 0 else size + 1
-    return FONT_CACHE.get(size, FONT_CACHE[40])
+    return FONT_CACHE.get(font_size(size), FONT_CACHE[40])
+
+# ============================================
+# Text Cache - LRU ของ surface ข้อความที่ render แล้ว
+# ============================================
+class TextCache:
+    """LRU cache ของข้อความที่ render แล้ว key = (text, size, color, antialias)
+    การ render ตัวอักษรแบบ anti-alias แพงมาก แต่แทบทุกเฟรมได้ผลเหมือนเดิม"""
+    def __init__(self, maxsize=256):
+        self.maxsize = maxsize
+        self.surfaces = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+    
+    def render(self, text, size, color, antialias=True):
+        size = font_size(size)
+        key = (text, size, tuple(color), antialias)
+        surface = self.surfaces.get(key)
+        if surface is not None:
+            self.hits += 1
+            self.surfaces.move_to_end(key)
+            return surface
+        
+        self.misses += 1
+        surface = get_font(size).render(text, antialias, color)
+        self.surfaces[key] = surface
+        if len(self.surfaces) > self.maxsize:
+            self.surfaces.popitem(last=False)
+            self.evictions += 1
+        return surface
+    
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            'size': len(self.surfaces),
+            'maxsize': self.maxsize,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': self.hits / total if total else 0.0,
+        }
+    
+    def clear(self):
+        self.surfaces.clear()
+        self.hits = self.misses = self.evictions = 0
+
+TEXT_CACHE = TextCache(TEXT_CACHE_SIZE)
+
+def render_text(text, size, color, antialias=True):
+    """render ข้อความผ่าน LRU cache กลาง (ใช้แทน font.render ทุกที่)"""
+    return TEXT_CACHE.render(text, size, color, antialias)
+
+def format_count(count):
+    """ย่อจำนวนคนให้สั้นพอใส่กล่อง HUD เช่น 12345 -> '12.3K', 4560000 -> '4.56M'"""
+    if count < 10_000:
+        return str(count)
+    for unit, suffix in ((1_000_000_000, 'B'), (1_000_000, 'M'), (1_000, 'K')):
+        if count >= unit:
+            # ตัดทศนิยมทิ้ง (ไม่ปัดขึ้น) จะได้ไม่เกิด '1000K'
+            digits = 2 if count < 10 * unit else (1 if count < 100 * unit else 0)
+            value = (count * 10**digits // unit) / 10**digits
+            return f"{value:.{digits}f}{suffix}"
+
+class Projection:
+    """แปลงพิกัด world (x: ซ้าย-ขวา, z: ไกล-ใกล้) เป็นพิกัดหน้าจอ แบบทีละจุดหรือทั้งชุด
+    z = 0 (ไกลสุด ด้านหลัง) ถึง z = 1 (ใกล้สุด ด้านหน้า)
+    ขอบถนน, y และ scale ขึ้นกับ z อย่างเดียว (เส้นตรง) จึงเก็บสัมประสิทธิ์ไว้ครั้งเดียว
+    ถ้า lut_size > 0 จะอ่าน (ซ้าย, ขวา, y, scale) จากตารางที่ z ใกล้ที่สุดแทน (ค่าถูกปัดตามความละเอียดตาราง)"""
+    def __init__(self, lut_size=PROJECTION_LUT_SIZE, z_range=PROJECTION_Z_RANGE):
+        self.left0 = ROAD_TOP_LEFT
+        self.left_slope = ROAD_BOTTOM_LEFT - ROAD_TOP_LEFT
+        self.right0 = ROAD_TOP_RIGHT
+        self.right_slope = ROAD_BOTTOM_RIGHT - ROAD_TOP_RIGHT
+        self.y0 = ROAD_TOP_Y
+        self.y_slope = ROAD_BOTTOM_Y - ROAD_TOP_Y
+        self.lut_size = lut_size
+        self.z_min, z_max = z_range
+        self.lut = None
+        if lut_size > 0:
+            self.z_step = (z_max - self.z_min) / (lut_size - 1)
+            self.lut = [self.edges(self.z_min + i * self.z_step) for i in range(lut_size)]
+            if np is not None:
+                self.lut_array = np.array(self.lut)
+
+    def edges(self, z):
+        """(ขอบซ้าย, ขอบขวา, y, scale) ของถนนที่ความลึก z (คำนวณตรง)"""
+        return (self.left0 + self.left_slope * z,
+                self.right0 + self.right_slope * z,
+                self.y0 + self.y_slope * z,
+                0.3 + 0.7 * z)  # scale จาก 0.3 (ไกล) ถึง 1.0 (ใกล้)
+
+    def lookup(self, z):
+        """(ขอบซ้าย, ขอบขวา, y, scale) ที่ z จากตาราง (หรือคำนวณตรงถ้าไม่มีตาราง)"""
+        if self.lut is None:
+            return self.edges(z)
+        index = int((z - self.z_min) / self.z_step + 0.5)
+        return self.lut[min(self.lut_size - 1, max(0, index))]
+
+    def project(self, x, z):
+        left, right, screen_y, scale = self.lookup(z)
+        return left + (right - left) * x, screen_y, scale
+
+    def project_many(self, xs, zs):
+        """project ทั้งชุด: xs, zs เป็น NumPy array (ได้ array) หรือ sequence (ได้ list)
+        คืน (screen_x, screen_y, scale)"""
+        if np is not None and isinstance(zs, np.ndarray):
+            if self.lut is None:
+                left = self.left0 + self.left_slope * zs
+                right = self.right0 + self.right_slope * zs
+                return left + (right - left) * xs, self.y0 + self.y_slope * zs, 0.3 + 0.7 * zs
+            index = np.clip(((zs - self.z_min) / self.z_step + 0.5).astype(np.intp),
+                            0, self.lut_size - 1)
+            left, right, screen_y, scale = self.lut_array[index].T
+            return left + (right - left) * xs, screen_y, scale
+        screen_x, screen_y, scale = [], [], []
+        for x, z in zip(xs, zs):
+            sx, sy, s = self.project(x, z)
+            screen_x.append(sx)
+            screen_y.append(sy)
+            scale.append(s)
+        return screen_x, screen_y, scale
+
+    def project_objects(self, objects):
+        """ใส่ screen_x, screen_y, scale ให้วัตถุทุกตัว (ที่มี x, z) ในรอบเดียว"""
+        if self.lut is not None:
+            lookup = self.lookup
+            for obj in objects:
+                left, right, obj.screen_y, obj.scale = lookup(obj.z)
+                obj.screen_x = left + (right - left) * obj.x
+            return
+        left0, left_slope = self.left0, self.left_slope
+        right0, right_slope = self.right0, self.right_slope
+        y0, y_slope = self.y0, self.y_slope
+        for obj in objects:
+            z = obj.z
+            left = left0 + left_slope * z
+            obj.screen_x = left + (right0 + right_slope * z - left) * obj.x
+            obj.screen_y = y0 + y_slope * z
+            obj.scale = 0.3 + 0.7 * z
+
+PROJECTION = Projection()
 
 def world_to_screen(x, z):
     """
     แปลงพิกัด world (x: ซ้าย-ขวา, z: ไกล-ใกล้) เป็นพิกัดหน้าจอ
     z = 0 (ไกลสุด ด้านหลัง) ถึง z = 1 (ใกล้สุด ด้านหน้า)
     """
-    # คำนวณตำแหน่ง x บนหน้าจอตาม perspective
-    screen_left = ROAD_TOP_LEFT + (ROAD_BOTTOM_LEFT - ROAD_TOP_LEFT) * z
-    screen_right = ROAD_TOP_RIGHT + (ROAD_BOTTOM_RIGHT - ROAD_TOP_RIGHT) * z
-    screen_x = screen_left + (screen_right - screen_left) * x
-    
-    # คำนวณตำแหน่ง y บนหน้าจอ
-    screen_y = ROAD_TOP_Y + (ROAD_BOTTOM_Y - ROAD_TOP_Y) * z
-    
-    # คำนวณขนาดตาม perspective (ไกล = เล็ก, ใกล้ = ใหญ่)
-    scale = 0.3 + 0.7 * z  # scale จาก 0.3 (ไกล) ถึง 1.0 (ใกล้)
-    
-    return screen_x, screen_y, scale
+    return PROJECTION.project(x, z)
 
 def get_road_bounds(z):
     """คืนค่าขอบซ้าย-ขวาของถนนที่ระดับความลึก z"""
@@ -49,19 +190,155 @@ def get_road_bounds(z):
     right = ROAD_TOP_RIGHT + (ROAD_BOTTOM_RIGHT - ROAD_TOP_RIGHT) * z
     return left, right
 
-def load_resources():
-    """โหลดรูปภาพและเสียงทั้งหมดครั้งเดียว"""
+# ============================================
+# Asset Cache - รูปที่ scale แล้วเก็บบนดิสก์
+# ============================================
+class AssetCache:
+    """Cache บนดิสก์ของรูปที่ scale แล้ว เก็บเป็น pixel ดิบ (RGB/RGBA)
+    ครั้งต่อไปโหลดได้ทันทีโดยไม่ต้อง decode JPG/PNG ขนาดใหญ่และไม่ต้อง scale ซ้ำ
+    ชื่อไฟล์มีเวอร์ชัน cache, hash ของไฟล์ต้นฉบับ และลำดับขนาดที่ scale
+    ถ้าไฟล์ต้นฉบับเปลี่ยน hash จะไม่ตรงและสร้างใหม่เอง"""
+    def __init__(self, directory=ASSET_CACHE_DIR, version=ASSET_CACHE_VERSION):
+        self.directory = directory
+        self.version = version
+        self.digests = {}  # path -> hash ของไฟล์ต้นฉบับ
+        self.hits = 0
+        self.misses = 0
+
+    def digest(self, path):
+        digest = self.digests.get(path)
+        if digest is None:
+            with open(path, 'rb') as f:
+                digest = self.digests[path] = hashlib.sha1(f.read()).hexdigest()[:16]
+        return digest
+
+    def entry_path(self, name, digest, steps, fmt):
+        sizes = '-'.join(f"{w}x{h}" for w, h in steps)
+        return os.path.join(self.directory,
+                            f"v{self.version}_{name}_{digest}_{sizes}.{fmt.lower()}")
+
+    def load(self, name, digest, steps):
+        for fmt in ('RGBA', 'RGB'):
+            path = self.entry_path(name, digest, steps, fmt)
+            if os.path.exists(path):
+                try:
+                    with open(path, 'rb') as f:
+                        data = f.read()
+                    return pygame.image.frombuffer(bytearray(data), steps[-1], fmt)
+                except (OSError, ValueError):
+                    return None
+        return None
+
+    def save(self, name, digest, steps, surface):
+        fmt = 'RGBA' if surface.get_flags() & pygame.SRCALPHA else 'RGB'
+        path = self.entry_path(name, digest, steps, fmt)
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            tmp = path + '.tmp'
+            with open(tmp, 'wb') as f:
+                f.write(pygame.image.tostring(surface, fmt))
+            os.replace(tmp, path)  # ไม่ให้ไฟล์ครึ่งๆ กลางๆ ถูกอ่าน
+        except OSError:
+            pass  # เขียนไม่ได้ (เช่น read-only) ก็แค่ไม่มี cache
+
+    def scaled(self, name, steps, build):
+        """รูป name ที่ scale ตามลำดับขนาด steps จาก cache หรือ build() แล้วบันทึกไว้"""
+        digest = self.digest(os.path.join(ASSET_DIR, name))
+        surface = self.load(name, digest, steps)
+        if surface is not None:
+            self.hits += 1
+            return surface
+        self.misses += 1
+        surface = build()
+        self.save(name, digest, steps, surface)
+        return surface
+
+ASSET_CACHE = AssetCache()
+
+class SpriteLOD:
+    """ตาราง sprite ตามขนาดบนจอ: table[size] -> sprite ที่ scale ไว้แล้ว
+    เลือก sprite ได้ O(1) แทนการหา key ที่ใกล้ที่สุดทุกครั้งที่วาด
+    ขนาดถูกปัดเป็นช่วงละ step (ระยะเท่ากันปัดลง) และจำกัดอยู่ในช่วงของ variants
+    sprite กว้าง pixels_per_size เท่าของขนาด ตารางสร้างครั้งแรกที่ถูกเรียกใช้"""
+    def __init__(self, base, variants, step=SPRITE_LOD_STEP, pixels_per_size=2):
+        self.base = base
+        self.variants = variants  # ขนาด -> sprite ที่มีอยู่แล้ว (ใช้ซ้ำถ้าขนาดตรงกัน)
+        self.step = max(1, step)
+        self.pixels_per_size = pixels_per_size
+        self.min_size = min(variants)
+        self.max_size = max(variants)
+        self.table = None
+
+    def quantize(self, size):
+        """ขนาดที่ใช้จริงของ size (ปัดเป็นช่วงละ step ภายใน min_size..max_size)"""
+        low, step = self.min_size, self.step
+        size = min(max(size, low), self.max_size)
+        return min(low + (size - low + (step - 1) // 2) // step * step, self.max_size)
+
+    def build(self):
+        sprites = {}
+        table = []
+        for size in range(self.max_size + 1):
+            level = self.quantize(size)
+            sprite = sprites.get(level)
+            if sprite is None:
+                sprite = self.variants.get(level)
+                if sprite is None:
+                    pixels = level * self.pixels_per_size
+                    sprite = pygame.transform.scale(self.base, (pixels, pixels))
+                sprites[level] = sprite
+            table.append(sprite)
+        self.table = table
+        return table
+
+    def sprite(self, size):
+        table = self.table
+        if table is None:
+            table = self.build()
+        if size >= len(table):
+            return table[-1]
+        return table[size]
+
+def convert_surface(surface):
+    """แปลงเป็น pixel format ของหน้าจอ (blit เร็วขึ้น) ต้องเรียกหลัง set_mode"""
+    if surface.get_flags() & pygame.SRCALPHA:
+        return surface.convert_alpha()
+    return surface.convert()
+
+def load_resources(cache=ASSET_CACHE):
+    """โหลดรูปภาพและเสียงทั้งหมดครั้งเดียว
+    รูปที่ scale แล้วอ่านจาก cache บนดิสก์ (ถ้ามี) และถ้าเปิดหน้าจอแล้ว
+    จะแปลงเป็น pixel format ของหน้าจอด้วย convert()/convert_alpha()"""
     assets = {}
+    display = pygame.display.get_surface() is not None
+    
+    def prepare(img):
+        return convert_surface(img) if display else img
     
     def safe_load_image(name, scale=None):
         try:
-            img = pygame.image.load(f'assets/{name}')
-            if scale:
-                img = pygame.transform.scale(img, scale)
+            if scale and cache is not None:
+                img = cache.scaled(name, (scale,), lambda: pygame.transform.scale(
+                    pygame.image.load(f'{ASSET_DIR}/{name}'), scale))
+            else:
+                img = pygame.image.load(f'{ASSET_DIR}/{name}')
+                if scale:
+                    img = pygame.transform.scale(img, scale)
             return img
         except:
             return None
     
+    def scale_variants(name, base, base_size, sizes):
+        """ขนาดต่างๆ ของ sprite ที่ scale ต่อจากรูปฐาน (รูปฐาน scale จากไฟล์ต้นฉบับแล้ว)"""
+        variants = {}
+        for key, size in sizes.items():
+            build = lambda size=size: pygame.transform.scale(base, size)
+            if cache is not None:
+                variants[key] = prepare(cache.scaled(name, (base_size, size), build))
+            else:
+                variants[key] = prepare(build())
+        return variants
+    
     # โหลดรูปภาพ
     assets['ai_hoshino'] = safe_load_image('ai_hoshino.jpg', (30, 30))
     assets['knife'] = safe_load_image('knife.png', (20, 20))
@@ -72,26 +349,36 @@ def load_resources():
     
     # Pre-scale sprites สำหรับ Person (ลด lag จาก transform ทุก frame)
     if assets['ai_hoshino']:
-        assets['ai_sprites'] = {
-            10: pygame.transform.scale(assets['ai_hoshino'], (20, 20)),
-            15: pygame.transform.scale(assets['ai_hoshino'], (30, 30)),
-            20: pygame.transform.scale(assets['ai_hoshino'], (40, 40)),
-            25: pygame.transform.scale(assets['ai_hoshino'], (50, 50)),
-            30: pygame.transform.scale(assets['ai_hoshino'], (60, 60)),
-        }
+        assets['ai_sprites'] = scale_variants('ai_hoshino.jpg', assets['ai_hoshino'], (30, 30), {
+            10: (20, 20),
+            15: (30, 30),
+            20: (40, 40),
+            25: (50, 50),
+            30: (60, 60),
+        })
     else:
         assets['ai_sprites'] = {}
     
     # Pre-scale sprites สำหรับ Enemy
     if assets['knife']:
-        assets['knife_sprites'] = {
-            10: pygame.transform.scale(assets['knife'], (20, 20)),
-            15: pygame.transform.scale(assets['knife'], (30, 30)),
-            20: pygame.transform.scale(assets['knife'], (40, 40)),
-        }
+        assets['knife_sprites'] = scale_variants('knife.png', assets['knife'], (20, 20), {
+            10: (20, 20),
+            15: (30, 30),
+            20: (40, 40),
+        })
     else:
         assets['knife_sprites'] = {}
     
+    for name in ('ai_hoshino', 'knife', 'stage', 'ai_dead', 'ai_win', 'game_over'):
+        if assets[name]:
+            assets[name] = prepare(assets[name])
+    
+    # ตาราง LOD ทุกขนาดบนจอ (scale sprite ที่ยังไม่มีตอนวาดครั้งแรก)
+    assets['ai_lod'] = (SpriteLOD(assets['ai_hoshino'], assets['ai_sprites'])
+                        if assets['ai_sprites'] else None)
+    assets['knife_lod'] = (SpriteLOD(assets['knife'], assets['knife_sprites'])
+                           if assets['knife_sprites'] else None)
+    
     # โหลดเพลง
     try:
         pygame.mixer.music.load('assets/bg_song.mp3')